@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from qualidade import modo_qualidade
+
+# Medidas do cubo (dia × entidade × acabamento) gravadas em um .npz, com os nomes e atributos
+# das entidades, para responder consultas só com numpy: sem pandas, sem matplotlib, sem refazer
+# o histórico. O arquivo é refeito (pelo caminho completo, com pandas) quando algum CSV, o
+# histórico ou o registro mudam.
+
+# Os mesmos caminhos padrão de carregador.py, historico.py e registro.py, repetidos aqui
+# para não importar o pandas junto com eles
+pasta_csv = "csvs"
+pasta_cache = ".cache"
+pasta_historico = "historico"
+pasta_registro = "registro"
+
+ARQUIVO_AGREGADOS = "agregados-v1.npz"
+MEDIDAS_AGREGADAS = ["soma", "contagem", "minimo", "maximo", "quantidade", "idade"]
+ATRIBUTOS_ENTIDADES = ["nome", "tipo", "torneio", "eliminatoria"]
+
+
+# Assinatura (caminho, mtime, tamanho) de todos os arquivos que alimentam o cubo
+def assinatura_entradas(*pastas):
+    arquivos = []
+    for pasta in pastas:
+        for raiz, _, nomes in os.walk(pasta):
+            for nome in nomes:
+                caminho = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho)
+                except FileNotFoundError:
+                    continue
+                arquivos.append((caminho, info.st_mtime_ns, info.st_size))
+    return hashlib.sha1(json.dumps(sorted(arquivos)).encode("utf-8")).hexdigest()
+
+
+class Agregados:
+    # dias: datetime64[D]; entidades: atributo -> array por entidade; medidas: (dia × entidade × acabamento)
+    def __init__(self, dias, entidades, acabamentos, medidas):
+        self.dias = np.asarray(dias, dtype="datetime64[D]")
+        self.entidades = entidades
+        self.acabamentos = list(acabamentos)
+        for medida in MEDIDAS_AGREGADAS:
+            setattr(self, medida, medidas[medida])
+
+    @property
+    def n_dias(self):
+        return len(self.dias)
+
+    # Mesma seleção do cubo: entidades pelos atributos e, opcionalmente, um acabamento (ou uma tupla)
+    def _selecao(self, acabamento=None, tipo=None, torneio=None, eliminatoria=None):
+        selecionadas = np.ones(len(self.entidades["nome"]), dtype=bool)
+        for atributo, valor in zip(["tipo", "torneio", "eliminatoria"], [tipo, torneio, eliminatoria]):
+            if valor is not None:
+                selecionadas &= self.entidades[atributo] == valor
+        if acabamento is None:
+            acabamentos = slice(None)
+        else:
+            escolhidos = [acabamento] if isinstance(acabamento, str) else acabamento
+            acabamentos = [self.acabamentos.index(a) for a in escolhidos if a in self.acabamentos]
+        return np.flatnonzero(selecionadas), acabamentos
+
+    # (dias × entidades) de uma medida reduzida nos acabamentos selecionados; NaN onde não há valor
+    def _reduzir(self, medida, dias, entidades, acabamentos):
+        def fatiar(valores):
+            return valores[dias][:, entidades][:, :, acabamentos]
+
+        contagem = fatiar(self.contagem).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if medida == "media":
+                valores = fatiar(self.soma).sum(axis=2) / contagem
+            elif medida == "quantidade":
+                valores = fatiar(self.quantidade).sum(axis=2).astype(float)
+            elif medida == "minimo":
+                valores = fatiar(self.minimo).min(axis=2, initial=np.inf)
+            elif medida == "maximo":
+                valores = fatiar(self.maximo).max(axis=2, initial=-np.inf)
+            else:
+                raise ValueError(f"Medida desconhecida: {medida}")
+        valores[contagem == 0] = np.nan
+        return valores
+
+    # Posição de um dia: índice (0 = primeiro, -1 = último) ou data (o último dia até ela)
+    def indice_dia(self, dia):
+        if isinstance(dia, (int, np.integer)):
+            return int(np.arange(self.n_dias)[dia])
+        posicao = int(np.searchsorted(self.dias, np.datetime64(dia, "D"), side="right")) - 1
+        if posicao < 0:
+            raise IndexError(f"Nenhuma coleta até {dia}")
+        return posicao
+
+    # [(nome, valor)] das entidades com valor em um dia, na ordem do registro
+    def estatistica(self, dia, medida="media", **criterios):
+        entidades, acabamentos = self._selecao(**criterios)
+        valores = self._reduzir(medida, [self.indice_dia(dia)], entidades, acabamentos)[0]
+        presentes = ~np.isnan(valores)
+        return list(zip(self.entidades["nome"][entidades][presentes].tolist(), valores[presentes].tolist()))
+
+    def precos(self, dia, **criterios):
+        return self.estatistica(dia, "media", **criterios)
+
+    def quantidades(self, dia, **criterios):
+        return self.estatistica(dia, "quantidade", **criterios)
+
+    # As n entidades de maior valor em um dia (empates ficam na ordem do registro)
+    def top(self, dia, n=10, medida="media", **criterios):
+        valores = self.estatistica(dia, medida, **criterios)
+        ordem = np.argsort([-valor for _, valor in valores], kind="stable")[:n]
+        return [valores[i] for i in ordem]
+
+    # Série (dias × entidades): (dias, nomes, matriz), sem as entidades que nunca têm valor
+    def serie(self, medida="media", **criterios):
+        entidades, acabamentos = self._selecao(**criterios)
+        valores = self._reduzir(medida, slice(None), entidades, acabamentos)
+        presentes = ~np.isnan(valores).all(axis=0)
+        return self.dias, self.entidades["nome"][entidades][presentes].tolist(), valores[:, presentes]
+
+    # Copiar as medidas e os atributos das entidades de um cubo já montado
+    @classmethod
+    def do_cubo(cls, cubo):
+        entidades = cubo.registro.entidades
+        return cls(
+            cubo.dias.to_numpy().astype("datetime64[D]"),
+            {
+                "nome": entidades["nome"].to_numpy(dtype=str),
+                "tipo": entidades["tipo"].to_numpy(dtype=str),
+                "torneio": entidades["torneio"].fillna("").to_numpy(dtype=str),
+                "eliminatoria": entidades["eliminatoria"].to_numpy(dtype=bool),
+            },
+            cubo.registro.acabamentos,
+            {medida: getattr(cubo, medida) for medida in MEDIDAS_AGREGADAS},
+        )
+
+    def salvar(self, caminho, assinatura):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            np.savez(
+                f,
+                assinatura=np.array(assinatura),
+                dias=self.dias,
+                acabamentos=np.array(self.acabamentos, dtype=str),
+                **{f"entidade_{atributo}": valores for atributo, valores in self.entidades.items()},
+                **{medida: getattr(self, medida) for medida in MEDIDAS_AGREGADAS},
+            )
+        os.replace(temporario, caminho)
+
+    # Agregados gravados, ou None se não existem ou foram gravados com outras entradas
+    @classmethod
+    def abrir(cls, caminho, assinatura):
+        try:
+            with np.load(caminho, allow_pickle=False) as arquivo:
+                if str(arquivo["assinatura"]) != assinatura:
+                    return None
+                return cls(
+                    arquivo["dias"],
+                    {atributo: arquivo[f"entidade_{atributo}"] for atributo in ATRIBUTOS_ENTIDADES},
+                    arquivo["acabamentos"].tolist(),
+                    {medida: arquivo[medida] for medida in MEDIDAS_AGREGADAS},
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+# Agregados atualizados: do .npz se nada mudou desde que foi gravado; senão monta o cubo
+# (importando os CSVs novos para o histórico) e grava de novo. O modo da etapa de qualidade
+# entra na assinatura: reparar ou não muda os valores agregados.
+def carregar_agregados(pasta=pasta_csv, cache=pasta_cache, historico=pasta_historico, registro=pasta_registro):
+    caminho = os.path.join(cache, ARQUIVO_AGREGADOS)
+    modo = modo_qualidade()
+    agregados = Agregados.abrir(caminho, f"{assinatura_entradas(pasta, historico, registro)}:{modo}")
+    if agregados is not None:
+        return agregados
+
+    from cubo import carregar_cubo
+
+    agregados = Agregados.do_cubo(carregar_cubo(pasta, cache, historico=historico, qualidade=modo))
+    # A carga pode ter gravado no histórico e no registro: vale a assinatura de depois dela
+    agregados.salvar(caminho, f"{assinatura_entradas(pasta, historico, registro)}:{modo}")
+    return agregados
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from painel import cache_por_painel
+from perfil import medir
+
+# Janela padrão (em dias de calendário) das métricas móveis
+JANELA = 7
+
+
+# Métricas de todos os adesivos de uma vez, sobre o painel inteiro (dias × adesivos).
+# Cada atributo é um DataFrame com o mesmo índice de dias do painel e uma coluna por ID.
+class Analises:
+    def __init__(self, painel, janela=JANELA):
+        self.janela = janela
+        registro = painel.registro
+        colunas = pd.RangeIndex(painel.preco.shape[1], name="ID")
+
+        def quadro(valores):
+            return pd.DataFrame(valores, index=painel.dias, columns=colunas)
+
+        # Preço 0 no catálogo significa "sem anúncios", não um preço de verdade
+        precos = np.where(painel.preco > 0, painel.preco, np.nan)
+        preco = quadro(precos)
+        self.preco = preco
+
+        # Retorno diário só nos dias em que o adesivo foi coletado de novo (contra o último valor visto);
+        # os dias apenas preenchidos para a frente ficam NaN para não achatar a volatilidade
+        anterior = preco.shift(1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            retornos = np.log(preco / anterior)
+        self.retornos = retornos.where(painel.observado)
+
+        # Retorno acumulado desde a primeira observação de cada adesivo
+        primeiro = preco.bfill().iloc[0] if len(preco) else pd.Series(dtype=float)
+        self.retorno_acumulado = preco / primeiro - 1
+
+        # Desvio padrão móvel dos retornos diários (mínimo de duas observações na janela)
+        self.volatilidade = self.retornos.rolling(janela, min_periods=2).std()
+
+        # Queda em relação ao maior preço já visto (0 = no topo)
+        topo = np.fmax.accumulate(precos, axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.drawdown = quadro(precos / topo - 1)
+
+        # Fração dos anúncios que some por dia, na média da janela (negativa se a oferta cresce).
+        # A janela de cada adesivo começa no seu início ou na primeira observação dele, o que vier
+        # depois; NaN até o adesivo ter duas observações
+        quantidade = painel.quantidade
+        linhas = np.arange(len(quantidade))[:, None]
+        primeira = np.where(painel.observado.any(axis=0), painel.observado.argmax(axis=0), len(quantidade))
+        inicio = np.maximum(linhas - (janela - 1), primeira)
+        dias = linhas - inicio
+        anterior = np.take_along_axis(quantidade, np.clip(inicio, 0, max(len(quantidade) - 1, 0)), axis=0)
+        valido = (np.cumsum(painel.observado, axis=0) >= 2) & (dias > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.esgotamento = quadro(np.where(valido, (anterior - quantidade) / anterior / dias, np.nan))
+
+        # Ágio do dourado sobre o holográfico, por entidade (dias × entidades)
+        self.premio_dourado = self._premio(registro, "Dourado", "Holográfico")
+
+    # Razão de preço entre dois acabamentos da mesma entidade, menos 1
+    def _premio(self, registro, acabamento, base):
+        n_entidades = len(registro.entidades)
+
+        def por_entidade(nome_acabamento):
+            valores = np.full((len(self.preco), n_entidades), np.nan)
+            if nome_acabamento not in registro.acabamentos:
+                return valores
+            ids = np.flatnonzero(
+                (registro.acabamento_por_id == registro.acabamentos.index(nome_acabamento))
+                & (registro.entidade_por_id >= 0)
+            )
+            valores[:, registro.entidade_por_id[ids]] = self.preco.to_numpy()[:, ids]
+            return valores
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            premio = por_entidade(acabamento) / por_entidade(base) - 1
+        return pd.DataFrame(premio, index=self.preco.index, columns=pd.RangeIndex(n_entidades, name="Entidade"))
+
+
+@cache_por_painel(8)
+@medir("analises.calculo")
+def calcular_analises(painel, janela=JANELA):
+    return Analises(painel, janela)
+
+
+# Modos de ranking: métrica, nível (adesivo ou entidade) e se os maiores valores vêm primeiro
+MODOS_RANKING = {
+    "preco": ("preco", "adesivo", True),
+    "retorno": ("retorno_acumulado", "adesivo", True),
+    "volatilidade": ("volatilidade", "adesivo", True),
+    "drawdown": ("drawdown", "adesivo", False),
+    "premio_dourado": ("premio_dourado", "entidade", True),
+    "esgotamento": ("esgotamento", "adesivo", True),
+}
+
+
+# As n primeiras entidades/adesivos de um dia do cubo (0 = primeiro, -1 = último) em um modo.
+# "preco" é o top 10 por preço médio de sempre, direto do cubo.
+def ranking(cubo, modo="preco", dia=-1, n=10, janela=JANELA, acabamento=None, tipo=None, torneio=None,
+            eliminatoria=None):
+    if modo not in MODOS_RANKING:
+        raise ValueError(f"Modo de ranking desconhecido: {modo} (opções: {', '.join(MODOS_RANKING)})")
+    if modo == "preco":
+        return cubo.top(dia, n, acabamento=acabamento, tipo=tipo, torneio=torneio, eliminatoria=eliminatoria)
+
+    metrica, nivel, decrescente = MODOS_RANKING[modo]
+    registro = cubo.registro
+    analises = calcular_analises(cubo.painel, janela)
+    linha = getattr(analises, metrica).loc[cubo.dias[dia]].to_numpy()
+
+    if nivel == "entidade":
+        selecionadas = np.flatnonzero(registro.mascara_entidades(tipo, torneio, eliminatoria))
+        rotulos = registro.entidades["nome"].to_numpy()[selecionadas]
+    else:
+        selecionadas = np.flatnonzero(registro.mascara(tipo, acabamento, torneio, eliminatoria)[:-1])
+        adesivos = registro.adesivos.iloc[selecionadas]
+        rotulos = adesivos["nome"].to_numpy()
+        # Com mais de um acabamento na seleção o nome sozinho não identifica o adesivo
+        if adesivos["acabamento"].nunique() > 1:
+            com_acabamento = adesivos["nome"] + " (" + adesivos["acabamento"] + ")"
+            rotulos = np.where(adesivos["acabamento"] != "", com_acabamento, adesivos["nome"])
+
+    serie = pd.Series(linha[selecionadas], index=pd.Index(rotulos, name="Nome"), name=modo).dropna()
+    serie = serie[np.isfinite(serie)]
+    serie = serie.nlargest(n) if decrescente else serie.nsmallest(n)
+    criterios = {"acabamento": acabamento, "tipo": tipo, "torneio": torneio, "eliminatoria": eliminatoria}
+    return cubo.anotar(ranking, (modo, dia, n, janela), criterios, serie)
@@ -0,0 +1,326 @@
+import hashlib
+import shutil
+import subprocess
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+from matplotlib.offsetbox import AnnotationBbox
+from matplotlib.transforms import blended_transform_factory
+
+from logos import carregar_atlas
+from perfil import etapa
+
+# ----- Codificadores: recebem um quadro RGBA por vez, sem guardar a animação inteira -----
+
+# Envia os quadros crus para o ffmpeg por um pipe (GIF com paleta otimizada, ou MP4/WebM)
+class EscritorFfmpeg:
+    def __init__(self, caminho, largura, altura, fps, executavel="ffmpeg"):
+        comando = [
+            executavel, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{largura}x{altura}", "-r", str(fps), "-i", "-",
+        ]
+        if caminho.lower().endswith(".gif"):
+            comando += ["-filter_complex", "[0:v]split[a][b];[a]palettegen[p];[b][p]paletteuse", "-loop", "0"]
+        else:
+            comando += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+        self.processo = subprocess.Popen(comando + [caminho], stdin=subprocess.PIPE)
+
+    def escrever(self, quadro):
+        self.processo.stdin.write(np.ascontiguousarray(quadro).tobytes())
+
+    def fechar(self):
+        self.processo.stdin.close()
+        if self.processo.wait() != 0:
+            raise RuntimeError(f"ffmpeg terminou com código {self.processo.returncode}")
+
+
+# Escreve o GIF quadro a quadro: paleta fixa tirada do primeiro quadro e só o retângulo
+# que mudou em relação ao quadro anterior. Cada quadro fica pendente até o próximo chegar,
+# para que quadros idênticos só estendam a duração do anterior.
+class EscritorGif:
+    def __init__(self, caminho, largura, altura, fps):
+        self.arquivo = open(caminho, "wb")
+        self.tamanho = (largura, altura)
+        self.fps = fps
+        self._paleta = None
+        self._anterior = None
+        self._pendente = None
+        self._duracao_pendente = 0.0
+        self._tempo = 0.0  # em centésimos de segundo, para não acumular erro de arredondamento
+        self._escrito = 0
+
+    def escrever(self, quadro):
+        from PIL import Image, GifImagePlugin
+
+        imagem = Image.fromarray(np.ascontiguousarray(quadro[:, :, :3]))
+        if self._paleta is None:
+            self._paleta = imagem.quantize(colors=256)
+            atual = self._paleta
+            cabecalho, _ = GifImagePlugin.getheader(atual, info={"loop": 0})
+            self.arquivo.write(b"".join(cabecalho))
+        else:
+            atual = imagem.quantize(palette=self._paleta, dither=Image.Dither.NONE)
+
+        # Recortar só a área alterada
+        indices = np.asarray(atual)
+        caixa = (0, 0) + self.tamanho
+        if self._anterior is not None:
+            linhas, colunas = np.nonzero(indices != self._anterior)
+            if len(linhas) == 0:
+                self._duracao_pendente += 100 / self.fps
+                return
+            caixa = (int(colunas.min()), int(linhas.min()), int(colunas.max()) + 1, int(linhas.max()) + 1)
+        self._anterior = indices
+
+        self._descarregar()
+        self._pendente = (atual.crop(caixa), caixa[:2])
+        self._duracao_pendente = 100 / self.fps
+
+    def _descarregar(self):
+        from PIL import GifImagePlugin
+
+        if self._pendente is None:
+            return
+        recorte, deslocamento = self._pendente
+        self._tempo += self._duracao_pendente
+        duracao = round(self._tempo) - self._escrito
+        self._escrito += duracao
+        for bloco in GifImagePlugin.getdata(recorte, offset=deslocamento, duration=duracao * 10):
+            self.arquivo.write(bloco)
+        self._pendente = None
+
+    def fechar(self):
+        self._descarregar()
+        self.arquivo.write(b";")
+        self.arquivo.close()
+
+
+# ffmpeg quando estiver instalado; sem ele, só GIF
+def abrir_escritor(caminho, largura, altura, fps):
+    executavel = shutil.which("ffmpeg")
+    if executavel:
+        return EscritorFfmpeg(caminho, largura, altura, fps, executavel)
+    if not caminho.lower().endswith(".gif"):
+        raise RuntimeError("Sem ffmpeg instalado só é possível gerar GIF.")
+    return EscritorGif(caminho, largura, altura, fps)
+
+
+# ----- Quadros já desenhados -----
+
+# Pixels de quadros já desenhados, comprimidos, indexados pelo estado que os produz. Uma nova
+# gravação da mesma corrida (por exemplo, depois de chegar mais um dia) só redesenha os quadros
+# cujo estado mudou; os demais vão direto para o codificador.
+class CacheDeQuadros:
+    def __init__(self, limite_bytes=256 << 20):
+        self.limite_bytes = limite_bytes
+        self._quadros = OrderedDict()
+        self._bytes = 0
+
+    def obter(self, chave):
+        if chave not in self._quadros:
+            return None
+        self._quadros.move_to_end(chave)
+        forma, comprimido = self._quadros[chave]
+        return np.frombuffer(zlib.decompress(comprimido), dtype=np.uint8).reshape(forma)
+
+    def guardar(self, chave, quadro):
+        comprimido = zlib.compress(np.ascontiguousarray(quadro).tobytes(), 1)
+        if chave in self._quadros:
+            self._bytes -= len(self._quadros.pop(chave)[1])
+        self._quadros[chave] = (quadro.shape, comprimido)
+        self._bytes += len(comprimido)
+        while self._bytes > self.limite_bytes and len(self._quadros) > 1:
+            self._bytes -= len(self._quadros.popitem(last=False)[1][1])
+
+    def limpar(self):
+        self._quadros.clear()
+        self._bytes = 0
+
+
+_quadros = CacheDeQuadros()
+
+
+# ----- Motor da corrida de barras -----
+
+# Interpolar linearmente (datas × nomes) em (quadros × nomes): subquadros quadros por data,
+# mais o da última data
+def _interpolar(matriz, subquadros):
+    if subquadros == 1 or len(matriz) < 2:
+        return matriz.copy()
+    t = (np.arange(subquadros) / subquadros)[:, None]
+    entre = matriz[:-1, None, :] * (1 - t) + matriz[1:, None, :] * t
+    return np.concatenate([entre.reshape(-1, matriz.shape[1]), matriz[-1:]])
+
+
+# Dados de todos os quadros de uma corrida, montados de uma vez a partir da matriz
+# (datas × nomes): o ranking de cada data sai de um argsort por linha e os valores e
+# posições de cada quadro (já interpolados) são linhas de matrizes (quadros × nomes).
+class QuadrosDaCorrida:
+    def __init__(self, nomes, datas, valores, subquadros=1):
+        self.nomes = list(nomes)
+        self.datas = list(datas)
+        self.subquadros = max(1, int(subquadros))
+        # Sem valor conta como 0
+        self.valores_por_data = np.nan_to_num(np.asarray(valores, dtype=float)).reshape(len(self.datas), len(self.nomes))
+
+        # ordem[d]: índices dos nomes do maior para o menor valor (empates na ordem dos nomes);
+        # ranking[d, i]: posição do nome i (0 = primeiro)
+        n = len(self.nomes)
+        self.ordem = np.argsort(-self.valores_por_data, axis=1, kind="stable")
+        self.ranking = np.empty_like(self.ordem)
+        np.put_along_axis(self.ranking, self.ordem, np.arange(n), axis=1)
+
+        # Posição vertical: o maior valor fica no topo
+        self.valores = _interpolar(self.valores_por_data, self.subquadros)
+        self.posicoes = _interpolar((n - 1 - self.ranking).astype(float), self.subquadros)
+        self.indice_data = np.arange(len(self.valores)) // self.subquadros
+
+    def __len__(self):
+        return len(self.valores)
+
+    # (data, valores, posições) de um quadro
+    def __getitem__(self, quadro):
+        return self.datas[self.indice_data[quadro]], self.valores[quadro], self.posicoes[quadro]
+
+    # [(nome, valor)] de uma data, do maior para o menor valor
+    def ordenados(self, indice_data):
+        return [(self.nomes[i], float(self.valores_por_data[indice_data, i])) for i in self.ordem[indice_data]]
+
+
+class CorridaDeBarras:
+    # quadros: QuadrosDaCorrida. Os artistas são criados uma única vez; cada quadro só
+    # atualiza larguras, posições, textos e logos, lidos das linhas já calculadas.
+    def __init__(self, quadros, titulo, cor="royalblue", blit=False,
+                 figsize=(12, 8), dpi=100, xlabel="Preço ($)", ylabel="Nome da Equipe", com_logos=True):
+        self.quadros = quadros
+        self.nomes = quadros.nomes
+        self.datas = quadros.datas
+        self.subquadros = quadros.subquadros
+        self.titulo = titulo
+        self.blit = blit
+        self._configuracao = repr((self.nomes, titulo, cor, blit, figsize, dpi, xlabel, ylabel, com_logos))
+        n = len(self.nomes)
+
+        self.fig, self.ax = plt.subplots(figsize=figsize, dpi=dpi)
+        ax = self.ax
+        self.barras = ax.barh(np.arange(n), np.zeros(n), color=cor)
+        ax.set_ylim(-0.6, n - 0.4)
+        ax.set_yticks([])
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12, labelpad=110)
+        ax.grid(axis="x", linestyle="--", alpha=0.7)
+        self.fig.subplots_adjust(left=0.2)
+
+        # Nomes à esquerda do eixo (x em coordenadas do eixo, y em dados)
+        transformacao = blended_transform_factory(ax.transAxes, ax.transData)
+        self.rotulos = [
+            ax.text(-0.01, i, nome, transform=transformacao, ha="right", va="center", fontsize=10)
+            for i, nome in enumerate(self.nomes)
+        ]
+        self.titulo_texto = ax.set_title("", fontsize=16)
+
+        # Logos do atlas, já no tamanho final: nenhum quadro decodifica ou reamostra imagem
+        self.logos = {}
+        if com_logos:
+            atlas = carregar_atlas(dpi=dpi)
+            for i, nome in enumerate(self.nomes):
+                imagebox = atlas.imagem(nome)
+                if imagebox is not None:
+                    ab = AnnotationBbox(imagebox, (0, i), frameon=False, xycoords="data", box_alignment=(0, 0.5))
+                    ax.add_artist(ab)
+                    self.logos[i] = ab
+
+        # Com blit o eixo x fica fixo no maior valor, para o fundo poder ser reaproveitado
+        if self.blit:
+            ax.set_xlim(0, max(quadros.valores_por_data.max(initial=0), 1e-9) * 1.1)
+        self._fundo = None
+        # Quadros desenhados de fato no canvas por esta corrida (os vindos do cache não contam)
+        self.redesenhados = 0
+
+    @property
+    def n_quadros(self):
+        return len(self.quadros)
+
+    @property
+    def artistas(self):
+        return [*self.barras, *self.rotulos, *self.logos.values(), self.titulo_texto]
+
+    # Data, valores e posições (já interpolados) de um quadro
+    def estado(self, quadro):
+        return self.quadros[quadro]
+
+    def atualizar(self, quadro):
+        data, valores, posicoes = self.estado(quadro)
+        for barra, valor, y in zip(self.barras, valores, posicoes):
+            barra.set_width(valor)
+            barra.set_y(y - barra.get_height() / 2)
+        for rotulo, y in zip(self.rotulos, posicoes):
+            rotulo.set_y(y)
+        for i, ab in self.logos.items():
+            ab.xybox = ab.xy = (valores[i], posicoes[i])
+        if not self.blit:
+            self.ax.set_xlim(0, max(valores.max(), 1e-9) * 1.1)
+        self.titulo_texto.set_text(f"{self.titulo} - {data.strftime('%Y-%m-%d')}")
+        return self.artistas
+
+    # Desenhar um quadro no canvas e devolver os pixels RGBA
+    def renderizar(self, quadro):
+        canvas = self.fig.canvas
+        if not self.blit:
+            self.atualizar(quadro)
+            canvas.draw()
+        else:
+            if self._fundo is None:
+                # Fundo (eixos, grade, rótulos fixos) desenhado uma vez, sem os artistas animados
+                for artista in self.artistas:
+                    artista.set_animated(True)
+                canvas.draw()
+                self._fundo = canvas.copy_from_bbox(self.fig.bbox)
+            canvas.restore_region(self._fundo)
+            for artista in self.atualizar(quadro):
+                self.fig.draw_artist(artista)
+        self.redesenhados += 1
+        return np.asarray(canvas.buffer_rgba())
+
+    # Chave do quadro no cache: a configuração do gráfico e tudo o que muda de um quadro para outro
+    def _chave(self, quadro):
+        data, valores, posicoes = self.estado(quadro)
+        h = hashlib.sha1(self._configuracao.encode("utf-8"))
+        h.update(str(data).encode("utf-8"))
+        h.update(np.ascontiguousarray(valores).tobytes())
+        h.update(np.ascontiguousarray(posicoes).tobytes())
+        if self.blit:
+            h.update(repr(self.ax.get_xlim()).encode("utf-8"))
+        return h.hexdigest()
+
+    # Pixels de um quadro, do cache quando o mesmo estado já foi desenhado antes
+    def quadro(self, quadro):
+        chave = self._chave(quadro)
+        pixels = _quadros.obter(chave)
+        if pixels is None:
+            pixels = self.renderizar(quadro)
+            _quadros.guardar(chave, pixels)
+        return pixels
+
+    # Gravar a animação direto no codificador, quadro a quadro
+    def salvar(self, caminho, fps_por_data=2):
+        largura, altura = self.fig.canvas.get_width_height(physical=True)
+        escritor = abrir_escritor(caminho, largura, altura, fps_por_data * self.subquadros)
+        try:
+            for quadro in range(self.n_quadros):
+                with etapa("animacao.desenho"):
+                    pixels = self.quadro(quadro)
+                with etapa("animacao.codificacao"):
+                    escritor.escrever(pixels)
+        finally:
+            escritor.fechar()
+        return self.fig
+
+    # Animação interativa (janela do matplotlib)
+    def exibir(self, intervalo=800):
+        self._animacao = FuncAnimation(self.fig, self.atualizar, frames=self.n_quadros,
+                                       interval=intervalo / self.subquadros, blit=self.blit, repeat=False)
+        return self._animacao
@@ -0,0 +1,267 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Sem janelas: o backend Agg precisa ser escolhido antes de qualquer import do pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import pandas as pd
+
+import analises
+import animacao
+import nomes
+from analises import MODOS_RANKING, ranking
+from carregador import listar_arquivos_csv, pasta_cache, pasta_csv, sincronizar_cache
+from cubo import Cubo, agregar_painel
+from gerador import gerar_dados
+from historico import Historico, pasta_historico
+from painel import montar_painel
+from qualidade import verificar_painel
+from registro import carregar_registro
+from render import SCRIPTS, carregar_script, listar_tarefas, pasta_scripts, renderizar
+
+# Mede cada etapa do pipeline em dados sintéticos (gerador.py) de tamanho escolhido: leitura dos
+# CSVs, análise dos nomes, cache, histórico, painel, agregação, filtros e, para cada script,
+# a carga dos dados, cada figura e cada GIF. Tempo (várias execuções) e pico de memória
+# (tracemalloc, em uma execução à parte) de cada etapa vão para um JSON comparável entre rodadas.
+
+arquivo_resultado = "benchmark.json"
+VERSAO_RESULTADO = 1
+
+
+def _remover(*pastas):
+    for pasta in pastas:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+class Etapa:
+    # executar() devolve o número de linhas processadas (ou None); preparar() volta o estado
+    # ao ponto de partida da etapa antes de cada execução
+    def __init__(self, nome, executar, preparar=None, script=None):
+        self.nome = nome
+        self.executar = executar
+        self.preparar = preparar
+        self.script = script
+
+    def _rodar(self):
+        if self.preparar is not None:
+            self.preparar()
+        inicio = time.perf_counter()
+        linhas = self.executar()
+        return time.perf_counter() - inicio, linhas
+
+    def medir(self, repeticoes):
+        # Memória primeiro: a execução instrumentada também aquece imports e caches de processo
+        tracemalloc.start()
+        try:
+            _, linhas = self._rodar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        tempos = [self._rodar()[0] for _ in range(repeticoes)]
+        return {
+            "etapa": self.nome,
+            "script": self.script,
+            "segundos": statistics.median(tempos),
+            "minimo": min(tempos),
+            "execucoes": tempos,
+            "pico_memoria_bytes": pico,
+            "linhas": linhas,
+        }
+
+
+# Etapas do pipeline e dos scripts, na ordem em que dependem umas das outras. Roda na pasta
+# atual (a dos dados sintéticos); estado compartilhado entre as etapas fica em `estado`.
+def listar_etapas(scripts, saida):
+    estado = {}
+    arquivos = listar_arquivos_csv(pasta_csv)
+
+    def ler_csvs():
+        estado["brutos"] = [pd.read_csv(arquivo, encoding="utf-8") for arquivo in arquivos]
+        return sum(len(df) for df in estado["brutos"])
+
+    def analisar():
+        serie = pd.concat([df["nome"] for df in estado["brutos"]], ignore_index=True)
+        return len(nomes.analisar_nomes(serie))
+
+    def cachear():
+        return len(sincronizar_cache(pasta_csv, pasta_cache))
+
+    def importar():
+        estado["historico"] = Historico(pasta_historico)
+        estado["historico"].importar_csvs(pasta_csv, pasta_cache)
+        return estado["historico"].resumo()["alteracoes"]
+
+    def montar():
+        estado["painel"] = montar_painel(estado["historico"].observacoes(), carregar_registro())
+        return estado["painel"].preco.size
+
+    def verificar():
+        return len(verificar_painel(estado["painel"]).qualidade["valores_atipicos"])
+
+    def agregar():
+        dias, medidas = agregar_painel(estado["painel"])
+        estado["cubo"] = Cubo(estado["painel"].registro, dias, medidas, estado["painel"])
+        return estado["painel"].preco.size
+
+    # As seleções usadas pelos scripts, no último dia e na série inteira
+    def filtrar():
+        cubo = estado["cubo"]
+        selecoes = [
+            {}, {"tipo": "equipe", "eliminatoria": True},
+            {"tipo": "equipe", "eliminatoria": True, "acabamento": "Dourado"},
+            {"tipo": "jogador", "acabamento": "Dourado"},
+        ]
+        for criterios in selecoes:
+            cubo.precos(-1, **criterios)
+            cubo.quantidades(-1, **criterios)
+            cubo.serie_precos(**criterios)
+        return len(selecoes)
+
+    def ranquear():
+        for modo in MODOS_RANKING:
+            ranking(estado["cubo"], modo, acabamento="Dourado")
+        return len(MODOS_RANKING)
+
+    etapas = [
+        Etapa("leitura_csv", ler_csvs),
+        Etapa("analise_nomes", analisar, preparar=nomes._memo.clear),
+        Etapa("cache_snapshots", cachear, preparar=lambda: _remover(pasta_cache)),
+        Etapa("importacao_historico", importar, preparar=lambda: _remover(pasta_historico)),
+        Etapa("painel", montar),
+        Etapa("qualidade", verificar),
+        Etapa("agregacao", agregar),
+        Etapa("filtros", filtrar, preparar=lambda: carregar_registro()._mascaras.clear()),
+        Etapa("rankings", ranquear, preparar=analises.calcular_analises.cache_clear),
+    ]
+
+    for script in scripts:
+        modulo = carregar_script(script)
+        # Carga de cada script com o cache e o histórico já prontos (o caso de todo dia)
+        etapas.append(Etapa("carregar_dados", lambda m=modulo: m.carregar_dados().n_dias, script=script))
+        for tarefa in listar_tarefas([script]):
+            _, tipo, nome = tarefa
+            if tipo == "animacao":
+                # Sem o cache de quadros de uma rodada anterior: mede a codificação inteira
+                etapa = Etapa(f"gif:{nome}", lambda t=tarefa: len(renderizar(t, saida, [], estado["cubo"])),
+                              preparar=animacao._quadros.limpar, script=script)
+            else:
+                etapa = Etapa(f"figura:{nome}", lambda t=tarefa: len(renderizar(t, saida, ["png"], estado["cubo"])),
+                              script=script)
+            etapas.append(etapa)
+    return etapas
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=pasta_scripts,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Gerar os dados em `pasta`, medir todas as etapas dentro dela e devolver o resultado
+def medir(pasta, scripts=SCRIPTS, repeticoes=3, **escala):
+    arquivos = gerar_dados(pasta, **escala)
+    imgs = os.path.join(pasta, "imgs")
+    if not os.path.exists(imgs):
+        os.symlink(os.path.join(pasta_scripts, "imgs"), imgs)
+
+    anterior = os.getcwd()
+    os.chdir(pasta)
+    try:
+        saida = os.path.join(pasta, "saida")
+        os.makedirs(saida, exist_ok=True)
+        resultados = []
+        for etapa in listar_etapas(scripts, saida):
+            resultado = etapa.medir(repeticoes)
+            resultados.append(resultado)
+            rotulo = f"{etapa.script}:{etapa.nome}" if etapa.script else etapa.nome
+            print(f"{rotulo:55s} {resultado['segundos'] * 1000:10.1f} ms "
+                  f"{resultado['pico_memoria_bytes'] / 2**20:8.1f} MiB", file=sys.stderr)
+    finally:
+        os.chdir(anterior)
+
+    return {
+        "versao": VERSAO_RESULTADO,
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"repeticoes": repeticoes, "scripts": list(scripts), **escala},
+        "dados": {
+            "arquivos": len(arquivos),
+            "linhas": int(sum(r["linhas"] for r in resultados if r["etapa"] == "leitura_csv")),
+            "bytes_csv": sum(os.path.getsize(arquivo) for arquivo in arquivos),
+        },
+        "etapas": resultados,
+        # ru_maxrss vem em KiB no Linux
+        "pico_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+# Tabela com a razão entre o tempo de cada etapa agora e em um resultado anterior
+def comparar(atual, anterior):
+    chave = lambda r: (r["script"], r["etapa"])
+    antes = {chave(r): r for r in anterior["etapas"]}
+    linhas = io.StringIO()
+    for r in atual["etapas"]:
+        rotulo = f"{r['script']}:{r['etapa']}" if r["script"] else r["etapa"]
+        base = antes.get(chave(r))
+        if base is None:
+            print(f"{rotulo:55s} {'(nova)':>10s}", file=linhas)
+            continue
+        razao = r["segundos"] / base["segundos"] if base["segundos"] else float("inf")
+        print(f"{rotulo:55s} {base['segundos'] * 1000:10.1f} -> {r['segundos'] * 1000:10.1f} ms  x{razao:.2f}",
+              file=linhas)
+    return linhas.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede o pipeline e os scripts em dados sintéticos.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="scripts a medir (padrão: todos)")
+    parser.add_argument("--equipes", type=int, default=32)
+    parser.add_argument("--jogadores", type=int, default=160)
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--linhas", type=int, help="linhas por arquivo (padrão: uma por adesivo)")
+    parser.add_argument("--fracao-atrasada", type=float, default=0.25)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções cronometradas por etapa")
+    parser.add_argument("--pasta", help="onde gerar os dados (padrão: pasta temporária apagada no fim)")
+    parser.add_argument("--resultado", default=arquivo_resultado, help="JSON de saída (padrão: %(default)s)")
+    parser.add_argument("--comparar", metavar="JSON", help="resultado anterior para comparar os tempos")
+    args = parser.parse_args(argv)
+
+    pasta = os.path.abspath(args.pasta) if args.pasta else tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        resultado = medir(pasta, args.scripts, args.repeticoes, equipes=args.equipes, jogadores=args.jogadores,
+                          snapshots=args.snapshots, linhas_por_arquivo=args.linhas,
+                          fracao_atrasada=args.fracao_atrasada, semente=args.semente)
+    finally:
+        if not args.pasta:
+            _remover(pasta)
+
+    with open(args.resultado, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=1, ensure_ascii=False)
+    print(f"Resultado em {args.resultado} (pico RSS {resultado['pico_rss_bytes'] / 2**20:.0f} MiB)", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            print(comparar(resultado, json.load(f)), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
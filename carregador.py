@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from nomes import analisar_nomes
+from perfil import etapa, medir
+from registro import carregar_registro
+
+# Caminhos padrão usados por todos os scripts
+pasta_csv = "csvs"
+pasta_cache = ".cache"
+
+# Colunas dos arquivos stickers_data_DDMM.csv (cabeçalho gravado pelo coletor e nomes usados depois da leitura)
+COLUNAS_CSV = ["nome", "preco", "quantidade", "tipo", "data_scraping"]
+COLUNAS = ["Nome", "Preco", "Quantidade", "Tipo", "Data_Scraping"]
+COLUNAS_SNAPSHOT = [
+    "Nome", "Acabamento", "Torneio", "Capsula", "Preco", "Quantidade", "Tipo", "Data_Scraping", "Nome_Completo", "Arquivo", "ID"
+]
+COLUNAS_CATEGORICAS = ["Nome", "Acabamento", "Torneio", "Tipo", "Nome_Completo", "Arquivo"]
+
+# Versão do formato do cache; mudar aqui invalida todos os snapshots já convertidos
+VERSAO_CACHE = 4
+
+# Linhas por bloco na leitura em fluxo; limita a memória usada por arquivos muito grandes
+TAMANHO_BLOCO = 200_000
+
+# Parquet quando o pyarrow estiver instalado, pickle caso contrário
+try:
+    import pyarrow  # noqa: F401
+    FORMATO_CACHE = "parquet"
+except ImportError:
+    FORMATO_CACHE = "pickle"
+
+
+# Listar todos os arquivos CSV na pasta (ordenando para pegar o primeiro e o último)
+def listar_arquivos_csv(pasta=pasta_csv):
+    return sorted(os.path.join(pasta, arquivo) for arquivo in os.listdir(pasta) if arquivo.endswith(".csv"))
+
+
+# Converter as colunas de um CSV (inteiro ou um bloco dele) para os tipos corretos. Com
+# problemas (um dict), soma nele as linhas descartadas por motivo e anota um cabeçalho diferente.
+@medir("csv.tipagem", linhas=len)
+def _tipar(df, problemas=None):
+    if len(df.columns) != len(COLUNAS):
+        raise ValueError(f"Esperadas {len(COLUNAS)} colunas ({', '.join(COLUNAS_CSV)}), "
+                         f"encontradas {len(df.columns)}: {', '.join(map(str, df.columns))}")
+    if problemas is not None and [str(coluna).strip().lower() for coluna in df.columns] != COLUNAS_CSV:
+        problemas["cabecalho"] = [str(coluna) for coluna in df.columns]
+    df.columns = COLUNAS
+
+    # Limpar valores e converter as colunas necessárias
+    df["Preco"] = pd.to_numeric(df["Preco"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
+    df["Quantidade"] = pd.to_numeric(df["Quantidade"], errors="coerce")
+    df["Data_Scraping"] = pd.to_datetime(df["Data_Scraping"], errors="coerce")
+
+    # Remover linhas com valores inválidos (preço ou quantidade negativos também)
+    negativos = (df["Preco"] < 0) | (df["Quantidade"] < 0)
+    if problemas is not None:
+        for motivo, invalidos in (("preco_invalido", df["Preco"].isna()), ("quantidade_invalida", df["Quantidade"].isna()),
+                                  ("data_invalida", df["Data_Scraping"].isna()), ("valor_negativo", negativos),
+                                  ("linhas", np.ones(len(df), dtype=bool))):
+            problemas[motivo] = problemas.get(motivo, 0) + int(invalidos.sum())
+    df = df[~negativos].dropna(subset=["Preco", "Quantidade", "Data_Scraping"]).reset_index(drop=True)
+    df["Quantidade"] = df["Quantidade"].astype("int64")
+    df["Tipo"] = df["Tipo"].astype("category")
+
+    # Separar nome, acabamento, torneio e cápsula uma única vez, já na ingestão
+    partes = analisar_nomes(df["Nome"])
+    df = df.rename(columns={"Nome": "Nome_Completo"})
+    return pd.concat([partes, df], axis=1)[COLUNAS_SNAPSHOT[:-2]]
+
+
+# Ler um único CSV e converter as colunas para os tipos corretos
+def ler_csv(arquivo):
+    with etapa("csv.leitura", arquivo=os.path.basename(arquivo)) as e:
+        df = pd.read_csv(arquivo, encoding="utf-8", delimiter=",")
+        e.contar(len(df))
+    return _tipar(df)
+
+
+# Ler um CSV em blocos de no máximo `linhas` linhas, cada um já tipado e com os nomes separados
+def ler_csv_em_blocos(arquivo, linhas=TAMANHO_BLOCO, problemas=None):
+    with pd.read_csv(arquivo, encoding="utf-8", delimiter=",", chunksize=linhas) as leitor:
+        while True:
+            # Só a leitura do bloco é medida aqui; o yield fica fora da etapa
+            with etapa("csv.leitura", arquivo=os.path.basename(arquivo)) as e:
+                bloco = next(leitor, None)
+                if bloco is not None:
+                    e.contar(len(bloco))
+            if bloco is None:
+                return
+            yield _tipar(bloco, problemas)
+
+
+# Hash do conteúdo, usado quando o mtime muda mas o arquivo continua igual
+def calcular_hash(arquivo):
+    h = hashlib.sha1()
+    with open(arquivo, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _caminho_manifesto(cache):
+    return os.path.join(cache, "manifesto.json")
+
+
+def _caminho_snapshot(cache, sha1):
+    extensao = "parquet" if FORMATO_CACHE == "parquet" else "pkl"
+    return os.path.join(cache, f"snapshots-v{VERSAO_CACHE}", f"{sha1}.{extensao}")
+
+
+def _ler_manifesto(cache):
+    try:
+        with open(_caminho_manifesto(cache), encoding="utf-8") as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifesto.get("versao") != VERSAO_CACHE or manifesto.get("formato") != FORMATO_CACHE:
+        return {}
+    return manifesto.get("arquivos", {})
+
+
+def _gravar_manifesto(cache, arquivos):
+    os.makedirs(cache, exist_ok=True)
+    temporario = _caminho_manifesto(cache) + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"versao": VERSAO_CACHE, "formato": FORMATO_CACHE, "arquivos": arquivos}, f, indent=1)
+    os.replace(temporario, _caminho_manifesto(cache))
+
+
+# Esquema fixo do Parquet: blocos com categorias diferentes precisam do mesmo tipo de dicionário
+def _esquema_arrow():
+    import pyarrow as pa
+
+    texto = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("Nome", texto), ("Acabamento", texto), ("Torneio", texto), ("Capsula", pa.bool_()),
+        ("Preco", pa.float64()), ("Quantidade", pa.int64()), ("Tipo", texto),
+        ("Data_Scraping", pa.timestamp("ns")), ("Nome_Completo", texto),
+    ])
+
+
+# Gravar os blocos um a um, sem juntar o snapshot inteiro na memória
+@medir("cache.conversao")
+def _salvar_blocos(blocos, caminho):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    if FORMATO_CACHE == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = _esquema_arrow()
+        with pq.ParquetWriter(temporario, esquema) as escritor:
+            for bloco in blocos:
+                escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+    else:
+        # Vários pickles em sequência no mesmo arquivo, um por bloco
+        with open(temporario, "wb") as f:
+            for bloco in blocos:
+                pickle.dump(bloco, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+def _ler_blocos(caminho, linhas=TAMANHO_BLOCO):
+    if FORMATO_CACHE == "parquet":
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(caminho).iter_batches(batch_size=linhas):
+            yield lote.to_pandas()
+    else:
+        with open(caminho, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+def _abrir_snapshot(caminho):
+    if FORMATO_CACHE == "parquet":
+        return pd.read_parquet(caminho)
+    blocos = list(_ler_blocos(caminho))
+    if len(blocos) == 1:
+        return blocos[0]
+    df = pd.concat(blocos, ignore_index=True)
+    for coluna in ["Nome", "Acabamento", "Torneio", "Tipo", "Nome_Completo"]:
+        df[coluna] = df[coluna].astype("category")
+    return df
+
+
+# Converter o CSV para o cache só quando ele for novo ou tiver mudado
+def _sincronizar_arquivo(arquivo, anteriores, cache):
+    info = os.stat(arquivo)
+    entrada = anteriores.get(arquivo)
+
+    # Mesmo mtime e tamanho: confiar no cache sem nem ler o CSV
+    if entrada and entrada["mtime_ns"] == info.st_mtime_ns and entrada["tamanho"] == info.st_size:
+        if "esquema" in entrada and os.path.exists(_caminho_snapshot(cache, entrada["sha1"])):
+            return entrada
+
+    # Caso contrário, o hash decide se o conteúdo realmente mudou. A conversão anota os problemas
+    # de esquema do arquivo (para o relatório de qualidade); um snapshot convertido antes disso
+    # é convertido de novo uma vez
+    sha1 = calcular_hash(arquivo)
+    caminho = _caminho_snapshot(cache, sha1)
+    esquema = next((e["esquema"] for e in anteriores.values() if e["sha1"] == sha1 and "esquema" in e), None)
+    if esquema is None or not os.path.exists(caminho):
+        esquema = {}
+        _salvar_blocos(ler_csv_em_blocos(arquivo, problemas=esquema), caminho)
+    return {"mtime_ns": info.st_mtime_ns, "tamanho": info.st_size, "sha1": sha1, "esquema": esquema}
+
+
+# Garantir que todos os CSVs da pasta estão no cache e devolver (arquivo, sha1) na ordem dos arquivos
+@medir("cache.sincronizacao", linhas=len)
+def sincronizar_cache(pasta=pasta_csv, cache=pasta_cache):
+    anteriores = _ler_manifesto(cache)
+    atuais = {arquivo: _sincronizar_arquivo(arquivo, anteriores, cache) for arquivo in listar_arquivos_csv(pasta)}
+    if atuais != anteriores:
+        _gravar_manifesto(cache, atuais)
+    return [(arquivo, entrada["sha1"]) for arquivo, entrada in atuais.items()]
+
+
+# Problemas de esquema de cada CSV da pasta (linhas descartadas por motivo, cabeçalho
+# diferente), como anotados na conversão para o cache
+def problemas_esquema(pasta=pasta_csv, cache=pasta_cache):
+    arquivos = set(listar_arquivos_csv(pasta)) if os.path.isdir(pasta) else set()
+    return {os.path.basename(arquivo): entrada.get("esquema", {})
+            for arquivo, entrada in _ler_manifesto(cache).items() if arquivo in arquivos}
+
+
+def _completar(df, arquivo):
+    df["Arquivo"] = os.path.basename(arquivo)
+
+    # O ID vem do registro na hora da carga, então editar o registro não invalida o cache
+    df["ID"] = carregar_registro().identificar_linhas(df)
+    return df
+
+
+# Tipar um snapshot que ainda está na memória (por exemplo, recém-coletado), no formato do cache
+def preparar_snapshot(df, origem):
+    return _completar(_tipar(df.copy()), origem)
+
+
+# Abrir um snapshot já tipado a partir do cache
+def abrir_snapshot(arquivo, sha1, cache=pasta_cache):
+    return _completar(_abrir_snapshot(_caminho_snapshot(cache, sha1)), arquivo)
+
+
+# Mesmo que abrir_snapshot, mas em blocos de no máximo `linhas` linhas (memória limitada)
+def abrir_snapshot_em_blocos(arquivo, sha1, cache=pasta_cache, linhas=TAMANHO_BLOCO):
+    for bloco in _ler_blocos(_caminho_snapshot(cache, sha1), linhas):
+        yield _completar(bloco, arquivo)
+
+
+# Lista com um DataFrame por arquivo, na mesma ordem de listar_arquivos_csv
+def carregar_dataframes(pasta=pasta_csv, cache=pasta_cache):
+    return [abrir_snapshot(arquivo, sha1, cache) for arquivo, sha1 in sincronizar_cache(pasta, cache)]
+
+
+# Todos os snapshots em um único DataFrame, com a coluna Arquivo indicando a origem
+def carregar_snapshots(pasta=pasta_csv, cache=pasta_cache):
+    dataframes = carregar_dataframes(pasta, cache)
+    if not dataframes:
+        return pd.DataFrame(columns=COLUNAS_SNAPSHOT)
+    df = pd.concat(dataframes, ignore_index=True)
+
+    # Categorias diferentes entre arquivos viram object no concat; voltar para category
+    for coluna in COLUNAS_CATEGORICAS:
+        df[coluna] = df[coluna].astype("category")
+    return df
@@ -0,0 +1,253 @@
+import argparse
+import math
+import random
+import sys
+import threading
+from collections import namedtuple
+from itertools import islice
+
+import numpy as np
+
+# Classificação incremental: os valores atuais de cada nome ficam em uma lista ordenada
+# indexável (skip list com larguras), então trocar o preço de um nome custa O(log n), a posição
+# de qualquer nome sai em O(log n) e o top N em O(log n + N), sem reordenar tudo a cada coleta.
+# Cada lote de mudanças gera eventos de troca de posição no top N ("s1mple entrou no top 10").
+
+NIVEIS = 24  # suficiente para milhões de nomes
+
+# tipo: "entrou", "saiu", "subiu" ou "caiu"; de/para: posições (1 = primeiro; None = fora do top)
+EventoRanking = namedtuple("EventoRanking", ["instante", "nome", "tipo", "de", "para", "valor"])
+
+
+class _No:
+    __slots__ = ("chave", "proximos", "larguras")
+
+    def __init__(self, chave, niveis):
+        self.chave = chave
+        self.proximos = [None] * niveis
+        self.larguras = [1] * niveis
+
+
+# Lista ordenada de chaves distintas com inserção, remoção, posição e acesso por índice em O(log n)
+class ListaIndexada:
+    def __init__(self, semente=0):
+        self._cabeca = _No(None, NIVEIS)
+        self._tamanho = 0
+        self._sorteio = random.Random(semente)
+
+    def __len__(self):
+        return self._tamanho
+
+    def __iter__(self):
+        no = self._cabeca.proximos[0]
+        while no is not None:
+            yield no.chave
+            no = no.proximos[0]
+
+    # Último nó de cada nível com chave menor que a dada, e quantas posições cada um avança
+    def _caminho(self, chave):
+        anteriores, posicoes = [None] * NIVEIS, [0] * NIVEIS
+        no, posicao = self._cabeca, 0
+        for nivel in reversed(range(NIVEIS)):
+            while no.proximos[nivel] is not None and no.proximos[nivel].chave < chave:
+                posicao += no.larguras[nivel]
+                no = no.proximos[nivel]
+            anteriores[nivel], posicoes[nivel] = no, posicao
+        return anteriores, posicoes
+
+    def inserir(self, chave):
+        anteriores, posicoes = self._caminho(chave)
+        niveis = min(NIVEIS, 1 - int(math.log2(1.0 - self._sorteio.random())))
+        novo = _No(chave, niveis)
+        for nivel in range(niveis):
+            anterior = anteriores[nivel]
+            saltados = posicoes[0] - posicoes[nivel]
+            novo.proximos[nivel] = anterior.proximos[nivel]
+            anterior.proximos[nivel] = novo
+            novo.larguras[nivel] = anterior.larguras[nivel] - saltados
+            anterior.larguras[nivel] = saltados + 1
+        for nivel in range(niveis, NIVEIS):
+            anteriores[nivel].larguras[nivel] += 1
+        self._tamanho += 1
+
+    def remover(self, chave):
+        anteriores, _ = self._caminho(chave)
+        alvo = anteriores[0].proximos[0]
+        if alvo is None or alvo.chave != chave:
+            raise KeyError(chave)
+        for nivel in range(len(alvo.proximos)):
+            anterior = anteriores[nivel]
+            anterior.larguras[nivel] += alvo.larguras[nivel] - 1
+            anterior.proximos[nivel] = alvo.proximos[nivel]
+        for nivel in range(len(alvo.proximos), NIVEIS):
+            anteriores[nivel].larguras[nivel] -= 1
+        self._tamanho -= 1
+
+    # Posição (0 = primeira) de uma chave presente na lista
+    def posicao(self, chave):
+        anteriores, posicoes = self._caminho(chave)
+        if anteriores[0].proximos[0] is None or anteriores[0].proximos[0].chave != chave:
+            raise KeyError(chave)
+        return posicoes[0]
+
+    def __getitem__(self, indice):
+        if not 0 <= indice < self._tamanho:
+            raise IndexError(indice)
+        no, restante = self._cabeca, indice + 1
+        for nivel in reversed(range(NIVEIS)):
+            while no.proximos[nivel] is not None and no.larguras[nivel] <= restante:
+                restante -= no.larguras[nivel]
+                no = no.proximos[nivel]
+        return no.chave
+
+
+class Classificacao:
+    # n: tamanho do top acompanhado pelos eventos (as consultas aceitam qualquer tamanho)
+    # ordem: nomes na ordem de desempate entre valores iguais (a do registro, a mesma que o
+    # nlargest mantém); nomes fora dela desempatam depois, pela ordem em que apareceram
+    def __init__(self, n=10, ordem=()):
+        self.n = n
+        self._lista = ListaIndexada()
+        self._chaves = {}
+        self._desempate = {}
+        for i, nome in enumerate(ordem):
+            self._desempate.setdefault(nome, i)
+        self._fora_da_ordem = len(ordem)
+
+    def __len__(self):
+        return len(self._lista)
+
+    def __contains__(self, nome):
+        return nome in self._chaves
+
+    def _chave(self, nome, valor):
+        if nome not in self._desempate:
+            self._desempate[nome] = self._fora_da_ordem + len(self._desempate)
+        return (-valor, self._desempate[nome], nome)
+
+    def valor(self, nome):
+        return -self._chaves[nome][0] if nome in self._chaves else None
+
+    # Posição de um nome (1 = maior valor), ou None se ele não está classificado
+    def posicao(self, nome):
+        return self._lista.posicao(self._chaves[nome]) + 1 if nome in self._chaves else None
+
+    # [(nome, valor)] dos n maiores valores (padrão: o n da classificação)
+    def top(self, n=None):
+        return [(chave[2], -chave[0]) for chave in islice(self._lista, self.n if n is None else n)]
+
+    # Trocar o valor de um nome (None ou NaN tira o nome da classificação); sem eventos
+    def _trocar(self, nome, valor):
+        anterior = self._chaves.pop(nome, None)
+        if anterior is not None:
+            self._lista.remover(anterior)
+        if valor is not None and valor == valor:
+            self._chaves[nome] = self._chave(nome, float(valor))
+            self._lista.inserir(self._chaves[nome])
+
+    # Aplicar um lote de mudanças [(nome, valor)] e devolver as trocas de posição no top n.
+    # Valores iguais aos atuais são ignorados, então dá para passar o dia inteiro de uma vez.
+    def aplicar(self, valores, instante=None):
+        antes = {nome: posicao for posicao, (nome, _) in enumerate(self.top(), 1)}
+        mudou = False
+        for nome, valor in valores:
+            atual = self.valor(nome)
+            if atual == valor or (atual is None and (valor is None or valor != valor)):
+                continue
+            self._trocar(nome, valor)
+            mudou = True
+        if not mudou:
+            return []
+
+        depois = self.top()
+        eventos = []
+        for para, (nome, valor) in enumerate(depois, 1):
+            de = antes.get(nome)
+            if de is None:
+                eventos.append(EventoRanking(instante, nome, "entrou", None, para, valor))
+            elif para != de:
+                eventos.append(EventoRanking(instante, nome, "subiu" if para < de else "caiu", de, para, valor))
+        agora = {nome for nome, _ in depois}
+        for nome, de in antes.items():
+            if nome not in agora:
+                eventos.append(EventoRanking(instante, nome, "saiu", de, self.posicao(nome), self.valor(nome)))
+        return eventos
+
+
+# Percorre uma matriz (dias × nomes) aplicando na classificação só as células que mudaram de um
+# dia para o outro. Avançar é incremental; voltar para um dia anterior recomeça do início.
+class Reproducao:
+    def __init__(self, nomes, dias, valores, n=10):
+        self.nomes = list(nomes)
+        self.dias = list(dias)
+        self.valores = np.asarray(valores, dtype=float)
+        self.n = n
+        # A mesma reprodução pode ser consultada por mais de uma thread
+        self._trava = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.classificacao = Classificacao(self.n, self.nomes)
+        self.dia = -1
+        self._anterior = np.full(len(self.nomes), np.nan)
+
+    # Avançar até o dia (índice) dado e devolver os eventos dos dias percorridos
+    def avancar(self, dia):
+        dia = range(len(self.dias))[dia]
+        if dia < self.dia:
+            self._reiniciar()
+        eventos = []
+        for d in range(self.dia + 1, dia + 1):
+            linha = self.valores[d]
+            mudou = np.flatnonzero((linha != self._anterior) & ~(np.isnan(linha) & np.isnan(self._anterior)))
+            eventos += self.classificacao.aplicar(
+                ((self.nomes[i], linha[i]) for i in mudou), self.dias[d]
+            )
+            self._anterior = linha
+        self.dia = dia
+        return eventos
+
+    def top(self, dia, n=None):
+        with self._trava:
+            self.avancar(dia)
+            return self.classificacao.top(n)
+
+    # Todos os eventos da linha do tempo, do primeiro ao último dia
+    def eventos(self):
+        with self._trava:
+            self._reiniciar()
+            return self.avancar(len(self.dias) - 1) if self.dias else []
+
+
+def formatar_evento(evento, n=10, rotulo=""):
+    data = evento.instante.strftime("%Y-%m-%d") if hasattr(evento.instante, "strftime") else evento.instante
+    prefixo = f"{data} {rotulo}: " if rotulo else f"{data} "
+    valor = "" if evento.valor is None else f", ${evento.valor:.2f}"
+    if evento.tipo == "entrou":
+        return f"{prefixo}{evento.nome} entrou no top {n} (#{evento.para}{valor})"
+    if evento.tipo == "saiu":
+        fora = f"#{evento.para}" if evento.para is not None else "sem preço"
+        return f"{prefixo}{evento.nome} saiu do top {n} (#{evento.de} -> {fora}{valor})"
+    return f"{prefixo}{evento.nome} {evento.tipo} (#{evento.de} -> #{evento.para}{valor})"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trocas de posição no top N ao longo das coletas.")
+    parser.add_argument("-n", type=int, default=10, help="tamanho do top (padrão: %(default)s)")
+    parser.add_argument("--tipo", default="jogador")
+    parser.add_argument("--acabamento", default="Dourado")
+    parser.add_argument("--eliminatoria", action="store_true", help="só entidades da fase eliminatória")
+    args = parser.parse_args(argv)
+
+    from cubo import carregar_cubo
+
+    criterios = {"tipo": args.tipo, "acabamento": args.acabamento}
+    if args.eliminatoria:
+        criterios["eliminatoria"] = True
+    for evento in carregar_cubo().eventos_ranking(args.n, **criterios):
+        print(formatar_evento(evento, args.n))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
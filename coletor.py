@@ -0,0 +1,340 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import ssl
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+from carregador import COLUNAS_CSV, pasta_csv, preparar_snapshot
+from historico import Historico, pasta_historico
+
+# Busca do mercado da Steam em português, com resposta em JSON (norender=1)
+URL_MERCADO = "https://steamcommunity.com/market/search/render/"
+APP_CS2 = 730
+IDIOMA = "brazilian"
+
+# Categorias do catálogo (coluna tipo dos CSVs) e o filtro de busca de cada uma
+TIPOS = ["Legends", "Challengers", "Contenders", "Autographs"]
+PARAMETRO_TIPO = "category_730_StickerCategory[]"
+
+ITENS_POR_PAGINA = 100
+
+# Respostas que valem uma nova tentativa (limite de taxa e falhas temporárias do servidor)
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+# Menor intervalo entre requisições depois que o servidor pediu para ir mais devagar (s)
+INTERVALO_MINIMO = 0.05
+INTERVALO_MAXIMO = 5.0
+
+
+# ----- Cliente HTTP/1.1 com conexões persistentes reaproveitadas por host -----
+
+class RespostaHttp:
+    def __init__(self, status, cabecalhos, corpo):
+        self.status = status
+        self.cabecalhos = cabecalhos
+        self.corpo = corpo
+
+    def json(self):
+        return json.loads(self.corpo)
+
+
+class ErroHttp(Exception):
+    def __init__(self, resposta, url):
+        super().__init__(f"HTTP {resposta.status} em {url}")
+        self.resposta = resposta
+
+
+class ClienteHttp:
+    # Até conexoes_por_host conexões abertas ao mesmo tempo para cada host; as que terminam
+    # uma resposta completa voltam para o pool em vez de serem fechadas
+    def __init__(self, conexoes_por_host=8, tempo_limite=30.0, cabecalhos=None):
+        self.conexoes_por_host = conexoes_por_host
+        self.tempo_limite = tempo_limite
+        self.cabecalhos = {"User-Agent": "cs2-major-stickers-an", "Accept": "application/json", **(cabecalhos or {})}
+        self._livres = defaultdict(list)
+        self._vagas = {}
+        self.conexoes_abertas = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *erro):
+        await self.fechar()
+
+    def _vaga(self, origem):
+        if origem not in self._vagas:
+            self._vagas[origem] = asyncio.Semaphore(self.conexoes_por_host)
+        return self._vagas[origem]
+
+    async def _conectar(self, origem):
+        esquema, host, porta = origem
+        contexto = ssl.create_default_context() if esquema == "https" else None
+        self.conexoes_abertas += 1
+        return await asyncio.open_connection(host, porta, ssl=contexto)
+
+    async def get(self, url, params=None):
+        partes = urlsplit(url)
+        porta = partes.port or (443 if partes.scheme == "https" else 80)
+        origem = (partes.scheme, partes.hostname, porta)
+        caminho = partes.path or "/"
+        consulta = "&".join(filter(None, [partes.query, urlencode(params or {})]))
+        if consulta:
+            caminho += "?" + consulta
+
+        cabecalhos = {"Host": partes.netloc, "Connection": "keep-alive", **self.cabecalhos}
+        pedido = f"GET {caminho} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in cabecalhos.items()) + "\r\n"
+
+        async with self._vaga(origem):
+            if self._livres[origem]:
+                try:
+                    return await self._pedir(origem, self._livres[origem].pop(), pedido)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # O servidor pode ter fechado uma conexão ociosa do pool: tentar numa conexão nova
+                    pass
+            return await self._pedir(origem, await self._conectar(origem), pedido)
+
+    async def _pedir(self, origem, conexao, pedido):
+        leitor, escritor = conexao
+        try:
+            escritor.write(pedido.encode("latin-1"))
+            await escritor.drain()
+            resposta, manter = await asyncio.wait_for(self._ler_resposta(leitor), self.tempo_limite)
+        except BaseException:
+            escritor.close()
+            raise
+        if manter:
+            self._livres[origem].append(conexao)
+        else:
+            escritor.close()
+        return resposta
+
+    # Ler status, cabeçalhos e corpo (Content-Length, chunked ou até o fim da conexão)
+    async def _ler_resposta(self, leitor):
+        linha = await leitor.readuntil(b"\r\n")
+        versao, status = linha.decode("latin-1").split(" ", 2)[:2]
+        cabecalhos = {}
+        while (linha := await leitor.readuntil(b"\r\n")) != b"\r\n":
+            chave, _, valor = linha.decode("latin-1").partition(":")
+            cabecalhos[chave.strip().lower()] = valor.strip()
+
+        manter = versao == "HTTP/1.1" and cabecalhos.get("connection", "").lower() != "close"
+        if cabecalhos.get("transfer-encoding", "").lower() == "chunked":
+            partes = []
+            while tamanho := int((await leitor.readuntil(b"\r\n")).split(b";")[0], 16):
+                partes.append(await leitor.readexactly(tamanho))
+                await leitor.readexactly(2)
+            while await leitor.readuntil(b"\r\n") != b"\r\n":
+                pass
+            corpo = b"".join(partes)
+        elif "content-length" in cabecalhos:
+            corpo = await leitor.readexactly(int(cabecalhos["content-length"]))
+        else:
+            corpo, manter = await leitor.read(), False
+        return RespostaHttp(int(status), cabecalhos, corpo), manter
+
+    async def fechar(self):
+        escritores = [escritor for conexoes in self._livres.values() for _, escritor in conexoes]
+        self._livres.clear()
+        for escritor in escritores:
+            escritor.close()
+        for escritor in escritores:
+            try:
+                await escritor.wait_closed()
+            except OSError:
+                pass
+
+
+# Espaça as requisições para um mesmo host (no máximo por_segundo por segundo). Uma resposta
+# 429 empurra a próxima vaga para depois da espera pedida pelo servidor e dobra o intervalo,
+# para as requisições em espera não voltarem todas juntas
+class LimiteDeTaxa:
+    def __init__(self, por_segundo):
+        self.intervalo = 1 / por_segundo if por_segundo else 0.0
+        self._proxima = 0.0
+        self._pausa = 0.0
+
+    async def aguardar(self):
+        agora = time.monotonic()
+        vaga = max(self._proxima, agora)
+        self._proxima = vaga + self.intervalo
+        if vaga > agora:
+            await asyncio.sleep(vaga - agora)
+
+    def adiar(self, segundos):
+        agora = time.monotonic()
+        # Várias respostas 429 da mesma rajada contam como um único pedido para desacelerar
+        if agora >= self._pausa:
+            self.intervalo = min(max(self.intervalo * 2, INTERVALO_MINIMO), INTERVALO_MAXIMO)
+        self._pausa = max(self._pausa, agora + segundos)
+        self._proxima = max(self._proxima, self._pausa)
+
+
+# ----- Coletor do catálogo -----
+
+class Coletor:
+    # concorrencia: páginas em andamento ao mesmo tempo; taxa: requisições por segundo por host;
+    # tentativas: quantas vezes cada página é pedida antes de desistir
+    def __init__(self, url=URL_MERCADO, concorrencia=4, taxa=0.5, tentativas=5, espera_inicial=1.0,
+                 itens_por_pagina=ITENS_POR_PAGINA, cliente=None):
+        self.url = url
+        self.concorrencia = concorrencia
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.itens_por_pagina = itens_por_pagina
+        self.cliente = cliente
+        self._taxa = taxa
+        self._limites = {}
+        self.requisicoes = 0
+        self.repeticoes = 0
+
+    def _limite(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._limites:
+            self._limites[host] = LimiteDeTaxa(self._taxa)
+        return self._limites[host]
+
+    # Uma página de resultados, com novas tentativas e espera exponencial (com jitter) entre elas
+    async def _pagina(self, tipo, inicio):
+        params = {
+            "query": "", "start": inicio, "count": self.itens_por_pagina, "search_descriptions": 0,
+            "sort_column": "name", "sort_dir": "asc", "appid": APP_CS2, "norender": 1, "l": IDIOMA,
+            PARAMETRO_TIPO: f"tag_{tipo}",
+        }
+        limite = self._limite(self.url)
+        for tentativa in range(self.tentativas):
+            await limite.aguardar()
+            self.requisicoes += 1
+            try:
+                resposta = await self.cliente.get(self.url, params)
+                if resposta.status == 200:
+                    dados = resposta.json()
+                    if dados.get("success", True):
+                        return dados
+                elif resposta.status not in STATUS_REPETIR:
+                    raise ErroHttp(resposta, self.url)
+                elif resposta.status == 429:
+                    limite.adiar(float(resposta.cabecalhos.get("retry-after", self.espera_inicial)))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                if tentativa == self.tentativas - 1:
+                    raise
+            self.repeticoes += 1
+            await asyncio.sleep(self.espera_inicial * 2 ** tentativa * random.uniform(0.5, 1.0))
+        raise RuntimeError(f"Página {inicio} de {tipo} falhou {self.tentativas} vezes")
+
+    # Linhas nome, preco, quantidade, tipo, data_scraping de uma página
+    @staticmethod
+    def _linhas(dados, tipo):
+        data = datetime.date.today().isoformat()
+        return [
+            (item["name"], item.get("sell_price", 0) / 100, item.get("sell_listings", 0), tipo, data)
+            for item in dados.get("results", [])
+        ]
+
+    # Todas as páginas de um tipo: a primeira diz o total, as demais saem em paralelo
+    async def coletar_tipo(self, tipo, vagas):
+        async with vagas:
+            primeira = await self._pagina(tipo, 0)
+        total = primeira.get("total_count", 0)
+
+        async def pagina(inicio):
+            async with vagas:
+                return await self._pagina(tipo, inicio)
+
+        restantes = await asyncio.gather(*(pagina(inicio) for inicio in range(self.itens_por_pagina, total, self.itens_por_pagina)))
+        return [linha for dados in [primeira, *restantes] for linha in self._linhas(dados, tipo)]
+
+    # Catálogo completo dos tipos pedidos, no esquema dos CSVs de snapshot
+    async def coletar(self, tipos=TIPOS):
+        vagas = asyncio.Semaphore(self.concorrencia)
+        proprio = self.cliente is None
+        if proprio:
+            self.cliente = ClienteHttp(conexoes_por_host=self.concorrencia)
+        try:
+            por_tipo = await asyncio.gather(*(self.coletar_tipo(tipo, vagas) for tipo in tipos))
+        finally:
+            if proprio:
+                await self.cliente.fechar()
+                self.cliente = None
+
+        # A paginação pode repetir itens quando o catálogo muda durante a coleta
+        linhas = [linha for linhas in por_tipo for linha in linhas]
+        return pd.DataFrame(linhas, columns=COLUNAS_CSV).drop_duplicates("nome", keep="first")
+
+
+# Acrescentar a coleta ao histórico de alterações (só o que mudou desde a última coleta)
+def registrar_coleta(df, pasta=pasta_historico, instante=None):
+    instante = instante or datetime.datetime.now()
+    fonte = f"coleta {instante:%Y-%m-%d %H:%M:%S}"
+    return Historico(pasta).registrar_snapshot(preparar_snapshot(df, fonte), instante, fonte)
+
+
+# Gravar o snapshot como stickers_data_DDMM.csv (arquivo temporário + rename, para quem
+# estiver lendo a pasta nunca ver um CSV pela metade)
+def gravar_snapshot(df, pasta=pasta_csv, data=None):
+    data = data or datetime.date.today()
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"stickers_data_{data:%d%m}.csv")
+    temporario = caminho + ".tmp"
+    df[COLUNAS_CSV].to_csv(temporario, index=False, encoding="utf-8")
+    os.replace(temporario, caminho)
+    return caminho
+
+
+async def _coletar(args):
+    servidor = None
+    url = args.url
+    if args.mercado_falso:
+        from mercado_falso import iniciar_mercado
+
+        servidor, url = await iniciar_mercado(args.mercado_falso, latencia=args.latencia, falhas=args.falhas)
+    try:
+        coletor = Coletor(url, concorrencia=args.concorrencia, taxa=args.taxa, tentativas=args.tentativas,
+                          espera_inicial=args.espera)
+        inicio = time.perf_counter()
+        df = await coletor.coletar(args.tipos)
+        duracao = time.perf_counter() - inicio
+    finally:
+        if servidor is not None:
+            servidor.close()
+            await servidor.wait_closed()
+    print(f"{len(df)} adesivos em {duracao:.2f}s ({coletor.requisicoes} requisições, "
+          f"{coletor.repeticoes} repetidas)", file=sys.stderr)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coleta o catálogo de adesivos do mercado e grava as alterações no histórico.")
+    parser.add_argument("--url", default=URL_MERCADO, help="endpoint de busca do mercado")
+    parser.add_argument("--tipos", nargs="+", default=TIPOS, choices=TIPOS, help="categorias a coletar")
+    parser.add_argument("--historico", default=pasta_historico, help="pasta do histórico (padrão: %(default)s)")
+    parser.add_argument("--csv", nargs="?", const=pasta_csv, metavar="PASTA",
+                        help="também gravar o snapshot completo como CSV nesta pasta (padrão: %(const)s)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="páginas pedidas ao mesmo tempo")
+    parser.add_argument("--taxa", type=float, default=0.5, help="requisições por segundo por host (0 = sem limite)")
+    parser.add_argument("--tentativas", type=int, default=5, help="tentativas por página")
+    parser.add_argument("--espera", type=float, default=1.0, help="espera inicial (s) entre tentativas")
+    parser.add_argument("--mercado-falso", metavar="CSV",
+                        help="subir o mercado local com as páginas gravadas neste snapshot e coletar dele")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência (s) do mercado local")
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração de respostas 503 do mercado local")
+    parser.add_argument("--sem-gravar", action="store_true", help="só coletar e medir, sem gravar nada")
+    args = parser.parse_args(argv)
+
+    df = asyncio.run(_coletar(args))
+    if not args.sem_gravar:
+        print(f"{registrar_coleta(df, args.historico)} alterações gravadas em {args.historico}")
+        if args.csv:
+            print(gravar_snapshot(df, args.csv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+# Histórico consolidado em colunas .npy ordenadas por (id, instante), abertas com mmap.
+# deslocamentos[id]:deslocamentos[id + 1] é o trecho de cada adesivo em todas as colunas, então
+# "todas as observações de um adesivo entre duas datas" são fatias (views) dos arquivos mapeados:
+# nada é copiado e só as páginas tocadas são lidas do disco.
+
+COLUNAS_MAPEADAS = ["instante", "preco", "quantidade", "fonte"]
+ARQUIVO_INDICE = "indice.json"
+
+
+def _abrir(caminho):
+    try:
+        return np.load(caminho, mmap_mode="r")
+    except ValueError:
+        # Arquivo sem nenhum registro: não há o que mapear
+        return np.load(caminho)
+
+
+class ColunasMapeadas:
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self.deslocamentos = _abrir(os.path.join(pasta, "deslocamentos.npy"))
+        for coluna in COLUNAS_MAPEADAS:
+            setattr(self, coluna, _abrir(os.path.join(pasta, f"{coluna}.npy")))
+        with open(os.path.join(pasta, ARQUIVO_INDICE), encoding="utf-8") as f:
+            self.origem = json.load(f)["origem"]
+
+    def __len__(self):
+        return len(self.instante)
+
+    @property
+    def n_ids(self):
+        return len(self.deslocamentos) - 1
+
+    # ID de cada registro (reconstruído dos deslocamentos; só para leituras completas)
+    def ids(self):
+        return np.repeat(np.arange(self.n_ids, dtype=np.int32), np.diff(self.deslocamentos))
+
+    # Trecho [inicio, fim) dos registros de um adesivo; inicio e fim em ns (ou None)
+    def intervalo(self, id, inicio=None, fim=None):
+        if not 0 <= id < self.n_ids:
+            return 0, 0
+        a, b = int(self.deslocamentos[id]), int(self.deslocamentos[id + 1])
+        instantes = self.instante[a:b]
+        if fim is not None:
+            b = a + int(np.searchsorted(instantes, fim, side="left"))
+        if inicio is not None:
+            a = a + int(np.searchsorted(instantes, inicio, side="left"))
+        return a, max(a, b)
+
+    # Colunas de um adesivo entre dois instantes, como views dos arquivos mapeados
+    def fatia(self, id, inicio=None, fim=None):
+        a, b = self.intervalo(id, inicio, fim)
+        return {coluna: getattr(self, coluna)[a:b] for coluna in COLUNAS_MAPEADAS}
+
+
+# Gravar as colunas de registros já ordenados por (id, instante). A pasta nova é montada ao
+# lado e trocada no fim, para quem estiver lendo nunca ver um conjunto pela metade.
+def construir_colunas(pasta, registros, origem):
+    temporaria = pasta + ".tmp"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+
+    n_ids = int(registros["id"].max()) + 1 if len(registros) else 0
+    deslocamentos = np.searchsorted(registros["id"], np.arange(n_ids + 1), side="left").astype(np.int64)
+    np.save(os.path.join(temporaria, "deslocamentos.npy"), deslocamentos)
+    for coluna in COLUNAS_MAPEADAS:
+        np.save(os.path.join(temporaria, f"{coluna}.npy"), np.ascontiguousarray(registros[coluna]))
+    with open(os.path.join(temporaria, ARQUIVO_INDICE), "w", encoding="utf-8") as f:
+        json.dump({"registros": len(registros), "origem": origem}, f, indent=1)
+
+    antiga = pasta + ".antiga"
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(pasta):
+        os.replace(pasta, antiga)
+    os.replace(temporaria, pasta)
+    shutil.rmtree(antiga, ignore_errors=True)
+    return ColunasMapeadas(pasta)
+
+
+# Colunas da pasta, ou None se ainda não foram construídas (ou estão incompletas)
+def abrir_colunas(pasta):
+    try:
+        return ColunasMapeadas(pasta)
+    except (OSError, ValueError, KeyError):
+        return None
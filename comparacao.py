@@ -0,0 +1,201 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from nomes import ACABAMENTO_PAPEL
+from painel import SEM_OBSERVACAO, cache_por_painel
+from perfil import medir
+
+# Comparação entre torneios e acabamentos. O mesmo nome (equipe ou jogador) aparece uma vez por
+# Major, e cada Major é lançado em uma data diferente: para comparar, o eixo do tempo é "dias
+# desde o lançamento" do torneio. Todas as combinações (torneio × dias desde o lançamento ×
+# nome × acabamento) saem de uma única passada de bincount sobre o painel; as consultas só
+# fatiam e dividem os arrays já agregados.
+
+
+class Comparacao:
+    # soma, contagem e quantidade: (torneio × dias desde o lançamento × nome × acabamento)
+    def __init__(self, torneios, lancamentos, nomes, tipos, acabamentos, soma, contagem, quantidade):
+        self.torneios = list(torneios)
+        self.lancamentos = pd.DatetimeIndex(lancamentos, name="Lancamento")
+        self.nomes = np.asarray(nomes, dtype=object)
+        self.tipos = np.asarray(tipos, dtype=object)
+        self.acabamentos = list(acabamentos)
+        self.soma = soma
+        self.contagem = contagem
+        self.quantidade = quantidade
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.media = np.where(contagem > 0, soma / contagem, np.nan)
+
+    @property
+    def dias(self):
+        return pd.RangeIndex(self.media.shape[1], name="Dias_Desde_Lancamento")
+
+    def _torneios(self, torneios):
+        if torneios is None:
+            return list(range(len(self.torneios)))
+        faltando = [torneio for torneio in torneios if torneio not in self.torneios]
+        if faltando:
+            raise KeyError(f"Torneios sem dados: {', '.join(faltando)} (há: {', '.join(self.torneios)})")
+        return [self.torneios.index(torneio) for torneio in torneios]
+
+    def _acabamento(self, acabamento):
+        if acabamento not in self.acabamentos:
+            raise KeyError(f"Acabamento sem dados: {acabamento} (há: {', '.join(self.acabamentos)})")
+        return self.acabamentos.index(acabamento)
+
+    def _nomes(self, tipo, nomes):
+        selecionados = np.ones(len(self.nomes), dtype=bool)
+        if tipo is not None:
+            selecionados &= self.tipos == tipo
+        if nomes is not None:
+            selecionados &= np.isin(self.nomes, list(nomes))
+        return np.flatnonzero(selecionados)
+
+    # (torneios × dias × nomes) como DataFrame com colunas (Torneio, Nome), sem colunas vazias
+    def _quadro(self, valores, torneios, nomes):
+        colunas = pd.MultiIndex.from_product(
+            [[self.torneios[t] for t in torneios], self.nomes[nomes]], names=["Torneio", "Nome"]
+        )
+        matriz = valores[torneios][:, :, nomes].transpose(1, 0, 2).reshape(valores.shape[1], -1)
+        return pd.DataFrame(matriz, index=self.dias, columns=colunas).dropna(axis=1, how="all")
+
+    # Preço médio por dia desde o lançamento; sem acabamento, todos os acabamentos juntos
+    def precos(self, acabamento=None, torneios=None, tipo=None, nomes=None):
+        torneios, selecionados = self._torneios(torneios), self._nomes(tipo, nomes)
+        if acabamento is None:
+            contagem = self.contagem.sum(axis=3)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                valores = np.where(contagem > 0, self.soma.sum(axis=3) / contagem, np.nan)
+        else:
+            valores = self.media[..., self._acabamento(acabamento)]
+        return self._quadro(valores, torneios, selecionados)
+
+    # Ágio de um acabamento sobre outro do mesmo nome e torneio (0,5 = 50% mais caro)
+    def premio(self, acabamento="Dourado", base=ACABAMENTO_PAPEL, torneios=None, tipo=None, nomes=None):
+        torneios, selecionados = self._torneios(torneios), self._nomes(tipo, nomes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            valores = self.media[..., self._acabamento(acabamento)] / self.media[..., self._acabamento(base)] - 1
+        return self._quadro(valores, torneios, selecionados)
+
+    # Ágio de todos os acabamentos sobre a base, em formato longo (uma linha por combinação)
+    def premios(self, base=ACABAMENTO_PAPEL, torneios=None, tipo=None, nomes=None):
+        torneios, selecionados = self._torneios(torneios), self._nomes(tipo, nomes)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            valores = self.media / self.media[..., [self._acabamento(base)]] - 1
+        valores = valores[torneios][:, :, selecionados]
+        t, d, n, a = np.nonzero(~np.isnan(valores))
+        return pd.DataFrame({
+            "Torneio": np.asarray(self.torneios, dtype=object)[np.asarray(torneios)[t]],
+            "Dias_Desde_Lancamento": d,
+            "Nome": self.nomes[selecionados[n]],
+            "Acabamento": np.asarray(self.acabamentos, dtype=object)[a],
+            "Premio": valores[t, d, n, a],
+        })
+
+    # Média entre os nomes presentes em cada torneio (por exemplo, o ágio médio das equipes)
+    @staticmethod
+    def media_por_torneio(quadro):
+        return quadro.T.groupby(level="Torneio").mean().T
+
+    # Todas as células com dados em formato longo, para qualquer outro agrupamento
+    def tabela(self):
+        t, d, n, a = np.nonzero(self.contagem > 0)
+        return pd.DataFrame({
+            "Torneio": np.asarray(self.torneios, dtype=object)[t],
+            "Dias_Desde_Lancamento": d,
+            "Nome": self.nomes[n],
+            "Tipo": self.tipos[n],
+            "Acabamento": np.asarray(self.acabamentos, dtype=object)[a],
+            "Preco": self.media[t, d, n, a],
+            "Quantidade": self.quantidade[t, d, n, a],
+            "Adesivos": self.contagem[t, d, n, a],
+        })
+
+
+# Agregar o painel em (torneio × dias desde o lançamento × nome × acabamento) de uma vez.
+# O lançamento de cada torneio é o primeiro dia em que algum adesivo dele aparece nas coletas,
+# a não ser que venha em lancamentos ({torneio: data}, para coletas que começaram depois).
+@medir("comparacao.agregacao")
+def comparar_torneios(painel, lancamentos=None):
+    registro = painel.registro
+    adesivos = registro.adesivos
+    # Cápsulas e adesivos sem torneio ficam de fora: não há com o que comparar
+    incluidos = (adesivos["torneio"].fillna("") != "").to_numpy() & (adesivos["tipo"].fillna("") != "capsula").to_numpy()
+    codigo_torneio, torneios = pd.factorize(adesivos["torneio"].where(incluidos))
+    codigo_nome, nomes = pd.factorize(adesivos["nome"].where(incluidos))
+    tipos = adesivos["tipo"].fillna("").groupby(codigo_nome).first().reindex(range(len(nomes))).to_numpy()
+
+    # Preço 0 no catálogo significa "sem anúncios"
+    preco = painel.preco
+    valido = (painel.idade != SEM_OBSERVACAO) & (preco > 0) & incluidos
+
+    # Dia (posição no painel) do lançamento de cada torneio
+    dias, ids = np.nonzero(valido)
+    sem_dados = np.iinfo(np.int64).max
+    lancamento = np.full(len(torneios), sem_dados)
+    np.minimum.at(lancamento, codigo_torneio[ids], dias)
+    for torneio, data in (lancamentos or {}).items():
+        if torneio in torneios and painel.n_dias:
+            lancamento[torneios.get_loc(torneio)] = (pd.Timestamp(data) - painel.dias[0]).days
+
+    desde = dias - lancamento[codigo_torneio[ids]]
+    depois = desde >= 0
+    dias, ids, desde = dias[depois], ids[depois], desde[depois]
+
+    n_dias = int(desde.max()) + 1 if len(desde) else 0
+    forma = (len(torneios), n_dias, len(nomes), len(registro.acabamentos))
+    celula = np.ravel_multi_index(
+        (codigo_torneio[ids], desde, codigo_nome[ids], registro.acabamento_por_id[ids]), forma
+    )
+    tamanho = int(np.prod(forma))
+    soma = np.bincount(celula, weights=preco[dias, ids], minlength=tamanho).reshape(forma)
+    contagem = np.bincount(celula, minlength=tamanho).astype(np.int32).reshape(forma)
+    quantidade = np.bincount(celula, weights=painel.quantidade[dias, ids], minlength=tamanho).reshape(forma)
+
+    datas = [pd.NaT if dia == sem_dados else painel.dias[0] + pd.Timedelta(days=int(dia)) for dia in lancamento]
+    return Comparacao(torneios, datas, nomes, tipos, registro.acabamentos, soma, contagem, quantidade)
+
+
+# Uma comparação por conteúdo de painel (e por conjunto de datas de lançamento) no processo
+@cache_por_painel(4)
+def _comparacao(painel, lancamentos):
+    return comparar_torneios(painel, dict(lancamentos))
+
+
+def carregar_comparacao(lancamentos=None, **opcoes):
+    from cubo import carregar_painel
+
+    return _comparacao(carregar_painel(**opcoes), tuple(sorted((lancamentos or {}).items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ágio de um acabamento sobre outro por nome e torneio, alinhado pelos dias desde o lançamento."
+    )
+    parser.add_argument("acabamento", nargs="?", default="Dourado")
+    parser.add_argument("base", nargs="?", default=ACABAMENTO_PAPEL)
+    parser.add_argument("--torneios", nargs="+", help="torneios a comparar (padrão: todos)")
+    parser.add_argument("--tipo", default="equipe", help="equipe, jogador ou todos (padrão: %(default)s)")
+    parser.add_argument("--lancamento", nargs=2, action="append", default=[], metavar=("TORNEIO", "DATA"),
+                        help="data de lançamento de um torneio, se as coletas começaram depois dela")
+    parser.add_argument("--por-nome", action="store_true", help="uma coluna por nome, em vez da média do torneio")
+    args = parser.parse_args(argv)
+
+    comparacao = carregar_comparacao(dict(args.lancamento))
+    try:
+        quadro = comparacao.premio(args.acabamento, args.base, args.torneios, None if args.tipo == "todos" else args.tipo)
+    except KeyError as erro:
+        print(erro.args[0], file=sys.stderr)
+        return 1
+    for torneio, data in zip(comparacao.torneios, comparacao.lancamentos):
+        print(f"{torneio}: lançamento {data.date()}", file=sys.stderr)
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:+.1%}".format):
+        print(quadro if args.por_nome else Comparacao.media_por_torneio(quadro))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
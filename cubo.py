@@ -0,0 +1,214 @@
+import hashlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from carregador import pasta_cache, pasta_csv
+from classificacao import Reproducao
+from historico import carregar_historico, pasta_historico
+from painel import montar_painel
+from perfil import medir
+from qualidade import aplicar_qualidade
+from registro import carregar_registro
+
+# Medidas guardadas para cada (dia, entidade, acabamento); idade é a do valor mais antigo
+# entre os adesivos da célula (dias desde o último registro no histórico)
+MEDIDAS = ["soma", "contagem", "minimo", "maximo", "quantidade", "idade"]
+
+
+# Agregar o painel (dia × adesivo) em (dia × entidade × acabamento), só nos dias em que
+# houve coleta nova; adesivos não coletados no dia entram com o último valor visto.
+# Sempre o painel inteiro, de uma vez: as fatias por dia em disco (.cache/cubo-v1) deixaram
+# de valer a pena com o painel preenchido para a frente, porque um dia corrigido muda todos
+# os seguintes e ler as fatias custa mais que refazê-las (0,5 ms para os 13 dias reais,
+# 9 ms para 120 dias × 1.500 adesivos, contra 60 a 80 ms lendo as fatias)
+@medir("cubo.agregacao", linhas=lambda resultado: len(resultado[0]))
+def agregar_painel(painel):
+    registro = painel.registro
+    forma = (len(registro.entidades), len(registro.acabamentos))
+    linhas = np.flatnonzero(painel.observado.any(axis=1))
+    preco = painel.preco[linhas]
+    dias, ids = np.nonzero(~np.isnan(preco))
+    entidades = registro.entidade_por_id[ids]
+    validos = entidades >= 0
+    dias, ids, entidades = dias[validos], ids[validos], entidades[validos]
+
+    tamanho = len(linhas) * forma[0] * forma[1]
+    celula = (dias * forma[0] + entidades) * forma[1] + registro.acabamento_por_id[ids]
+    precos = preco[dias, ids]
+    medidas = {
+        "soma": np.bincount(celula, weights=precos, minlength=tamanho),
+        "contagem": np.bincount(celula, minlength=tamanho).astype(np.int32),
+        "minimo": np.full(tamanho, np.inf),
+        "maximo": np.full(tamanho, -np.inf),
+        "quantidade": np.bincount(celula, weights=painel.quantidade[linhas][dias, ids], minlength=tamanho),
+        "idade": np.full(tamanho, -np.inf),
+    }
+    np.minimum.at(medidas["minimo"], celula, precos)
+    np.maximum.at(medidas["maximo"], celula, precos)
+    np.maximum.at(medidas["idade"], celula, painel.idade[linhas][dias, ids].astype(float))
+    medidas = {medida: valores.reshape((len(linhas),) + forma) for medida, valores in medidas.items()}
+    return painel.dias[linhas], medidas
+
+
+# Resumo (sha1) de um resultado lido do cubo, para comparar a mesma leitura entre duas cargas
+def resumir(resultado):
+    h = hashlib.sha1(pd.util.hash_pandas_object(resultado, index=True).to_numpy().tobytes())
+    nomes = resultado.columns if isinstance(resultado, pd.DataFrame) else [resultado.name]
+    h.update(repr(list(nomes)).encode("utf-8"))
+    return h.hexdigest()
+
+
+class Cubo:
+    # Cada medida é um array (dia × entidade × acabamento); um dia por data de coleta real
+    def __init__(self, registro, dias, medidas, painel=None):
+        self.registro = registro
+        self.dias = pd.DatetimeIndex(dias, name="Data_Scraping")
+        self.painel = painel
+        self.leituras = None
+        self._reproducoes = {}
+        for medida in MEDIDAS:
+            setattr(self, medida, medidas[medida])
+
+    # Anotar as leituras feitas enquanto uma figura é montada: (função, argumentos, critérios,
+    # resumo do resultado). Repetir as mesmas leituras em um cubo novo diz se a figura mudou.
+    @contextmanager
+    def anotando_leituras(self):
+        self.leituras = []
+        try:
+            yield self.leituras
+        finally:
+            self.leituras = None
+
+    def anotar(self, funcao, args, criterios, resultado):
+        if self.leituras is not None:
+            self.leituras.append((funcao, args, criterios, resumir(resultado)))
+        return resultado
+
+    @property
+    def n_dias(self):
+        return len(self.dias)
+
+    # Entidades e acabamentos selecionados pelos mesmos critérios do registro; acabamento pode
+    # ser um só ou uma tupla deles
+    def _selecao(self, acabamento=None, tipo=None, torneio=None, eliminatoria=None):
+        entidades = np.flatnonzero(self.registro.mascara_entidades(tipo, torneio, eliminatoria))
+        if acabamento is None:
+            acabamentos = slice(None)
+        else:
+            escolhidos = [acabamento] if isinstance(acabamento, str) else acabamento
+            acabamentos = [self.registro.acabamentos.index(a) for a in escolhidos if a in self.registro.acabamentos]
+        return entidades, acabamentos
+
+    # Reduzir o eixo de acabamentos: (dias, entidades) de cada medida agregada
+    def _reduzir(self, dias, entidades, acabamentos):
+        def fatiar(valores):
+            return valores[dias][:, entidades][:, :, acabamentos]
+
+        contagem = fatiar(self.contagem).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = fatiar(self.soma).sum(axis=2) / contagem
+        minimo = fatiar(self.minimo).min(axis=2, initial=np.inf)
+        maximo = fatiar(self.maximo).max(axis=2, initial=-np.inf)
+        quantidade = fatiar(self.quantidade).sum(axis=2)
+        idade = fatiar(self.idade).max(axis=2, initial=-np.inf)
+
+        vazio = contagem == 0
+        reduzido = {"media": media, "minimo": minimo, "maximo": maximo, "quantidade": quantidade, "idade": idade}
+        for valores in reduzido.values():
+            valores[vazio] = np.nan
+        reduzido["contagem"] = contagem
+        return reduzido
+
+    def _indice_dias(self, dias):
+        return np.arange(self.n_dias)[dias if isinstance(dias, slice) else [dias]]
+
+    # Uma estatística por entidade em um dia (0 = primeiro, -1 = último), sem as entidades ausentes
+    def estatistica(self, dia, medida="media", **criterios):
+        entidades, acabamentos = self._selecao(**criterios)
+        valores = self._reduzir(self._indice_dias(dia), entidades, acabamentos)[medida][0]
+        nomes = self.registro.entidades["nome"].to_numpy()[entidades]
+        serie = pd.Series(valores, index=pd.Index(nomes, name="Nome"), name=medida)
+        return self.anotar(Cubo.estatistica, (dia, medida), criterios, serie.dropna())
+
+    # Preço médio por entidade em um dia
+    def precos(self, dia, **criterios):
+        return self.estatistica(dia, "media", **criterios).rename("Preco")
+
+    # Quantidade total de anúncios por entidade em um dia
+    def quantidades(self, dia, **criterios):
+        return self.estatistica(dia, "quantidade", **criterios).rename("Quantidade")
+
+    # Classificação incremental dos preços médios ao longo dos dias (por entidade, já que o mesmo
+    # nome pode aparecer em mais de um torneio); montada uma vez por critérios e tamanho do top
+    def reproducao(self, n=10, **criterios):
+        chave = (n,) + tuple(sorted(criterios.items()))
+        if chave not in self._reproducoes:
+            entidades, acabamentos = self._selecao(**criterios)
+            valores = self._reduzir(slice(None), entidades, acabamentos)["media"]
+            self._reproducoes[chave] = Reproducao(entidades, self.dias, valores, n)
+        return self._reproducoes[chave]
+
+    # Trocas de posição no top n ao longo de todos os dias, com os nomes das entidades
+    def eventos_ranking(self, n=10, **criterios):
+        nomes = self.registro.entidades["nome"].to_numpy()
+        return [evento._replace(nome=nomes[evento.nome]) for evento in self.reproducao(n, **criterios).eventos()]
+
+    # As n entidades mais caras de um dia, lidas da classificação incremental
+    def top(self, dia, n=10, **criterios):
+        pares = self.reproducao(**criterios).top(self._indice_dias(dia)[0], n)
+        nomes = self.registro.entidades["nome"].to_numpy()
+        serie = pd.Series(
+            [valor for _, valor in pares],
+            index=pd.Index(nomes[[entidade for entidade, _ in pares]], name="Nome"),
+            name="Preco",
+            dtype=float,
+        )
+        return self.anotar(Cubo.top, (dia, n), criterios, serie)
+
+    # Série temporal (dias × entidades) de uma estatística
+    def serie(self, medida="media", dias=slice(None), **criterios):
+        entidades, acabamentos = self._selecao(**criterios)
+        indice_dias = self._indice_dias(dias)
+        valores = self._reduzir(indice_dias, entidades, acabamentos)[medida]
+        nomes = self.registro.entidades["nome"].to_numpy()[entidades]
+        serie = pd.DataFrame(valores, index=self.dias[indice_dias], columns=pd.Index(nomes, name="Nome"))
+        return self.anotar(Cubo.serie, (medida, dias), criterios, serie.dropna(axis=1, how="all"))
+
+    # Série temporal dos preços médios
+    def serie_precos(self, **criterios):
+        return self.serie("media", **criterios)
+
+
+# Leituras anotadas em outro cubo que dão um resultado diferente neste
+def leituras_alteradas(cubo, leituras):
+    return [
+        (funcao, args, criterios, resumo)
+        for funcao, args, criterios, resumo in leituras
+        if resumir(funcao(cubo, *args, **criterios)) != resumo
+    ]
+
+
+# Observações de todo o histórico de alterações; os CSVs de csvs/ ainda não importados
+# entram no histórico antes da leitura
+def carregar_observacoes(pasta=pasta_csv, cache=pasta_cache, historico=pasta_historico):
+    return carregar_registro(), carregar_historico(historico, pasta, cache).observacoes()
+
+
+# Painel (dia de calendário × adesivo) com as linhas repetidas removidas e preenchido para a
+# frente, já verificado pela etapa de qualidade (modo: marcar, reparar ou desligado)
+def carregar_painel(pasta=pasta_csv, cache=pasta_cache, idade_maxima=None, historico=pasta_historico, qualidade=None):
+    registro, historico = carregar_registro(), carregar_historico(historico, pasta, cache)
+    # O painel é identificado pela versão do histórico, sem precisar ler as matrizes
+    assinatura = f"{historico.versao()}:{registro.assinatura}:{idade_maxima}"
+    painel = montar_painel(historico.observacoes(), registro, idade_maxima, assinatura)
+    return aplicar_qualidade(painel, qualidade, pasta, cache)
+
+
+# Cubo de todos os snapshots, com um dia por data de coleta
+@medir("cubo.carga")
+def carregar_cubo(pasta=pasta_csv, cache=pasta_cache, idade_maxima=None, historico=pasta_historico, qualidade=None):
+    painel = carregar_painel(pasta, cache, idade_maxima, historico, qualidade)
+    dias, medidas = agregar_painel(painel)
+    return Cubo(painel.registro, dias, medidas, painel)
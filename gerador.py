@@ -0,0 +1,142 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from carregador import COLUNAS_CSV
+from nomes import ACABAMENTO_PAPEL, ORDEM_ACABAMENTOS
+from registro import (
+    ARQUIVO_ADESIVOS, ARQUIVO_ENTIDADES, COLUNAS_ADESIVOS, COLUNAS_ENTIDADES, _ler_registro, pasta_registro,
+)
+
+# Snapshots sintéticos no mesmo esquema dos CSVs reais (nome,preco,quantidade,tipo,data_scraping
+# e nomes "Adesivo | <entidade> (<acabamento>) | <torneio>"), para medir o pipeline em escala.
+
+TORNEIO = "Xangai 2024"
+INICIO = "2024-12-08"
+
+# Registro real (ao lado deste arquivo), de onde vêm as equipes com logo
+pasta_registro_real = os.path.join(os.path.dirname(os.path.abspath(__file__)), pasta_registro)
+
+# Preço relativo de cada acabamento (o dourado é o mais caro, como no catálogo real)
+MULTIPLICADOR_ACABAMENTO = {"Papel": 1.0, "Holográfico": 4.0, "Purpurinado": 2.0, "Dourado": 30.0}
+ETAPAS_EQUIPES = ["Legends", "Challengers", "Contenders"]
+
+
+# Equipes da fase eliminatória do registro real (lido direto do disco, sem passar pelo cache
+# de carregar_registro, que é indexado pelo caminho relativo)
+def _equipes_reais():
+    entidades, _ = _ler_registro(pasta_registro_real)
+    return list(dict.fromkeys(entidades.loc[(entidades["tipo"] == "equipe") & entidades["eliminatoria"], "nome"]))
+
+
+# Equipes: as reais primeiro (têm logo em imgs/), depois sintéticas
+def _nomes_equipes(quantidade):
+    reais = _equipes_reais()[:quantidade]
+    return reais + [f"Equipe {i:03d}" for i in range(len(reais) + 1, quantidade + 1)]
+
+
+# As mesmas equipes e jogadores em cada torneio (a fase eliminatória só no primeiro); os
+# jogadores são distribuídos entre as equipes, em rodízio
+def _registro(equipes, jogadores, torneios):
+    eliminatorias = set(_equipes_reais())
+    entidades = []
+    for k, torneio in enumerate(torneios):
+        entidades += [
+            [nome, torneio, "equipe", ETAPAS_EQUIPES[i * len(ETAPAS_EQUIPES) // max(len(equipes), 1)], nome,
+             k == 0 and nome in eliminatorias]
+            for i, nome in enumerate(equipes)
+        ] + [[nome, torneio, "jogador", "Autographs", equipes[i % len(equipes)] if equipes else "", False]
+             for i, nome in enumerate(jogadores)]
+    entidades = pd.DataFrame(entidades, columns=COLUNAS_ENTIDADES)
+
+    adesivos = [
+        (nome, acabamento, torneio)
+        for nome, torneio in entidades[["nome", "torneio"]].itertuples(index=False)
+        for acabamento in ORDEM_ACABAMENTOS
+    ]
+    adesivos = pd.DataFrame([(i, *chave) for i, chave in enumerate(adesivos)], columns=COLUNAS_ADESIVOS)
+    return entidades, adesivos
+
+
+# Gerar registro/ e csvs/ em destino. linhas_por_arquivo acima do tamanho do catálogo repete
+# anúncios; fracao_atrasada é a parte das linhas que repete a coleta de um dia anterior
+# (como as linhas velhas dos CSVs reais). Com vários torneios, cada um é lançado
+# intervalo_lancamentos dias depois do anterior.
+def gerar_dados(destino, equipes=32, jogadores=160, snapshots=10, linhas_por_arquivo=None,
+                fracao_atrasada=0.25, torneios=(TORNEIO,), intervalo_lancamentos=0, inicio=INICIO, semente=0):
+    sorteio = np.random.default_rng(semente)
+    nomes_equipes = _nomes_equipes(equipes)
+    nomes_jogadores = [f"Jogador {i:04d}" for i in range(1, jogadores + 1)]
+    entidades, adesivos = _registro(nomes_equipes, nomes_jogadores, torneios)
+
+    pasta_registro = os.path.join(destino, "registro")
+    os.makedirs(pasta_registro, exist_ok=True)
+    entidades.to_csv(os.path.join(pasta_registro, ARQUIVO_ENTIDADES), index=False, encoding="utf-8")
+    adesivos.to_csv(os.path.join(pasta_registro, ARQUIVO_ADESIVOS), index=False, encoding="utf-8")
+
+    # Nome completo e categoria de cada adesivo
+    # (o papel não tem sufixo no catálogo: "Adesivo | G2 Esports | Xangai 2024")
+    sufixo = np.where(adesivos["acabamento"] == ACABAMENTO_PAPEL, "", " (" + adesivos["acabamento"] + ")")
+    nomes = ("Adesivo | " + adesivos["nome"] + sufixo + " | " + adesivos["torneio"]).to_numpy()
+    categoria = entidades.set_index(["nome", "torneio"])["etapa"].reindex(
+        pd.MultiIndex.from_frame(adesivos[["nome", "torneio"]])
+    ).to_numpy()
+    n = len(adesivos)
+    lancamento = adesivos["torneio"].map({t: k * intervalo_lancamentos for k, t in enumerate(torneios)}).to_numpy()
+
+    # Passeio aleatório multiplicativo nos preços e nas quantidades, um passo por dia
+    base = sorteio.lognormal(-1.0, 1.2, n) * adesivos["acabamento"].map(MULTIPLICADOR_ACABAMENTO).to_numpy()
+    precos = base * np.exp(np.cumsum(sorteio.normal(0, 0.08, (snapshots, n)), axis=0))
+    quantidades = np.maximum(
+        0, sorteio.poisson(30, n) + np.cumsum(sorteio.integers(-3, 3, (snapshots, n)), axis=0)
+    )
+    datas = pd.date_range(inicio, periods=snapshots, freq="D")
+
+    pasta_csvs = os.path.join(destino, "csvs")
+    os.makedirs(pasta_csvs, exist_ok=True)
+    arquivos = []
+    for dia, data in enumerate(datas):
+        # Cada linha aponta para um adesivo já lançado; acima do catálogo, anúncios repetidos
+        lancados = np.flatnonzero(lancamento <= dia)
+        total = linhas_por_arquivo or len(lancados)
+        linhas = lancados[np.arange(total) % len(lancados)]
+        # Linhas atrasadas repetem o valor e a data de um dia anterior (nunca de antes do lançamento)
+        atraso = np.where(sorteio.random(total) < fracao_atrasada, sorteio.integers(1, 4, total), 0)
+        origem = np.maximum(dia - atraso, lancamento[linhas])
+        df = pd.DataFrame({
+            "nome": nomes[linhas],
+            "preco": np.round(precos[origem, linhas], 2),
+            "quantidade": quantidades[origem, linhas],
+            "tipo": categoria[linhas],
+            "data_scraping": datas[origem].strftime("%Y-%m-%d"),
+        }, columns=COLUNAS_CSV)
+        # AAAAMMDD no nome para manter a ordem dos arquivos com qualquer número de dias
+        caminho = os.path.join(pasta_csvs, f"stickers_data_{data:%Y%m%d}.csv")
+        df.to_csv(caminho, index=False, encoding="utf-8")
+        arquivos.append(caminho)
+    return arquivos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera snapshots sintéticos no esquema dos CSVs reais.")
+    parser.add_argument("destino", help="pasta onde criar registro/ e csvs/")
+    parser.add_argument("--equipes", type=int, default=32)
+    parser.add_argument("--jogadores", type=int, default=160)
+    parser.add_argument("--snapshots", type=int, default=10)
+    parser.add_argument("--linhas", type=int, help="linhas por arquivo (padrão: uma por adesivo)")
+    parser.add_argument("--fracao-atrasada", type=float, default=0.25)
+    parser.add_argument("--torneios", nargs="+", default=[TORNEIO])
+    parser.add_argument("--intervalo-lancamentos", type=int, default=0, help="dias entre os lançamentos dos torneios")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+    arquivos = gerar_dados(args.destino, args.equipes, args.jogadores, args.snapshots, args.linhas,
+                           args.fracao_atrasada, args.torneios, args.intervalo_lancamentos, semente=args.semente)
+    print(f"{len(arquivos)} snapshots em {os.path.join(args.destino, 'csvs')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
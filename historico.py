@@ -0,0 +1,585 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import pandas as pd
+
+from carregador import abrir_snapshot_em_blocos, pasta_cache, pasta_csv, sincronizar_cache
+from colunas import COLUNAS_MAPEADAS, abrir_colunas, construir_colunas
+from painel import observacoes_em_fluxo
+from perfil import medir
+from registro import carregar_registro
+
+# Histórico de preços guardado como alterações, e não como uma cópia do catálogo por coleta:
+#   alteracoes-v2.log  registros de tamanho fixo (id, instante, preço, quantidade, fonte), só acrescentados
+#   coletas-v2.log  última coleta de cada adesivo por dia e fonte (id, instante, fonte), só acrescentadas
+#   dias-v2/AAAA-MM-DD.npz  alterações e coletas de um dia, ordenadas por (id, instante), geradas pela compactação
+#   colunas-v2/  todas as alterações consolidadas em colunas mapeadas em memória (ver colunas.py)
+#   estado-v2.npz  último valor e última coleta de cada adesivo, para decidir o que é alteração
+#   importados-v2.json  fontes (arquivos CSV e coletas) e o sha1 de cada CSV importado
+# Uma linha igual ao valor do adesivo na época não grava alteração, só a coleta (12 bytes por
+# adesivo e dia), então o valor de qualquer coleta é o da última alteração até ela, e a idade do
+# painel continua sendo "dias desde a última coleta", e não "desde a última mudança".
+# Linhas fora de ordem (um CSV mais antigo importado depois, ou um CSV corrigido à mão) não são
+# descartadas: os dias a partir da primeira delas são refeitos. Um CSV apagado de csvs/ sai do
+# histórico do mesmo jeito, na importação seguinte.
+
+pasta_historico = "historico"
+VERSAO_HISTORICO = 2
+
+ALTERACAO = np.dtype([("id", "<i4"), ("instante", "<i8"), ("preco", "<f8"), ("quantidade", "<i8"), ("fonte", "<i4")])
+COLETA = np.dtype([("id", "<i4"), ("instante", "<i8"), ("fonte", "<i4")])
+
+# Registros no log a partir dos quais uma gravação já dispara a compactação
+LIMITE_LOG = 100_000
+
+NS_POR_DIA = 86_400 * 10**9
+
+
+def _vazio(tipo=ALTERACAO):
+    return np.zeros(0, dtype=tipo)
+
+
+# Ordenar por (id, instante, fonte) e manter um registro por trio (o último gravado). Fontes
+# diferentes no mesmo instante ficam todas, na ordem dos códigos (a ordem de importação), para
+# que tirar uma delas devolva o valor das outras
+def _ordenar(alteracoes):
+    ordem = np.lexsort((alteracoes["fonte"], alteracoes["instante"], alteracoes["id"]))
+    alteracoes = alteracoes[ordem]
+    if len(alteracoes) > 1:
+        repetido = (alteracoes["id"][1:] == alteracoes["id"][:-1]) & (
+            alteracoes["instante"][1:] == alteracoes["instante"][:-1]
+        ) & (alteracoes["fonte"][1:] == alteracoes["fonte"][:-1])
+        alteracoes = alteracoes[np.append(~repetido, True)]
+    return alteracoes
+
+
+# Ordenar coletas por (id, instante), sem repetições exatas
+def _ordenar_coletas(coletas):
+    coletas = coletas[np.lexsort((coletas["fonte"], coletas["instante"], coletas["id"]))]
+    if len(coletas) > 1:
+        repetida = (coletas[1:] == coletas[:-1])
+        coletas = coletas[np.append(True, ~repetida)]
+    return coletas
+
+
+# Coletas de um conjunto de linhas: o último instante de cada (adesivo, dia, fonte)
+def _coletas_de(linhas):
+    dias = linhas["instante"] // NS_POR_DIA
+    ordem = np.lexsort((linhas["instante"], linhas["fonte"], dias, linhas["id"]))
+    linhas, dias = linhas[ordem], dias[ordem]
+    ultimas = np.ones(len(linhas), dtype=bool)
+    ultimas[:-1] = ((linhas["id"][1:] != linhas["id"][:-1]) | (dias[1:] != dias[:-1])
+                    | (linhas["fonte"][1:] != linhas["fonte"][:-1]))
+    coletas = np.empty(int(ultimas.sum()), dtype=COLETA)
+    for coluna in COLETA.names:
+        coletas[coluna] = linhas[coluna][ultimas]
+    return coletas
+
+
+# Para cada consulta (id, instante), o índice do último elemento de ordenados (por id, instante
+# e fonte) do mesmo id e com instante <= o da consulta (< com estrito); -1 se não há nenhum.
+# Com fontes, no instante da consulta só contam as fontes até a dela, inclusive.
+def _localizar(ordenados, ids, instantes, estrito=False, fontes=None):
+    n = len(ordenados)
+    todos_ids = np.concatenate([ordenados["id"], ids])
+    if fontes is None or estrito:
+        fontes = np.full(len(ids), -1 if estrito else np.iinfo(np.int32).max)
+    # Em instantes e fontes iguais, a consulta fica depois dos elementos (<=) ou antes deles (<)
+    lado = np.concatenate([np.full(n, estrito), np.full(len(ids), not estrito)])
+    ordem = np.lexsort((lado, np.concatenate([ordenados["fonte"], fontes]),
+                        np.concatenate([ordenados["instante"], instantes]), todos_ids))
+    # Os elementos já estão ordenados, então o maior índice visto até cada posição é o último deles
+    anteriores = np.maximum.accumulate(np.where(ordem < n, ordem, -1)) if len(ordem) else ordem
+    consultas = ordem >= n
+    indices = np.empty(len(ids), dtype=np.int64)
+    indices[ordem[consultas] - n] = anteriores[consultas]
+    achados = indices >= 0
+    achados[achados] = ordenados["id"][indices[achados]] == np.asarray(ids)[achados]
+    return np.where(achados, indices, -1)
+
+
+# Preço e quantidade de cada adesivo em cada instante: os da última alteração até ali
+# (NaN e -1 antes da primeira); com fontes, o valor que cada fonte via naquele instante
+def _valores(alteracoes, ids, instantes, estrito=False, fontes=None):
+    indices = _localizar(alteracoes, ids, instantes, estrito, fontes)
+    achados = indices >= 0
+    preco = np.full(len(indices), np.nan)
+    quantidade = np.full(len(indices), -1, dtype=np.int64)
+    preco[achados] = alteracoes["preco"][indices[achados]]
+    quantidade[achados] = alteracoes["quantidade"][indices[achados]]
+    return preco, quantidade
+
+
+# Linhas que mudam o valor do adesivo: comparadas com a linha anterior do mesmo adesivo ou, na
+# primeira de cada um, com o valor anterior dado
+def _alteradas(linhas, preco_anterior, quantidade_anterior):
+    ids = linhas["id"]
+    mesmo = np.append(False, ids[1:] == ids[:-1])
+    preco_anterior = np.where(mesmo, np.roll(linhas["preco"], 1), preco_anterior)
+    quantidade_anterior = np.where(mesmo, np.roll(linhas["quantidade"], 1), quantidade_anterior)
+    return linhas[(linhas["preco"] != preco_anterior) | (linhas["quantidade"] != quantidade_anterior)]
+
+
+def _inicio_do_dia(instante):
+    return int(instante) // NS_POR_DIA * NS_POR_DIA
+
+
+def _dia(instantes):
+    return (instantes // NS_POR_DIA).astype("datetime64[D]").astype(str)
+
+
+# Limites em ns de um intervalo [inicio, fim]; uma data sem hora no fim inclui o dia inteiro
+def _limites(inicio, fim):
+    if inicio is not None:
+        inicio = np.datetime64(inicio, "ns").astype(np.int64)
+    if fim is not None:
+        fim = np.datetime64(fim, "ns")
+        fim = (fim + np.timedelta64(1, "D") if fim == fim.astype("datetime64[D]") else fim + 1).astype(np.int64)
+    return inicio, fim
+
+
+def _gravar_atomico(caminho, gravar):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb") as f:
+        gravar(f)
+    os.replace(temporario, caminho)
+
+
+class Historico:
+    def __init__(self, pasta=pasta_historico):
+        self.pasta = pasta
+        self.arquivo_log = os.path.join(pasta, f"alteracoes-v{VERSAO_HISTORICO}.log")
+        self.arquivo_coletas = os.path.join(pasta, f"coletas-v{VERSAO_HISTORICO}.log")
+        self.pasta_dias = os.path.join(pasta, f"dias-v{VERSAO_HISTORICO}")
+        self.arquivo_estado = os.path.join(pasta, f"estado-v{VERSAO_HISTORICO}.npz")
+        self.arquivo_importados = os.path.join(pasta, f"importados-v{VERSAO_HISTORICO}.json")
+        self.pasta_colunas = os.path.join(pasta, f"colunas-v{VERSAO_HISTORICO}")
+        self._colunas = None
+        self._coletas = None
+
+    # ----- Leitura -----
+
+    # Registros de um log; um registro incompleto no fim (gravação interrompida) é ignorado
+    @staticmethod
+    def _ler_registros(caminho, tipo):
+        if not os.path.exists(caminho):
+            return _vazio(tipo)
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        return np.frombuffer(dados[: len(dados) - len(dados) % tipo.itemsize], dtype=tipo)
+
+    def ler_log(self):
+        return self._ler_registros(self.arquivo_log, ALTERACAO)
+
+    def ler_log_coletas(self):
+        return self._ler_registros(self.arquivo_coletas, COLETA)
+
+    def listar_dias(self):
+        if not os.path.isdir(self.pasta_dias):
+            return []
+        return sorted(arquivo[:-4] for arquivo in os.listdir(self.pasta_dias) if arquivo.endswith(".npz"))
+
+    # Alterações (prefixo "") ou coletas (prefixo "coleta_") gravadas no arquivo de um dia
+    def _ler_arquivo_dia(self, dia, tipo, prefixo):
+        caminho = os.path.join(self.pasta_dias, f"{dia}.npz")
+        if not os.path.exists(caminho):
+            return _vazio(tipo)
+        with np.load(caminho) as arquivo:
+            registros = np.empty(len(arquivo[prefixo + "id"]), dtype=tipo)
+            for coluna in tipo.names:
+                registros[coluna] = arquivo[prefixo + coluna]
+        return registros
+
+    def ler_dia(self, dia):
+        return self._ler_arquivo_dia(dia, ALTERACAO, "")
+
+    def ler_coletas_dia(self, dia):
+        return self._ler_arquivo_dia(dia, COLETA, "coleta_")
+
+    def _gravar_dia(self, dia, alteracoes, coletas):
+        colunas = {coluna: alteracoes[coluna] for coluna in ALTERACAO.names}
+        colunas.update({"coleta_" + coluna: coletas[coluna] for coluna in COLETA.names})
+        _gravar_atomico(os.path.join(self.pasta_dias, f"{dia}.npz"), lambda f: np.savez(f, **colunas))
+
+    # Arquivos de dia que deram origem às colunas (nome -> [mtime_ns, tamanho])
+    def _origem_dias(self):
+        origem = {}
+        for dia in self.listar_dias():
+            info = os.stat(os.path.join(self.pasta_dias, f"{dia}.npz"))
+            origem[dia] = [info.st_mtime_ns, info.st_size]
+        return origem
+
+    # Colunas mapeadas de todos os dias compactados, reconstruídas quando algum dia muda
+    def colunas(self):
+        origem = self._origem_dias()
+        if self._colunas is None or self._colunas.origem != origem:
+            self._colunas = abrir_colunas(self.pasta_colunas)
+            if self._colunas is None or self._colunas.origem != origem:
+                registros = _ordenar(np.concatenate([_vazio()] + [self.ler_dia(dia) for dia in origem]))
+                self._colunas = construir_colunas(self.pasta_colunas, registros, origem)
+        return self._colunas
+
+    # Todas as alterações (colunas consolidadas + log), ordenadas por (id, instante); inicio e fim
+    # são datas "AAAA-MM-DD" (ou instantes), inclusive
+    def alteracoes(self, inicio=None, fim=None):
+        colunas = self.colunas()
+        consolidadas = np.empty(len(colunas), dtype=ALTERACAO)
+        consolidadas["id"] = colunas.ids()
+        for coluna in COLUNAS_MAPEADAS:
+            consolidadas[coluna] = getattr(colunas, coluna)
+        alteracoes = _ordenar(np.concatenate([consolidadas, self.ler_log()]))
+
+        inicio, fim = _limites(inicio, fim)
+        if inicio is not None:
+            alteracoes = alteracoes[alteracoes["instante"] >= inicio]
+        if fim is not None:
+            alteracoes = alteracoes[alteracoes["instante"] < fim]
+        return alteracoes
+
+    # Todas as coletas (dias compactados + log), ordenadas por (id, instante)
+    def coletas(self):
+        origem = self._origem_dias()
+        if self._coletas is None or self._coletas[0] != origem:
+            compactadas = np.concatenate([_vazio(COLETA)] + [self.ler_coletas_dia(dia) for dia in origem])
+            self._coletas = (origem, compactadas)
+        return _ordenar_coletas(np.concatenate([self._coletas[1], self.ler_log_coletas()]))
+
+    # Registros de um adesivo entre inicio e fim (inclusive). Sem registros ainda no log, são
+    # views das colunas mapeadas (nenhuma cópia); com log, as poucas linhas dele são juntadas.
+    def serie(self, id, inicio=None, fim=None):
+        inicio, fim = _limites(inicio, fim)
+        fatia = self.colunas().fatia(id, inicio, fim)
+        log = self.ler_log()
+        log = log[(log["id"] == id)
+                  & (log["instante"] >= (inicio if inicio is not None else np.iinfo(np.int64).min))
+                  & (log["instante"] < (fim if fim is not None else np.iinfo(np.int64).max))]
+        if len(log) == 0:
+            return fatia
+
+        registros = np.empty(len(fatia["instante"]), dtype=ALTERACAO)
+        registros["id"] = id
+        for coluna in COLUNAS_MAPEADAS:
+            registros[coluna] = fatia[coluna]
+        registros = _ordenar(np.concatenate([registros, log]))
+        return {coluna: registros[coluna] for coluna in COLUNAS_MAPEADAS}
+
+    # Observações no formato do painel: uma por coleta, com o valor do adesivo naquele instante
+    @medir("historico.observacoes", linhas=lambda observacoes: len(observacoes["id"]))
+    def observacoes(self):
+        coletas = self.coletas()
+        preco, quantidade = _valores(self.alteracoes(), coletas["id"], coletas["instante"], fontes=coletas["fonte"])
+        # _deduplicar do painel fica com o último na ordem de chegada: ordenar pelo instante antes
+        # (no mesmo instante, as coletas já estão na ordem das fontes)
+        ordem = np.argsort(coletas["instante"], kind="stable")
+        return {
+            "id": coletas["id"][ordem].astype(np.int32),
+            "dia": coletas["instante"][ordem].astype("datetime64[ns]").astype("datetime64[D]"),
+            "preco": preco[ordem],
+            "quantidade": quantidade[ordem].astype(float),
+        }
+
+    # Versão do conteúdo: muda quando algum log cresce ou algum arquivo de dia é regravado
+    def versao(self):
+        return hashlib.sha1(json.dumps([self._origem_dias(), self._tamanhos_logs().tolist()]).encode()).hexdigest()[:16]
+
+    # ----- Estado (último valor e última coleta por adesivo) -----
+
+    def _tamanhos_logs(self):
+        return np.array([os.path.getsize(arquivo) if os.path.exists(arquivo) else 0
+                         for arquivo in (self.arquivo_log, self.arquivo_coletas)], dtype=np.int64)
+
+    def _ler_estado(self):
+        try:
+            with np.load(self.arquivo_estado) as arquivo:
+                estado = {chave: arquivo[chave] for chave in arquivo.files}
+        except (OSError, KeyError, ValueError):
+            estado = None
+        # Estado de outro tamanho de log (gravação interrompida entre os logs e o estado): refazer
+        tamanhos = self._tamanhos_logs()
+        if estado is None or not np.array_equal(estado["tamanhos_logs"], tamanhos):
+            estado = self._reconstruir_estado(tamanhos)
+        return estado
+
+    def _reconstruir_estado(self, tamanhos):
+        alteracoes, coletas = self.alteracoes(), self.coletas()
+        ultimas = alteracoes[np.append(alteracoes["id"][1:] != alteracoes["id"][:-1], True)] if len(alteracoes) else alteracoes
+        tamanho = max(int(alteracoes["id"].max()) + 1 if len(alteracoes) else 0,
+                      int(coletas["id"].max()) + 1 if len(coletas) else 0)
+        estado = {
+            "preco": np.full(tamanho, np.nan),
+            "quantidade": np.full(tamanho, -1, dtype=np.int64),
+            "visto": np.full(tamanho, np.iinfo(np.int64).min),
+            "tamanhos_logs": tamanhos,
+        }
+        estado["preco"][ultimas["id"]] = ultimas["preco"]
+        estado["quantidade"][ultimas["id"]] = ultimas["quantidade"]
+        np.maximum.at(estado["visto"], coletas["id"], coletas["instante"])
+        return estado
+
+    def _gravar_estado(self, estado):
+        _gravar_atomico(self.arquivo_estado, lambda f: np.savez(f, **estado))
+
+    # ----- Fontes (arquivos CSV e coletas) -----
+
+    def _ler_importados(self):
+        try:
+            with open(self.arquivo_importados, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"fontes": [], "arquivos": {}}
+
+    def _gravar_importados(self, importados):
+        _gravar_atomico(self.arquivo_importados,
+                        lambda f: f.write(json.dumps(importados, indent=1, ensure_ascii=False).encode("utf-8")))
+
+    # Código de uma fonte pelo nome (o mesmo arquivo, mesmo corrigido, mantém o código)
+    def _codigo_fonte(self, nome):
+        importados = self._ler_importados()
+        if nome not in importados["fontes"]:
+            importados["fontes"].append(nome)
+            self._gravar_importados(importados)
+        return importados["fontes"].index(nome)
+
+    # ----- Gravação -----
+
+    # Acrescentar as observações de uma fonte. Linhas mais novas que a última coleta de cada
+    # adesivo só viram alteração quando mudam o valor; linhas antigas com o valor da época só
+    # acrescentam a coleta; linhas antigas com outro valor (ou, com substituir, tudo o que a fonte
+    # já tinha gravado) fazem os dias a partir delas serem refeitos. Devolve quantas alterações
+    # o histórico ganhou.
+    @medir("historico.registro")
+    def registrar(self, ids, instantes, precos, quantidades, fonte="", substituir=False):
+        codigo = self._codigo_fonte(fonte)
+        linhas = np.empty(len(ids), dtype=ALTERACAO)
+        linhas["id"] = ids
+        linhas["instante"] = instantes
+        linhas["preco"] = precos
+        linhas["quantidade"] = quantidades
+        linhas["fonte"] = codigo
+        linhas = _ordenar(linhas[linhas["id"] >= 0])
+
+        if substituir:
+            coletas = self.coletas()
+            instantes = np.concatenate([linhas["instante"], coletas["instante"][coletas["fonte"] == codigo]])
+            if len(instantes) == 0:
+                return 0
+            return self._refazer(_inicio_do_dia(instantes.min()), linhas, remover=codigo)
+
+        estado = self._ler_estado()
+        tamanho = max(len(estado["preco"]), int(linhas["id"].max()) + 1 if len(linhas) else 0)
+        if tamanho > len(estado["preco"]):
+            falta = tamanho - len(estado["preco"])
+            estado["preco"] = np.append(estado["preco"], np.full(falta, np.nan))
+            estado["quantidade"] = np.append(estado["quantidade"], np.full(falta, -1, dtype=np.int64))
+            estado["visto"] = np.append(estado["visto"], np.full(falta, np.iinfo(np.int64).min))
+
+        novas = linhas["instante"] > estado["visto"][linhas["id"]]
+        antigas = linhas[~novas]
+        if len(antigas):
+            preco, quantidade = _valores(self.alteracoes(), antigas["id"], antigas["instante"], fontes=antigas["fonte"])
+            diferentes = (antigas["preco"] != preco) | (antigas["quantidade"] != quantidade)
+            if diferentes.any():
+                return self._refazer(_inicio_do_dia(antigas["instante"][diferentes].min()), linhas)
+
+        novas = linhas[novas]
+        alteradas = _alteradas(novas, estado["preco"][novas["id"]], estado["quantidade"][novas["id"]])
+        coletas = _coletas_de(linhas)
+        os.makedirs(self.pasta, exist_ok=True)
+        for arquivo, registros in ((self.arquivo_log, alteradas), (self.arquivo_coletas, coletas)):
+            if len(registros):
+                with open(arquivo, "ab") as f:
+                    f.write(registros.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+        estado["preco"][alteradas["id"]] = alteradas["preco"]
+        estado["quantidade"][alteradas["id"]] = alteradas["quantidade"]
+        np.maximum.at(estado["visto"], coletas["id"], coletas["instante"])
+        estado["tamanhos_logs"] = self._tamanhos_logs()
+        self._gravar_estado(estado)
+
+        if max(estado["tamanhos_logs"] // [ALTERACAO.itemsize, COLETA.itemsize]) >= LIMITE_LOG:
+            self.compactar()
+        return len(alteradas)
+
+    # Refazer alterações e coletas a partir de inicio (ns, começo de um dia): tudo o que já estava
+    # gravado desde então (menos a fonte removida) e as linhas novas são juntados em ordem de
+    # instante, e as alterações são recalculadas a partir do valor de cada adesivo antes do início
+    def _refazer(self, inicio, linhas, remover=None):
+        self.compactar()
+        alteracoes, coletas = self.alteracoes(), self.coletas()
+        antes_alteracoes = alteracoes["instante"] < inicio
+        antes_coletas = coletas["instante"] < inicio
+
+        # Observações já gravadas desde o início: as alterações e as coletas, com o valor da época
+        depois = coletas[~antes_coletas]
+        coletadas = np.empty(len(depois), dtype=ALTERACAO)
+        for coluna in COLETA.names:
+            coletadas[coluna] = depois[coluna]
+        coletadas["preco"], coletadas["quantidade"] = _valores(alteracoes, depois["id"], depois["instante"],
+                                                                fontes=depois["fonte"])
+        gravadas = np.concatenate([alteracoes[~antes_alteracoes], coletadas])
+        if remover is not None:
+            gravadas = gravadas[gravadas["fonte"] != remover]
+
+        # Linhas novas anteriores ao início têm o valor da época: só a coleta entra
+        anteriores = linhas[linhas["instante"] < inicio]
+        observacoes = np.concatenate([gravadas, linhas[linhas["instante"] >= inicio]])
+        # Em (instante, fonte) repetidos fica a linha nova (a última da concatenação)
+        ordenadas = _ordenar(observacoes)
+        preco, quantidade = _valores(alteracoes, ordenadas["id"], np.full(len(ordenadas), inicio), estrito=True)
+        alteradas = _alteradas(ordenadas, preco, quantidade)
+
+        novas_alteracoes = _ordenar(np.concatenate([alteracoes[antes_alteracoes], alteradas]))
+        novas_coletas = _ordenar_coletas(np.concatenate([
+            coletas[antes_coletas], _coletas_de(anteriores), _coletas_de(observacoes),
+        ]))
+        self._regravar_dias(_dia(np.int64(inicio)), novas_alteracoes, novas_coletas)
+        return max(0, len(novas_alteracoes) - len(alteracoes))
+
+    # Regravar os arquivos de dia a partir de um dia (inclusive) e recalcular o estado
+    def _regravar_dias(self, primeiro, alteracoes, coletas):
+        dias_alteracoes, dias_coletas = _dia(alteracoes["instante"]), _dia(coletas["instante"])
+        novos = set(np.unique(dias_alteracoes[dias_alteracoes >= primeiro])) | set(np.unique(dias_coletas[dias_coletas >= primeiro]))
+        for dia in sorted(novos):
+            self._gravar_dia(dia, alteracoes[dias_alteracoes == dia], coletas[dias_coletas == dia])
+        for dia in self.listar_dias():
+            if dia >= primeiro and dia not in novos:
+                os.remove(os.path.join(self.pasta_dias, f"{dia}.npz"))
+        self._gravar_estado(self._reconstruir_estado(self._tamanhos_logs()))
+        self.colunas()
+
+    # Registrar um snapshot já tipado e com a coluna ID (carregador); sem instante, vale a
+    # Data_Scraping de cada linha
+    def registrar_snapshot(self, df, instante=None, fonte=""):
+        if instante is None:
+            instantes = df["Data_Scraping"].to_numpy().astype("datetime64[ns]").astype(np.int64)
+        else:
+            instantes = np.full(len(df), np.datetime64(instante, "ns").astype(np.int64))
+        return self.registrar(df["ID"].to_numpy(), instantes, df["Preco"].to_numpy(dtype=float),
+                              df["Quantidade"].to_numpy(dtype=np.int64), fonte)
+
+    # Mover os logs para os arquivos de dia (juntando com o que já houver em cada dia) e esvaziá-los
+    @medir("historico.compactacao", linhas=int)
+    def compactar(self):
+        log, log_coletas = self.ler_log(), self.ler_log_coletas()
+        if len(log) == 0 and len(log_coletas) == 0:
+            return 0
+        estado = self._ler_estado()
+        dias_log, dias_coletas = _dia(log["instante"]), _dia(log_coletas["instante"])
+        for dia in np.union1d(dias_log, dias_coletas):
+            self._gravar_dia(
+                dia,
+                _ordenar(np.concatenate([self.ler_dia(dia), log[dias_log == dia]])),
+                _ordenar_coletas(np.concatenate([self.ler_coletas_dia(dia), log_coletas[dias_coletas == dia]])),
+            )
+
+        # Só depois de todos os dias gravados os logs são esvaziados (repetir a compactação é inofensivo)
+        _gravar_atomico(self.arquivo_log, lambda f: None)
+        _gravar_atomico(self.arquivo_coletas, lambda f: None)
+        estado["tamanhos_logs"] = self._tamanhos_logs()
+        self._gravar_estado(estado)
+        self.colunas()
+        return len(log)
+
+    # ----- Importação dos CSVs -----
+
+    # Importar os CSVs de snapshot novos ou alterados (pelo sha1). Um arquivo já importado que
+    # volta com outro conteúdo (corrigido à mão) substitui tudo o que ele tinha gravado, e um
+    # que sumiu da pasta tem tudo o que gravou removido. Devolve quantos arquivos mudaram.
+    @medir("historico.importacao")
+    def importar_csvs(self, pasta=pasta_csv, cache=pasta_cache):
+        if not os.path.isdir(pasta):
+            return 0
+        importados = self._ler_importados()
+        arquivos = sincronizar_cache(pasta, cache)
+        presentes = {os.path.basename(arquivo) for arquivo, _ in arquivos}
+        removidos = [nome for nome in importados["arquivos"] if nome not in presentes]
+        for nome in removidos:
+            self.remover(nome)
+
+        importados = self._ler_importados()
+        pendentes = []
+        for arquivo, sha1 in arquivos:
+            nome = os.path.basename(arquivo)
+            anterior = importados["arquivos"].get(nome)
+            if anterior is not None and anterior["sha1"] == sha1:
+                continue
+            observacoes = observacoes_em_fluxo(abrir_snapshot_em_blocos(arquivo, sha1, cache))
+            pendentes.append((nome, sha1, anterior is not None, observacoes))
+
+        # Na ordem das coletas (Data_Scraping), e não dos nomes: DDMM não tem ano e não ordena
+        # janeiro depois de dezembro
+        pendentes.sort(key=lambda pendente: int(pendente[3]["dia"].max().astype(np.int64)) if len(pendente[3]["dia"]) else 0)
+        for nome, sha1, corrigido, observacoes in pendentes:
+            gravados = self.registrar(observacoes["id"], observacoes["dia"].astype("datetime64[ns]").astype(np.int64),
+                                      observacoes["preco"], observacoes["quantidade"].astype(np.int64),
+                                      fonte=nome, substituir=corrigido)
+            importados = self._ler_importados()
+            importados["arquivos"][nome] = {"sha1": sha1, "alteracoes": gravados}
+            self._gravar_importados(importados)
+        return len(removidos) + len(pendentes)
+
+    # Tirar do histórico tudo o que uma fonte (um CSV importado ou uma coleta) gravou: os dias
+    # a partir da primeira coleta dela são refeitos sem ela. Devolve quantas coletas saíram.
+    def remover(self, fonte):
+        antes = len(self.coletas())
+        self.registrar(np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64), np.zeros(0),
+                       np.zeros(0, dtype=np.int64), fonte=fonte, substituir=True)
+        importados = self._ler_importados()
+        importados["arquivos"].pop(fonte, None)
+        self._gravar_importados(importados)
+        return antes - len(self.coletas())
+
+    # Tamanho em disco e contagens, para acompanhar o crescimento do histórico
+    def resumo(self):
+        log = self.ler_log()
+        dias = self.listar_dias()
+        registros_dias = sum(len(self.ler_dia(dia)) for dia in dias)
+        tamanho = sum(
+            os.path.getsize(os.path.join(raiz, arquivo))
+            for raiz, _, arquivos in os.walk(self.pasta) for arquivo in arquivos
+        ) if os.path.isdir(self.pasta) else 0
+        return {
+            "alteracoes": registros_dias + len(log),
+            "no_log": len(log),
+            "coletas": len(self.coletas()),
+            "dias": len(dias),
+            "importados": len(self._ler_importados()["arquivos"]),
+            "bytes": tamanho,
+        }
+
+
+# Preço e quantidade de um adesivo ao longo do tempo (índice: instante), por exemplo
+# serie_adesivo("G2 Esports", "Dourado", "Xangai 2024", "2024-12-10", "2024-12-14")
+def serie_adesivo(nome, acabamento, torneio, inicio=None, fim=None, pasta=pasta_historico):
+    id = carregar_registro().identificar(nome, acabamento, torneio)
+    serie = Historico(pasta).serie(id, inicio, fim)
+    indice = pd.DatetimeIndex(serie["instante"].astype("datetime64[ns]"), name="Instante")
+    return pd.DataFrame({"Preco": serie["preco"], "Quantidade": serie["quantidade"]}, index=indice)
+
+
+# Histórico com todos os CSVs de csvs/ já importados (os novos são importados na hora)
+def carregar_historico(pasta=pasta_historico, pasta_csvs=pasta_csv, cache=pasta_cache):
+    historico = Historico(pasta)
+    historico.importar_csvs(pasta_csvs, cache)
+    return historico
+
+
+if __name__ == "__main__":
+    comando = sys.argv[1] if len(sys.argv) > 1 else "resumo"
+    historico = Historico()
+    if comando == "importar":
+        print(f"{historico.importar_csvs(*sys.argv[2:3])} arquivos importados")
+    elif comando == "remover" and len(sys.argv) > 2:
+        print(f"{historico.remover(sys.argv[2])} coletas removidas")
+    elif comando == "compactar":
+        print(f"{historico.compactar()} alterações compactadas")
+    elif comando == "resumo":
+        print(json.dumps(historico.resumo(), indent=1))
+    else:
+        sys.exit(f"Comando desconhecido: {comando} (use importar, remover FONTE, compactar ou resumo)")
@@ -0,0 +1,97 @@
+import json
+import os
+
+import numpy as np
+
+from carregador import pasta_cache
+from perfil import etapa
+
+pasta_imgs = "imgs"  # Pasta com as logos das equipes
+
+# Escala das logos nos gráficos (o mesmo zoom=0.35 usado antes no OffsetImage)
+ZOOM_PADRAO = 0.35
+
+
+# Logos das equipes decodificadas e já redimensionadas para o tamanho final na tela.
+# O resultado fica em um .npz no cache, invalidado pelo mtime de cada PNG, e cada logo só é
+# lida do disco quando alguém pede por ela.
+class AtlasDeLogos:
+    def __init__(self, pasta=pasta_imgs, zoom=ZOOM_PADRAO, dpi=100, cache=pasta_cache):
+        self.pasta = pasta
+        self.zoom = zoom
+        self.dpi = dpi
+        self.arquivo = os.path.join(cache, f"logos-{zoom:g}-{dpi:g}.npz")
+        self._logos = {}
+        self._npz = None
+        self._mtimes = None
+
+    # Fator entre o tamanho do PNG e o tamanho em pixels na figura (OffsetImage usa pontos de 1/72")
+    @property
+    def escala(self):
+        return self.zoom * self.dpi / 72
+
+    def _abrir_cache(self):
+        if self._npz is None:
+            try:
+                self._npz = np.load(self.arquivo)
+                self._mtimes = json.loads(str(self._npz["_mtimes"]))
+            except (OSError, KeyError, ValueError):
+                self._npz, self._mtimes = {}, {}
+        return self._npz
+
+    def _redimensionar(self, caminho):
+        from PIL import Image
+
+        with Image.open(caminho) as imagem:
+            imagem = imagem.convert("RGBA")
+            largura = max(1, round(imagem.width * self.escala))
+            altura = max(1, round(imagem.height * self.escala))
+            return np.asarray(imagem.resize((largura, altura), Image.LANCZOS))
+
+    def _gravar_cache(self, nome, logo, mtime):
+        npz = self._abrir_cache()
+        logos = {chave: npz[chave] for chave in npz if chave != "_mtimes" and chave != nome}
+        logos[nome] = logo
+        self._mtimes[nome] = mtime
+        os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+        temporario = self.arquivo + ".tmp.npz"
+        np.savez(temporario, _mtimes=np.array(json.dumps(self._mtimes)), **logos)
+        os.replace(temporario, self.arquivo)
+        self._npz = np.load(self.arquivo)
+
+    # Array RGBA (uint8) da logo de uma equipe, ou None se não houver PNG
+    def logo(self, nome):
+        if nome not in self._logos:
+            caminho = os.path.join(self.pasta, f"{nome}.png")
+            if not os.path.exists(caminho):
+                self._logos[nome] = None
+            else:
+                mtime = os.stat(caminho).st_mtime_ns
+                npz = self._abrir_cache()
+                if self._mtimes.get(nome) == mtime and nome in npz:
+                    self._logos[nome] = npz[nome]
+                else:
+                    self._logos[nome] = self._redimensionar(caminho)
+                    self._gravar_cache(nome, self._logos[nome], mtime)
+        return self._logos[nome]
+
+    # OffsetImage desenhada no tamanho nativo do array (sem reamostrar na hora de desenhar)
+    def imagem(self, nome):
+        from matplotlib.offsetbox import OffsetImage
+
+        logo = self.logo(nome)
+        if logo is None:
+            return None
+        return OffsetImage(logo, zoom=1, dpi_cor=False, interpolation="none")
+
+
+_atlas = {}
+
+
+# Atlas compartilhado por todos os gráficos do processo (um por pasta, zoom e dpi)
+def carregar_atlas(pasta=pasta_imgs, zoom=ZOOM_PADRAO, dpi=100):
+    chave = (pasta, zoom, dpi)
+    if chave not in _atlas:
+        with etapa("logos.atlas"):
+            _atlas[chave] = AtlasDeLogos(pasta, zoom, dpi)
+    return _atlas[chave]
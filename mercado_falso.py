@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from carregador import COLUNAS_CSV, listar_arquivos_csv
+from coletor import ITENS_POR_PAGINA, PARAMETRO_TIPO
+
+# Mercado local que responde à mesma busca paginada do coletor (search/render com norender=1)
+# usando as páginas gravadas em um snapshot stickers_data_DDMM.csv. Serve para testar e medir
+# uma coleta completa sem rede: latência e falhas podem ser simuladas.
+
+CAMINHO_BUSCA = "/market/search/render/"
+
+
+class MercadoFalso:
+    # latencia: segundos antes de cada resposta; falhas: fração de respostas 503 aleatórias;
+    # limite: requisições por segundo antes de responder 429 com Retry-After
+    def __init__(self, snapshot, latencia=0.0, falhas=0.0, limite=None, semente=0):
+        catalogo = pd.read_csv(snapshot, encoding="utf-8", names=COLUNAS_CSV, header=0)
+        self.paginas = {
+            tipo: [
+                {
+                    "name": nome,
+                    "hash_name": nome,
+                    "sell_listings": int(quantidade),
+                    "sell_price": int(round(preco * 100)),
+                    "sell_price_text": f"${preco:.2f}",
+                }
+                for nome, preco, quantidade in grupo[["nome", "preco", "quantidade"]].itertuples(index=False)
+            ]
+            for tipo, grupo in catalogo.sort_values("nome", kind="stable").groupby("tipo", sort=False)
+        }
+        self.latencia = latencia
+        self.falhas = falhas
+        self.limite = limite
+        self._sorteio = random.Random(semente)
+        self._janela = (0.0, 0)
+        self.requisicoes = 0
+        self.conexoes = 0
+
+    # Corpo JSON de uma busca, no formato do mercado
+    def buscar(self, consulta):
+        parametros = {chave: valores[0] for chave, valores in parse_qs(consulta).items()}
+        tipo = parametros.get(PARAMETRO_TIPO, "").removeprefix("tag_")
+        itens = self.paginas.get(tipo, [])
+        inicio = int(parametros.get("start", 0))
+        quantidade = int(parametros.get("count", ITENS_POR_PAGINA))
+        return {
+            "success": True,
+            "start": inicio,
+            "pagesize": quantidade,
+            "total_count": len(itens),
+            "results": itens[inicio:inicio + quantidade],
+        }
+
+    # Status e corpo da resposta para um caminho pedido
+    def responder(self, alvo):
+        partes = urlsplit(alvo)
+        if partes.path != CAMINHO_BUSCA:
+            return 404, {}, {"success": False}
+
+        if self.limite:
+            agora = asyncio.get_running_loop().time()
+            segundo, contagem = self._janela
+            self._janela = (agora, 1) if agora - segundo >= 1 else (segundo, contagem + 1)
+            if self._janela[1] > self.limite:
+                return 429, {"Retry-After": "1"}, {"success": False}
+        if self.falhas and self._sorteio.random() < self.falhas:
+            return 503, {}, {"success": False}
+        return 200, {}, self.buscar(partes.query)
+
+    async def atender(self, leitor, escritor):
+        self.conexoes += 1
+        try:
+            while True:
+                try:
+                    linha = await leitor.readuntil(b"\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                _, alvo, versao = linha.decode("latin-1").split()
+                fechar = versao != "HTTP/1.1"
+                while (cabecalho := await leitor.readuntil(b"\r\n")) != b"\r\n":
+                    if cabecalho.lower().startswith(b"connection:") and b"close" in cabecalho.lower():
+                        fechar = True
+
+                self.requisicoes += 1
+                if self.latencia:
+                    await asyncio.sleep(self.latencia)
+                status, cabecalhos, dados = self.responder(alvo)
+                corpo = json.dumps(dados).encode("utf-8")
+                cabecalhos = {
+                    "Content-Type": "application/json; charset=utf-8",
+                    "Content-Length": len(corpo),
+                    "Connection": "close" if fechar else "keep-alive",
+                    **cabecalhos,
+                }
+                escritor.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Erro'}\r\n".encode("latin-1")
+                    + "".join(f"{k}: {v}\r\n" for k, v in cabecalhos.items()).encode("latin-1")
+                    + b"\r\n" + corpo
+                )
+                await escritor.drain()
+                if fechar:
+                    break
+        finally:
+            escritor.close()
+
+
+# Subir o mercado em uma porta livre de localhost; devolve o servidor asyncio e a URL de busca
+async def iniciar_mercado(snapshot, host="127.0.0.1", porta=0, **opcoes):
+    mercado = MercadoFalso(snapshot, **opcoes)
+    servidor = await asyncio.start_server(mercado.atender, host, porta)
+    servidor.mercado = mercado
+    host, porta = servidor.sockets[0].getsockname()[:2]
+    return servidor, f"http://{host}:{porta}{CAMINHO_BUSCA}"
+
+
+async def _servir(args):
+    servidor, url = await iniciar_mercado(args.snapshot, porta=args.porta, latencia=args.latencia,
+                                          falhas=args.falhas, limite=args.limite)
+    print(url, file=sys.stderr)
+    async with servidor:
+        await servidor.serve_forever()
+
+
+def main(argv=None):
+    arquivos = listar_arquivos_csv()
+    parser = argparse.ArgumentParser(description="Mercado local que serve as páginas de um snapshot gravado.")
+    parser.add_argument("snapshot", nargs="?", default=arquivos[-1] if arquivos else None,
+                        help="CSV com o catálogo a servir (padrão: o último snapshot)")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos antes de cada resposta")
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração de respostas 503")
+    parser.add_argument("--limite", type=float, help="requisições por segundo antes de responder 429")
+    args = parser.parse_args(argv)
+    if args.snapshot is None:
+        parser.error("nenhum snapshot encontrado")
+    try:
+        asyncio.run(_servir(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
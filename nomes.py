@@ -0,0 +1,79 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from perfil import medir
+
+# Um único padrão para os dois formatos do catálogo:
+#   "Adesivo | <nome> (<acabamento>) | <torneio>"  (acabamento opcional)
+#   "Cápsula de ... do <torneio>"
+PADRAO_NOME = re.compile(
+    r"^\s*(?:"
+    r"Adesivo\s*\|\s*(?P<nome>[^|(]+?)\s*(?:\((?P<acabamento>[^)]*)\))?\s*(?:\|\s*(?P<torneio>[^|]+?))?"
+    r"|(?P<capsula>C[áa]psula\b.*?(?P<torneio_capsula>\w+ \d{4})?)"
+    r")\s*$"
+)
+
+# O catálogo mistura nomes em português e inglês; tudo é normalizado para português
+ACABAMENTOS = {
+    "Gold": "Dourado",
+    "Holo": "Holográfico",
+    "Glitter": "Purpurinado",
+    "Foil": "Laminado",
+    "Lenticular": "Lenticular",
+    "Embroidered": "Bordado",
+}
+ACABAMENTO_PAPEL = "Papel"
+ORDEM_ACABAMENTOS = [ACABAMENTO_PAPEL, "Holográfico", "Purpurinado", "Dourado"]
+# Todos os acabamentos menos o papel. As médias e quantidades das equipes sempre foram só destes
+# (os scripts antigos não reconheciam o nome de um adesivo sem acabamento), e continuam sendo
+ACABAMENTOS_ESPECIAIS = tuple(
+    a for a in dict.fromkeys(ORDEM_ACABAMENTOS + list(ACABAMENTOS.values())) if a != ACABAMENTO_PAPEL
+)
+TORNEIOS = {
+    "Shanghai 2024": "Xangai 2024",
+    "Copenhagen 2024": "Copenhague 2024",
+    "Antwerp 2022": "Antuérpia 2022",
+    "Stockholm 2021": "Estocolmo 2021",
+}
+
+COLUNAS_NOME = ["Nome", "Acabamento", "Torneio", "Capsula"]
+
+# Cache de nomes já analisados (nome bruto -> (nome, acabamento, torneio, cápsula))
+_memo = {}
+
+
+def _analisar(nome_bruto):
+    m = PADRAO_NOME.match(nome_bruto)
+    if m is None:
+        return nome_bruto.strip(), None, None, False
+    if m.group("capsula") is not None:
+        torneio = m.group("torneio_capsula")
+        return m.group("capsula").strip(), None, TORNEIOS.get(torneio, torneio), True
+    acabamento = m.group("acabamento")
+    acabamento = ACABAMENTOS.get(acabamento, acabamento) if acabamento else ACABAMENTO_PAPEL
+    torneio = m.group("torneio")
+    return m.group("nome"), acabamento, TORNEIOS.get(torneio, torneio), False
+
+
+# Separar a coluna de nomes brutos em Nome, Acabamento, Torneio e Capsula.
+# Cada nome distinto é analisado uma única vez; as linhas só reaproveitam os códigos.
+@medir("nomes.analise", linhas=len)
+def analisar_nomes(serie):
+    categorias = serie.astype("category")
+    unicos = categorias.cat.categories
+    for nome_bruto in unicos:
+        if nome_bruto not in _memo:
+            _memo[nome_bruto] = _analisar(nome_bruto)
+
+    partes = list(zip(*(_memo[n] for n in unicos))) if len(unicos) else [(), (), (), ()]
+    codigos = categorias.cat.codes.to_numpy()
+    resultado = {}
+    for coluna, valores in zip(COLUNAS_NOME[:3], partes[:3]):
+        valores = pd.Categorical(valores)
+        # Mapear o código de cada nome bruto para o código da parte correspondente (-1 continua NaN)
+        novos_codigos = np.append(valores.codes, -1)[codigos]
+        resultado[coluna] = pd.Categorical.from_codes(novos_codigos, valores.categories)
+    resultado["Capsula"] = np.append(np.asarray(partes[3], dtype=bool), False)[codigos]
+    return pd.DataFrame(resultado, index=serie.index)
@@ -0,0 +1,186 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from perfil import medir
+
+# Cada snapshot repete linhas antigas: stickers_data_0912.csv ainda traz adesivos coletados
+# em 2024-12-08, e stickers_data_1512.csv foi coletado em 2024-12-16. Por isso a linha do
+# tempo é montada pela data de coleta de cada linha, e não pelo nome do arquivo.
+
+# Marca de "ainda não observado" na matriz de idades
+SEM_OBSERVACAO = -1
+
+
+# Junta as observações (adesivo, dia, preço, quantidade) de um snapshot, um bloco por vez.
+# Linhas repetidas do mesmo adesivo no mesmo dia contam uma vez só.
+class AcumuladorObservacoes:
+    def __init__(self):
+        self._partes = []
+
+    def adicionar(self, df):
+        ids = df["ID"].to_numpy()
+        validos = ids >= 0
+        self._partes.append(_deduplicar({
+            "id": ids[validos].astype(np.int32),
+            "dia": df["Data_Scraping"].to_numpy()[validos].astype("datetime64[D]"),
+            "preco": df["Preco"].to_numpy(dtype=float)[validos],
+            "quantidade": df["Quantidade"].to_numpy(dtype=float)[validos],
+        }))
+
+    def resultado(self):
+        if not self._partes:
+            return _observacoes_vazias()
+        return _deduplicar({chave: np.concatenate([parte[chave] for parte in self._partes])
+                            for chave in self._partes[0]})
+
+
+def _observacoes_vazias():
+    return {
+        "id": np.zeros(0, dtype=np.int32),
+        "dia": np.zeros(0, dtype="datetime64[D]"),
+        "preco": np.zeros(0),
+        "quantidade": np.zeros(0),
+    }
+
+
+# Uma observação por (adesivo, dia); em caso de repetição fica a última (a do snapshot mais novo)
+def _deduplicar(observacoes):
+    chave = observacoes["dia"].astype(np.int64) * (1 << 32) + observacoes["id"]
+    if len(chave) == 0:
+        return observacoes
+    # Ordenação estável: entre chaves iguais a ordem de chegada é preservada
+    ordem = np.argsort(chave, kind="stable")
+    chave = chave[ordem]
+    ultimas = ordem[np.append(chave[1:] != chave[:-1], True)]
+    return {coluna: valores[ultimas] for coluna, valores in observacoes.items()}
+
+
+# Observações de um snapshot lido em blocos
+@medir("painel.observacoes", linhas=lambda observacoes: len(observacoes["id"]))
+def observacoes_em_fluxo(blocos):
+    acumulador = AcumuladorObservacoes()
+    for bloco in blocos:
+        acumulador.adicionar(bloco)
+    return acumulador.resultado()
+
+
+class Painel:
+    # Matrizes (dia de calendário × adesivo). Dias sem coleta de um adesivo repetem a última
+    # observação; idade diz há quantos dias ela foi feita (0 = observado no dia,
+    # SEM_OBSERVACAO = ainda não apareceu ou passou da idade máxima)
+    # assinatura: identifica o conteúdo (por exemplo, a versão do histórico de onde o painel
+    # saiu); sem ela, é calculada das próprias matrizes na primeira vez que for pedida
+    def __init__(self, registro, dias, preco, quantidade, idade, assinatura=None):
+        self.registro = registro
+        self.dias = pd.DatetimeIndex(dias, name="Data_Scraping").as_unit("ns")
+        self.preco = preco
+        self.quantidade = quantidade
+        self.idade = idade
+        self._assinatura = assinatura
+        # Relatório da etapa de qualidade (qualidade.py), quando ela roda
+        self.qualidade = None
+
+    @property
+    def n_dias(self):
+        return len(self.dias)
+
+    # Mesma assinatura = mesmo conteúdo, mesmo em outro objeto ou processo (chave de caches)
+    @property
+    def assinatura(self):
+        if self._assinatura is None:
+            resumo = hashlib.sha1(self.registro.assinatura.encode())
+            for matriz in (self.dias.asi8, self.preco, self.quantidade, self.idade):
+                resumo.update(np.ascontiguousarray(matriz).tobytes())
+            self._assinatura = resumo.hexdigest()[:16]
+        return self._assinatura
+
+    # Adesivo coletado naquele dia (e não só repetido do dia anterior)
+    @property
+    def observado(self):
+        return self.idade == 0
+
+    # Dias de calendário em que houve pelo menos uma coleta nova
+    @property
+    def dias_observados(self):
+        return self.dias[self.observado.any(axis=1)]
+
+    # Formato longo: uma linha por (dia, adesivo) com valor, só as células preenchidas
+    def tabela(self):
+        dias, ids = np.nonzero(self.idade != SEM_OBSERVACAO)
+        return pd.DataFrame({
+            "Data_Scraping": self.dias[dias],
+            "ID": ids.astype(np.int32),
+            "Preco": self.preco[dias, ids],
+            "Quantidade": self.quantidade[dias, ids],
+            "Idade": self.idade[dias, ids],
+        })
+
+
+# Cache (LRU, até `maximo` resultados) de uma função cujo primeiro argumento é um painel,
+# pela assinatura dele e não pelo objeto: um painel remontado com o mesmo conteúdo acerta o
+# cache, e o cache não mantém painéis antigos vivos
+def cache_por_painel(maximo):
+    def decorador(funcao):
+        resultados = OrderedDict()
+        trava = threading.Lock()
+
+        @functools.wraps(funcao)
+        def envolvida(painel, *args, **kwargs):
+            chave = (painel.assinatura, args, tuple(sorted(kwargs.items())))
+            with trava:
+                if chave in resultados:
+                    resultados.move_to_end(chave)
+                    return resultados[chave]
+            resultado = funcao(painel, *args, **kwargs)
+            with trava:
+                resultados[chave] = resultado
+                while len(resultados) > maximo:
+                    resultados.popitem(last=False)
+            return resultado
+
+        envolvida.cache_clear = resultados.clear
+        return envolvida
+
+    return decorador
+
+
+# Montar o painel de todas as observações, de uma vez: deduplicar, espalhar nas matrizes
+# e preencher para a frente. Com idade_maxima, observações mais velhas que isso viram NaN.
+@medir("painel.montagem", linhas=lambda painel: painel.preco.size)
+def montar_painel(observacoes, registro, idade_maxima=None, assinatura=None):
+    observacoes = _deduplicar(observacoes)
+    n_adesivos = len(registro.adesivos)
+    if len(observacoes["dia"]) == 0:
+        vazio = np.zeros((0, n_adesivos))
+        return Painel(registro, [], vazio, vazio.copy(), vazio.astype(np.int32), assinatura)
+
+    primeiro = observacoes["dia"].min()
+    dias = np.arange(primeiro, observacoes["dia"].max() + 1)
+    linhas = (observacoes["dia"] - primeiro).astype(np.int64)
+    colunas = observacoes["id"]
+
+    # Para cada célula, a linha da última observação até aquele dia (-1 se ainda não houve)
+    ultima = np.full((len(dias), n_adesivos), -1, dtype=np.int64)
+    ultima[linhas, colunas] = linhas
+    ultima = np.maximum.accumulate(ultima, axis=0)
+
+    idade = np.where(ultima >= 0, np.arange(len(dias))[:, None] - ultima, SEM_OBSERVACAO)
+    if idade_maxima is not None:
+        idade[idade > idade_maxima] = SEM_OBSERVACAO
+    preenchido = idade != SEM_OBSERVACAO
+
+    def espalhar(valores):
+        observado = np.full((len(dias), n_adesivos), np.nan)
+        observado[linhas, colunas] = valores
+        # Valor da linha da última observação; NaN onde não há observação válida
+        preenchida = np.take_along_axis(observado, np.maximum(ultima, 0), axis=0)
+        preenchida[~preenchido] = np.nan
+        return preenchida
+
+    return Painel(registro, dias, espalhar(observacoes["preco"]), espalhar(observacoes["quantidade"]),
+                  idade.astype(np.int32), assinatura)
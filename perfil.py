@@ -0,0 +1,216 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+# Medição das etapas do pipeline (leitura, nomes, histórico, painel, agregação, figuras, GIF):
+# tempo, linhas e variação da memória residente de cada etapa, com um resumo no fim da execução
+# e, opcionalmente, um arquivo no formato Chrome trace (abrir em chrome://tracing ou Perfetto).
+#
+# Ligado pela variável de ambiente STICKERS_PERFIL ("1" só o resumo; um caminho .json grava
+# também o trace) ou pelo --perfil do render.py e do vigia.py. Desligado, etapa() devolve sempre
+# o mesmo objeto nulo e medir() chama a função direto: nada é medido nem guardado.
+
+VARIAVEL_AMBIENTE = "STICKERS_PERFIL"
+
+_ativo = False
+_arquivo_trace = None
+_eventos = []
+_local = threading.local()
+
+try:
+    _TAMANHO_PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _TAMANHO_PAGINA = None
+
+
+# Memória residente do processo em bytes (None fora do Linux)
+def _memoria_residente():
+    if _TAMANHO_PAGINA is None:
+        return None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _TAMANHO_PAGINA
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _pilha():
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+    return _local.pilha
+
+
+class _EtapaNula:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def contar(self, linhas):
+        pass
+
+
+_NULA = _EtapaNula()
+
+
+class _Etapa:
+    def __init__(self, nome, args):
+        self.nome = nome
+        self.args = args
+        self.linhas = None
+        self.filhos = 0
+
+    # Linhas processadas pela etapa (somadas quando contar é chamado mais de uma vez)
+    def contar(self, linhas):
+        self.linhas = (self.linhas or 0) + int(linhas)
+
+    def __enter__(self):
+        _pilha().append(self)
+        self.memoria = _memoria_residente()
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *erro):
+        duracao = time.perf_counter_ns() - self.inicio
+        memoria = _memoria_residente()
+        pilha = _pilha()
+        pilha.pop()
+        if pilha:
+            pilha[-1].filhos += duracao
+        _eventos.append({
+            "nome": self.nome,
+            "inicio": self.inicio,
+            "duracao": duracao,
+            "proprio": duracao - self.filhos,
+            "linhas": self.linhas,
+            "memoria": None if memoria is None or self.memoria is None else memoria - self.memoria,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.args,
+        })
+        return False
+
+
+def ativo():
+    return _ativo
+
+
+# Ligar a medição neste processo; com arquivo_trace, o trace é gravado no fim da execução
+def ativar(arquivo_trace=None):
+    global _ativo, _arquivo_trace
+    if not _ativo:
+        atexit.register(_encerrar)
+    _ativo = True
+    _arquivo_trace = arquivo_trace or _arquivo_trace
+
+
+# Contexto que mede um trecho: with etapa("csv.leitura", arquivo=...) as e: ...; e.contar(len(df))
+def etapa(nome, /, **args):
+    if not _ativo:
+        return _NULA
+    return _Etapa(nome, args)
+
+
+# Decorador que mede cada chamada da função; linhas(resultado) dá a contagem de linhas
+def medir(nome, linhas=None):
+    def decorar(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            with _Etapa(nome, {}) as e:
+                resultado = funcao(*args, **kwargs)
+                if linhas is not None:
+                    e.contar(linhas(resultado))
+                return resultado
+        return medida
+    return decorar
+
+
+# Eventos medidos até agora neste processo, removidos daqui (para um worker devolver ao principal)
+def retirar_eventos():
+    # Um worker criado por fork herda os eventos do pai: só os deste processo saem daqui
+    eventos = [evento for evento in _eventos if evento["pid"] == os.getpid()]
+    del _eventos[:]
+    return eventos
+
+
+# Juntar os eventos medidos em outro processo
+def incorporar(eventos):
+    _eventos.extend(eventos)
+
+
+# Totais por etapa, da que mais tomou tempo próprio para a que menos
+def resumo(eventos=None):
+    totais = {}
+    for evento in _eventos if eventos is None else eventos:
+        total = totais.setdefault(evento["nome"], {
+            "etapa": evento["nome"], "chamadas": 0, "total_ms": 0.0, "proprio_ms": 0.0, "maximo_ms": 0.0,
+            "linhas": None, "memoria_bytes": None,
+        })
+        total["chamadas"] += 1
+        total["total_ms"] += evento["duracao"] / 1e6
+        total["proprio_ms"] += evento["proprio"] / 1e6
+        total["maximo_ms"] = max(total["maximo_ms"], evento["duracao"] / 1e6)
+        if evento["linhas"] is not None:
+            total["linhas"] = (total["linhas"] or 0) + evento["linhas"]
+        if evento["memoria"] is not None:
+            total["memoria_bytes"] = (total["memoria_bytes"] or 0) + evento["memoria"]
+    return sorted(totais.values(), key=lambda total: total["proprio_ms"], reverse=True)
+
+
+def formatar_resumo(totais):
+    linhas = [f"{'etapa':32s} {'chamadas':>8s} {'total ms':>10s} {'próprio ms':>10s} {'máx ms':>9s} "
+              f"{'linhas':>10s} {'Δmem MiB':>9s}"]
+    for total in totais:
+        contagem = "" if total["linhas"] is None else str(total["linhas"])
+        memoria = "" if total["memoria_bytes"] is None else f"{total['memoria_bytes'] / 2**20:+.1f}"
+        linhas.append(f"{total['etapa']:32s} {total['chamadas']:8d} {total['total_ms']:10.1f} "
+                      f"{total['proprio_ms']:10.1f} {total['maximo_ms']:9.1f} {contagem:>10s} {memoria:>9s}")
+    return "\n".join(linhas)
+
+
+# Eventos no formato Chrome trace (eventos completos "X", tempos em microssegundos)
+def gravar_trace(caminho, eventos=None):
+    eventos = _eventos if eventos is None else eventos
+    trace = [
+        {
+            "name": evento["nome"],
+            "cat": evento["nome"].split(".")[0],
+            "ph": "X",
+            "ts": evento["inicio"] / 1000,
+            "dur": evento["duracao"] / 1000,
+            "pid": evento["pid"],
+            "tid": evento["tid"],
+            "args": {
+                **{chave: str(valor) for chave, valor in evento["args"].items()},
+                "linhas": evento["linhas"],
+                "memoria_bytes": evento["memoria"],
+            },
+        }
+        for evento in eventos
+    ]
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _encerrar():
+    if not _eventos:
+        return
+    print(formatar_resumo(resumo()), file=sys.stderr)
+    if _arquivo_trace:
+        gravar_trace(_arquivo_trace)
+        print(f"Trace em {_arquivo_trace}", file=sys.stderr)
+
+
+# Ligar pela variável de ambiente: "1"/"sim" só o resumo, qualquer outro valor é o arquivo do trace
+_valor = os.environ.get(VARIAVEL_AMBIENTE, "").strip()
+if _valor and _valor.lower() not in ("0", "nao", "não", "false"):
+    ativar(None if _valor.lower() in ("1", "sim", "true") else _valor)
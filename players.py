@@ -1,78 +1,87 @@
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-
-# Caminho da pasta CSV
-pasta_csv = "CSVS"
-
-# Listar todos os arquivos CSV na pasta (ordenando para pegar o primeiro e o último)
-arquivos_csv = sorted([os.path.join(pasta_csv, arquivo) for arquivo in os.listdir(pasta_csv) if arquivo.endswith(".csv")])
-
-# Lista para armazenar os DataFrames
-dataframes = []
+from functools import partial
 
-# Leitura dos arquivos CSV, ignorando a primeira linha e tratando caracteres especiais
-for arquivo in arquivos_csv:
-    df = pd.read_csv(arquivo, skiprows=1, encoding='utf-8', delimiter=',')
-
-    # Renomear colunas para garantir compatibilidade
-    df.columns = ["Nome", "Preco", "Quantidade", "Tipo", "Data_Scraping"]
-
-    # Limpar valores e converter as colunas necessárias
-    df["Preco"] = pd.to_numeric(df["Preco"].astype(str).str.replace(",", ".", regex=False), errors="coerce")
-    df["Quantidade"] = pd.to_numeric(df["Quantidade"], errors="coerce")
-    df["Data_Scraping"] = pd.to_datetime(df["Data_Scraping"], errors="coerce")
+import matplotlib.pyplot as plt
 
-    # Remover linhas com valores inválidos
-    df = df.dropna(subset=["Preco", "Quantidade", "Data_Scraping"])
-    dataframes.append(df)
+from analises import ranking
+from cubo import carregar_cubo
 
-# Garantir que temos pelo menos dois arquivos para análise
-if len(dataframes) < 2:
-    raise ValueError("É necessário pelo menos dois arquivos CSV para comparar os preços ao longo do tempo.")
 
-# Selecionar o primeiro e o último DataFrame
-df_primeiro = dataframes[0]
-df_ultimo = dataframes[-1]
+# Cubo de preços/quantidades por dia (só os CSVs novos ou alterados são processados de novo)
+def carregar_dados():
+    cubo = carregar_cubo()
 
-# Lista de nomes a serem ignorados (equipes e cápsulas)
-nomes_a_ignorar = [
-    "G2 Esports", "Natus Vincere", "Vitality", "Team Spirit", "MOUZ", "FaZe Clan", "HEROIC", "3DMAX",
-    "The MongolZ", "Team Liquid", "GamerLegion", "FURIA", "paiN Gaming", "BIG", "MIBR", "Wildcard",
-    "cápsula"
-]
+    # Garantir que temos pelo menos dois arquivos para análise
+    if cubo.n_dias < 2:
+        raise ValueError("É necessário pelo menos dois arquivos CSV para comparar os preços ao longo do tempo.")
+    return cubo
 
-# Filtrar os dados para incluir apenas os jogadores com adesivos dourados
-def filtrar_jogadores_dourados(df):
-    df["Nome"] = df["Nome"].str.replace("Adesivo |", "", regex=False).str.strip()
-    df["Tipo"] = df["Nome"].str.extract(r"\((.*?)\)")[0]
-    df["Nome"] = df["Nome"].str.split("(").str[0].str.strip()
-    return df[(~df["Nome"].isin(nomes_a_ignorar)) & (df["Tipo"] == "Dourado")]
 
-df_primeiro = filtrar_jogadores_dourados(df_primeiro)
-df_ultimo = filtrar_jogadores_dourados(df_ultimo)
+# Obter os 10 jogadores dourados mais relevantes (maiores preços, ou outro modo de ranking)
+# (equipes, cápsulas e organizador ficam de fora pelo tipo de entidade do registro)
+def top10_jogadores_dourados(cubo, dia, modo="preco"):
+    return ranking(cubo, modo, dia, 10, tipo="jogador", acabamento="Dourado")
 
-# Obter os 10 jogadores mais relevantes (maiores preços)
-df_primeiro_top10 = df_primeiro.groupby("Nome")["Preco"].mean().nlargest(10)
-df_ultimo_top10 = df_ultimo.groupby("Nome")["Preco"].mean().nlargest(10)
 
 # ----- FIGURA 1: Top 10 jogadores dourados no primeiro dia (barras horizontais) -----
-plt.figure(figsize=(10, 8))
-plt.barh(df_primeiro_top10.index, df_primeiro_top10.values, color="gold")
-plt.xlabel("Preço ($)")
-plt.ylabel("Nome do Jogador")
-plt.title("Top 10 Jogadores Dourados - Primeiro Dia")
-plt.tight_layout()
-plt.show()
+def figura_primeiro_dia(cubo):
+    df_primeiro_top10 = top10_jogadores_dourados(cubo, 0)
+    fig = plt.figure(figsize=(10, 8))
+    plt.barh(df_primeiro_top10.index, df_primeiro_top10.values, color="gold")
+    plt.xlabel("Preço ($)")
+    plt.ylabel("Nome do Jogador")
+    plt.title("Top 10 Jogadores Dourados - Primeiro Dia")
+    plt.tight_layout()
+    return fig
+
 
 # ----- FIGURA 2: Top 10 jogadores dourados no último dia (barras horizontais) -----
-plt.figure(figsize=(10, 8))
-plt.barh(df_ultimo_top10.index, df_ultimo_top10.values, color="darkgoldenrod")
-plt.xlabel("Preço ($)")
-plt.ylabel("Nome do Jogador")
-plt.title("Top 10 Jogadores Dourados - Último Dia")
-plt.tight_layout()
-plt.show()
+def figura_ultimo_dia(cubo):
+    df_ultimo_top10 = top10_jogadores_dourados(cubo, -1)
+    fig = plt.figure(figsize=(10, 8))
+    plt.barh(df_ultimo_top10.index, df_ultimo_top10.values, color="darkgoldenrod")
+    plt.xlabel("Preço ($)")
+    plt.ylabel("Nome do Jogador")
+    plt.title("Top 10 Jogadores Dourados - Último Dia")
+    plt.tight_layout()
+    return fig
+
+
+# ----- FIGURAS 3 em diante: Top 10 jogadores dourados no último dia pelos outros modos de ranking -----
+# modo -> (título, rótulo do eixo x, cor)
+RANKINGS = {
+    "retorno": ("Maiores Retornos Acumulados", "Retorno desde a primeira coleta", "seagreen"),
+    "volatilidade": ("Maior Volatilidade", "Desvio padrão dos retornos diários (janela móvel)", "purple"),
+    "drawdown": ("Maiores Quedas desde o Topo", "Queda em relação ao maior preço", "firebrick"),
+    "premio_dourado": ("Maior Ágio do Dourado sobre o Holográfico", "Preço dourado / holográfico - 1", "goldenrod"),
+    "esgotamento": ("Anúncios Esgotando Mais Rápido", "Fração dos anúncios que some por dia", "slategray"),
+}
+
+
+def figura_ranking(cubo, modo):
+    titulo, xlabel, cor = RANKINGS[modo]
+    df_ranking = top10_jogadores_dourados(cubo, -1, modo)
+    fig = plt.figure(figsize=(10, 8))
+    plt.barh(df_ranking.index, df_ranking.values, color=cor)
+    plt.xlabel(xlabel)
+    plt.ylabel("Nome do Jogador")
+    plt.title(f"Top 10 Jogadores Dourados - {titulo}")
+    plt.tight_layout()
+    return fig
+
+
+# Figuras deste script, na ordem em que são exibidas (nome -> função)
+FIGURAS = {
+    "jogadores_dourados_primeiro_dia": figura_primeiro_dia,
+    "jogadores_dourados_ultimo_dia": figura_ultimo_dia,
+    **{f"jogadores_dourados_{modo}": partial(figura_ranking, modo=modo) for modo in RANKINGS},
+}
+
+
+if __name__ == "__main__":
+    cubo = carregar_dados()
+    for criar_figura in FIGURAS.values():
+        criar_figura(cubo)
+        plt.show()
 
 
 ## Normal stickers
@@ -0,0 +1,302 @@
+import argparse
+import json
+import math
+import os
+import sys
+import warnings
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from perfil import medir
+
+# Etapa de qualidade dos dados, entre o painel (dia × adesivo) e a agregação. Tudo é calculado
+# de uma vez sobre as matrizes do painel:
+# - tipos e formas das matrizes, valores negativos ou infinitos;
+# - valores atípicos: o log do preço observado longe da mediana móvel (centrada) do próprio
+#   adesivo, em desvios robustos (MAD);
+# - trocas prováveis: dois adesivos do mesmo tipo e acabamento que, no mesmo dia, saltam em
+#   sentidos opostos para o valor anterior um do outro (linhas trocadas no CSV); a troca é
+#   confirmada quando a observação seguinte de ambos volta ao nível anterior.
+# Com o modo "marcar" (padrão) só o relatório é gravado; com "reparar" os valores atípicos
+# viram a mediana móvel e as trocas confirmadas são desfeitas, no painel da carga: os CSVs e
+# o histórico ficam como foram coletados e ninguém precisa limpar arquivo à mão.
+
+MODOS = ["marcar", "reparar", "desligado"]
+ARQUIVO_RELATORIO = "qualidade.json"
+
+JANELA = 7  # dias de calendário da mediana móvel, centrada no dia testado
+MINIMO_JANELA = 4  # observações mínimas na janela para testar um valor
+LIMIAR = 5.0  # desvios robustos (1,4826 × MAD) para um valor ser atípico
+PISO = 0.10  # desvio robusto mínimo, em log (séries quase constantes)
+DESVIO_MINIMO = 0.05  # diferença mínima em $ (centavos de oscilação não contam)
+SALTO = math.log(2)  # salto mínimo (em log) de cada lado de uma troca
+# Distância máxima (em log) entre o valor de um e o anterior do outro: log 1,4, porque o preço
+# pode andar entre as duas coletas (no exemplo G2/FaZe dourados de 13 para 14/12, 36%)
+TOLERANCIA_TROCA = 0.35
+REDUCAO_TROCA = 0.2  # desfeita a troca, os saltos somados caem para no máximo esta fração
+
+TIPOS_PAINEL = {"preco": np.float64, "quantidade": np.float64, "idade": np.int32}
+
+
+# Modo da etapa: o dado, ou STICKERS_QUALIDADE, ou "marcar"
+def modo_qualidade(modo=None):
+    modo = modo or os.environ.get("STICKERS_QUALIDADE") or "marcar"
+    if modo not in MODOS:
+        raise ValueError(f"Modo de qualidade desconhecido: {modo} (use {', '.join(MODOS)})")
+    return modo
+
+
+# Mediana e desvio robusto móveis (dias × adesivos), ignorando NaN, e quantos valores há na janela
+def _estatisticas_moveis(valores, janela=JANELA):
+    meio = janela // 2
+    janelas = sliding_window_view(np.pad(valores, ((meio, meio), (0, 0)), constant_values=np.nan), janela, axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # janelas sem nenhum valor
+        mediana = np.nanmedian(janelas, axis=2)
+        mad = np.nanmedian(np.abs(janelas - mediana[:, :, None]), axis=2)
+    return mediana, np.maximum(1.4826 * mad, PISO), (~np.isnan(janelas)).sum(axis=2)
+
+
+# Problemas de tipo, forma e valores das matrizes do painel
+def _verificar_tipos(painel):
+    problemas = []
+    forma = (painel.n_dias, len(painel.registro.adesivos))
+    for nome, tipo in TIPOS_PAINEL.items():
+        matriz = getattr(painel, nome)
+        if matriz.dtype != tipo:
+            problemas.append(f"{nome}: tipo {matriz.dtype}, esperado {np.dtype(tipo)}")
+        if matriz.shape != forma:
+            problemas.append(f"{nome}: forma {matriz.shape}, esperada {forma}")
+    for nome in ("preco", "quantidade"):
+        matriz = getattr(painel, nome)
+        for rotulo, contagem in (("negativos", np.sum(matriz < 0)), ("infinitos", np.sum(np.isinf(matriz)))):
+            if contagem:
+                problemas.append(f"{nome}: {int(contagem)} valores {rotulo}")
+    return problemas
+
+
+# Pares (dia, i, j, reverte) de trocas prováveis entre adesivos do mesmo grupo. Os candidatos
+# (células com salto grande) de cada (dia, grupo) formam um bloco, e todos os pares de todos os
+# blocos são testados de uma vez.
+def _trocas(atual, anterior, seguinte, grupo):
+    salto = atual - anterior
+    with np.errstate(invalid="ignore"):
+        dias, ids = np.nonzero(np.abs(salto) >= SALTO)
+    if len(dias) == 0:
+        return []
+    ordem = np.lexsort((ids, grupo[ids], dias))
+    dias, ids = dias[ordem], ids[ordem]
+    comeco = np.append(True, (dias[1:] != dias[:-1]) | (grupo[ids][1:] != grupo[ids][:-1]))
+    inicios = np.flatnonzero(comeco)
+    bloco = np.cumsum(comeco) - 1
+    tamanhos = np.diff(np.append(inicios, len(dias)))[bloco]
+    # x percorre os candidatos e y, para cada x, todos os candidatos do mesmo bloco
+    x = np.repeat(np.arange(len(dias)), tamanhos)
+    y = np.repeat(inicios[bloco], tamanhos) + np.arange(len(x)) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+    d, i, j = dias[x], ids[x], ids[y]
+
+    # ida: valor de i hoje contra o de j antes; volta: o contrário
+    ida = np.abs(atual[d, i] - anterior[d, j])
+    volta = np.abs(atual[d, j] - anterior[d, i])
+    possiveis = (
+        (np.maximum(ida, volta) <= TOLERANCIA_TROCA)
+        & (ida + volta <= REDUCAO_TROCA * (np.abs(salto[d, i]) + np.abs(salto[d, j])))
+        & (np.sign(salto[d, i]) != np.sign(salto[d, j]))
+    )
+    # Só pares sem ambiguidade: cada um combina com exatamente um outro
+    unicos = np.bincount(x[possiveis], minlength=len(dias)) == 1
+    pares = possiveis & unicos[x] & unicos[y] & (i < j)
+    d, i, j = d[pares], i[pares], j[pares]
+    ordem = np.lexsort((j, i, d))
+    d, i, j = d[ordem], i[ordem], j[ordem]
+
+    # Confirmada quando a observação seguinte de ambos volta ao valor anterior
+    sem_seguinte = np.isnan(seguinte[d, i]) | np.isnan(seguinte[d, j])
+    with np.errstate(invalid="ignore"):
+        reverte = ((np.abs(seguinte[d, i] - anterior[d, i]) <= TOLERANCIA_TROCA)
+                   & (np.abs(seguinte[d, j] - anterior[d, j]) <= TOLERANCIA_TROCA))
+    trocas, desfeitas = [], set()
+    for dia, a, b, sem, volta in zip(d.tolist(), i.tolist(), j.tolist(), sem_seguinte, reverte):
+        # A volta de uma troca confirmada é a próxima troca do mesmo par: faz parte dela
+        if (a, b) in desfeitas:
+            desfeitas.discard((a, b))
+            continue
+        confirmada = None if sem else bool(volta)
+        if confirmada:
+            desfeitas.add((a, b))
+        trocas.append((dia, a, b, confirmada))
+    return trocas
+
+
+def _descrever(adesivos, i):
+    linha = adesivos.iloc[i]
+    return {campo: (None if linha[campo] != linha[campo] else str(linha[campo])) for campo in ("nome", "acabamento", "torneio")}
+
+
+# Verificar o painel e, no modo "reparar", devolver um painel corrigido. O relatório fica em
+# painel.qualidade.
+@medir("qualidade.verificacao", linhas=lambda painel: painel.preco.size)
+def verificar_painel(painel, modo=None):
+    from painel import SEM_OBSERVACAO
+
+    modo = modo_qualidade(modo)
+    if modo == "desligado":
+        painel.qualidade = None
+        return painel
+
+    adesivos = painel.registro.adesivos
+    preco, idade = painel.preco, painel.idade
+    n_dias = painel.n_dias
+    observado = (idade == 0) & (preco > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atual = np.where(observado, np.log(preco), np.nan)
+        # Último valor conhecido antes do dia (o painel já vem preenchido para a frente)
+        anterior = np.full_like(atual, np.nan)
+        anterior[1:] = np.where(preco[:-1] > 0, np.log(preco[:-1]), np.nan)
+
+    # Próxima observação depois do dia: índice da linha, preenchido de trás para a frente
+    linhas = np.where(observado, np.arange(n_dias)[:, None], n_dias)
+    proxima = np.full_like(linhas, n_dias)
+    if n_dias > 1:
+        proxima[:-1] = np.minimum.accumulate(linhas[::-1], axis=0)[::-1][1:]
+    seguinte = np.take_along_axis(np.vstack([atual, np.full((1, atual.shape[1]), np.nan)]), proxima, axis=0)
+
+    mediana, desvio, contagem = _estatisticas_moveis(atual)
+    with np.errstate(invalid="ignore"):
+        desvios = np.abs(atual - mediana) / desvio
+        atipicos = (desvios > LIMIAR) & (contagem >= MINIMO_JANELA) & (np.abs(preco - np.exp(mediana)) >= DESVIO_MINIMO)
+
+    grupo = (adesivos["tipo"].astype(str) + "|" + adesivos["acabamento"].astype(str)).factorize()[0]
+    trocas = _trocas(atual, anterior, seguinte, grupo)
+
+    dias = [str(dia.date()) for dia in painel.dias]
+    relatorio = {
+        "modo": modo,
+        # Painel verificado (e modo): o relatório gravado só é refeito quando ela muda
+        "assinatura": f"{painel.assinatura}:{modo}",
+        "parametros": {
+            "janela": JANELA, "minimo_janela": MINIMO_JANELA, "limiar": LIMIAR, "piso": PISO,
+            "desvio_minimo": DESVIO_MINIMO, "salto": SALTO, "tolerancia_troca": TOLERANCIA_TROCA,
+            "reducao_troca": REDUCAO_TROCA,
+        },
+        "dias": n_dias,
+        "adesivos": len(adesivos),
+        "observacoes": int(observado.sum()),
+        "tipos": _verificar_tipos(painel),
+        "valores_atipicos": [
+            {"dia": dias[d], **_descrever(adesivos, i), "preco": float(preco[d, i]),
+             "mediana": round(float(np.exp(mediana[d, i])), 4), "desvios": round(float(desvios[d, i]), 1)}
+            for d, i in zip(*np.nonzero(atipicos))
+        ],
+        "trocas": [
+            {"dia": dias[d], "reverte": reverte,
+             "a": {**_descrever(adesivos, i), "anterior": float(np.exp(anterior[d, i])), "preco": float(preco[d, i])},
+             "b": {**_descrever(adesivos, j), "anterior": float(np.exp(anterior[d, j])), "preco": float(preco[d, j])}}
+            for d, i, j, reverte in trocas
+        ],
+        "reparados": {"valores_atipicos": 0, "trocas": 0},
+    }
+    if modo == "reparar":
+        confirmadas = [troca for troca in trocas if troca[3]]
+        painel, corrigidos = _reparar(painel, atipicos, np.exp(mediana), confirmadas, SEM_OBSERVACAO)
+        relatorio["reparados"] = {"valores_atipicos": corrigidos, "trocas": len(confirmadas)}
+    painel.qualidade = relatorio
+    return painel
+
+
+# Corrigir os valores observados e espalhar de novo para os dias preenchidos a partir deles;
+# devolve o painel novo e quantos valores atípicos foram trocados pela mediana
+def _reparar(painel, atipicos, mediana, trocas, sem_observacao):
+    preco, quantidade = painel.preco.copy(), painel.quantidade.copy()
+    trocados = np.zeros_like(atipicos)
+    for dia, i, j, _ in trocas:
+        preco[dia, [i, j]] = preco[dia, [j, i]]
+        quantidade[dia, [i, j]] = quantidade[dia, [j, i]]
+        trocados[dia, [i, j]] = True
+    corrigir = atipicos & ~trocados
+    preco[corrigir] = np.round(mediana[corrigir], 2)
+
+    # Cada célula repete o valor do dia em que foi observada
+    preenchido = painel.idade != sem_observacao
+    origem = np.where(preenchido, np.arange(painel.n_dias)[:, None] - painel.idade, 0)
+    novo = type(painel)(
+        painel.registro, painel.dias,
+        np.where(preenchido, np.take_along_axis(preco, origem, axis=0), np.nan),
+        np.where(preenchido, np.take_along_axis(quantidade, origem, axis=0), np.nan),
+        painel.idade,
+        f"{painel.assinatura}:reparado",
+    )
+    return novo, int(corrigir.sum())
+
+
+# Verificar o painel e, se o relatório gravado na pasta do cache é de outro painel (ou de outro
+# modo ou outros parâmetros), regravá-lo junto com os problemas de esquema dos CSVs (anotados na conversão para o
+# cache). Consultas repetidas sobre os mesmos dados não escrevem nada.
+def aplicar_qualidade(painel, modo=None, pasta=None, cache=None):
+    painel = verificar_painel(painel, modo)
+    if painel.qualidade is not None and cache is not None:
+        from carregador import problemas_esquema
+
+        painel.qualidade["esquema"] = problemas_esquema(pasta, cache)
+        caminho = os.path.join(cache, ARQUIVO_RELATORIO)
+        gravado = _ler_relatorio(caminho)
+        if any(gravado.get(chave) != painel.qualidade[chave] for chave in ("assinatura", "parametros", "esquema")):
+            gravar_relatorio(painel.qualidade, caminho)
+    return painel
+
+
+def _ler_relatorio(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            relatorio = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return relatorio if isinstance(relatorio, dict) else {}
+
+
+def gravar_relatorio(relatorio, caminho):
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=1)
+    os.replace(temporario, caminho)
+
+
+def formatar_relatorio(relatorio):
+    linhas = [f"Qualidade ({relatorio['modo']}): {relatorio['dias']} dias, {relatorio['adesivos']} adesivos, "
+              f"{relatorio['observacoes']} observações"]
+    for arquivo, problemas in sorted(relatorio.get("esquema", {}).items()):
+        descartes = {motivo: n for motivo, n in problemas.items() if motivo not in ("linhas", "cabecalho") and n}
+        if descartes or "cabecalho" in problemas:
+            linhas.append(f"  {arquivo}: {problemas.get('cabecalho', '')} {descartes}".rstrip())
+    linhas += [f"  {problema}" for problema in relatorio["tipos"]]
+    linhas.append(f"Valores atípicos: {len(relatorio['valores_atipicos'])}")
+    linhas += [f"  {v['dia']} {v['nome']} ({v['acabamento']}): ${v['preco']:.2f}, mediana ${v['mediana']:.2f}, "
+               f"{v['desvios']:.1f} desvios" for v in relatorio["valores_atipicos"]]
+    linhas.append(f"Trocas prováveis: {len(relatorio['trocas'])}")
+    situacao = {True: "confirmada", False: "não reverte", None: "sem coleta seguinte"}
+    linhas += [f"  {t['dia']} {t['a']['nome']} ({t['a']['acabamento']}) ${t['a']['anterior']:.2f} -> ${t['a']['preco']:.2f} "
+               f"<-> {t['b']['nome']} ({t['b']['acabamento']}) ${t['b']['anterior']:.2f} -> ${t['b']['preco']:.2f} "
+               f"[{situacao[t['reverte']]}]" for t in relatorio["trocas"]]
+    reparados = relatorio["reparados"]
+    if relatorio["modo"] == "reparar":
+        linhas.append(f"Reparados: {reparados['valores_atipicos']} valores atípicos, {reparados['trocas']} trocas")
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório de qualidade dos dados (valores atípicos, trocas, tipos).")
+    parser.add_argument("--modo", choices=MODOS[:2], help="marcar (padrão) ou reparar; padrão: STICKERS_QUALIDADE")
+    parser.add_argument("--json", action="store_true", help="relatório completo em JSON")
+    args = parser.parse_args(argv)
+
+    from cubo import carregar_painel
+
+    relatorio = carregar_painel(qualidade=modo_qualidade(args.modo)).qualidade
+    print(json.dumps(relatorio, ensure_ascii=False, indent=1) if args.json else formatar_relatorio(relatorio))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from nomes import ORDEM_ACABAMENTOS
+
+# Pasta com os dados do registro (versionados junto com o código)
+pasta_registro = "registro"
+
+# Cada entidade do catálogo: equipes, jogadores, cápsulas e o organizador do torneio
+ARQUIVO_ENTIDADES = "entidades.csv"
+COLUNAS_ENTIDADES = ["nome", "torneio", "tipo", "etapa", "equipe", "eliminatoria"]
+
+# Cada adesivo (entidade + acabamento + torneio) recebe um ID inteiro estável
+ARQUIVO_ADESIVOS = "adesivos.csv"
+COLUNAS_ADESIVOS = ["id", "nome", "acabamento", "torneio"]
+
+# Tipo de entidade deduzido da coluna "tipo" dos CSVs quando uma entidade nova aparece
+TIPOS_POR_CATEGORIA = {
+    "Autographs": "jogador",
+    "Legends": "equipe",
+    "Challengers": "equipe",
+    "Contenders": "equipe",
+}
+
+# ID dos adesivos que não estão no registro
+SEM_ID = -1
+
+
+# Acabamentos conhecidos primeiro, na ordem usual do catálogo; cápsulas ("") por último
+def _ordem_acabamento(acabamento):
+    if acabamento in ORDEM_ACABAMENTOS:
+        return (0, ORDEM_ACABAMENTOS.index(acabamento), acabamento)
+    return (1 if acabamento else 2, 0, acabamento)
+
+
+# Campos vazios do registro aparecem como NaN nos DataFrames
+def _texto(valor):
+    return "" if pd.isna(valor) else valor
+
+
+# Jogadores cuja equipe não está registrada no mesmo torneio (erro no registro)
+def _equipes_desconhecidas(entidades):
+    equipes = set(zip(entidades.loc[entidades["tipo"] == "equipe", "nome"],
+                      entidades.loc[entidades["tipo"] == "equipe", "torneio"]))
+    jogadores = entidades[entidades["tipo"] == "jogador"]
+    return [
+        f"{nome} ({torneio}): equipe desconhecida {equipe!r}"
+        for nome, torneio, equipe in jogadores[["nome", "torneio", "equipe"]].itertuples(index=False)
+        if _texto(equipe) and (equipe, torneio) not in equipes
+    ]
+
+
+# Jogadores ainda sem equipe (os recém-registrados: os CSVs não dizem qual é)
+def _jogadores_sem_equipe(entidades):
+    jogadores = entidades[(entidades["tipo"] == "jogador") & (entidades["equipe"].map(_texto) == "")]
+    return [f"{nome} ({torneio})" for nome, torneio in jogadores[["nome", "torneio"]].itertuples(index=False)]
+
+
+class Registro:
+    def __init__(self, entidades, adesivos):
+        self.entidades = entidades.reset_index(drop=True)
+        problemas = _equipes_desconhecidas(self.entidades)
+        if problemas:
+            raise ValueError(f"Jogadores com equipe inválida em {ARQUIVO_ENTIDADES}: " + "; ".join(problemas))
+        # Jogadores sem equipe carregam normalmente (preços, rankings), mas ficam fora das
+        # consultas por equipe até a coluna equipe ser preenchida
+        self.sem_equipe = _jogadores_sem_equipe(self.entidades)
+        adesivos = adesivos.sort_values("id").reset_index(drop=True)
+        if not np.array_equal(adesivos["id"].to_numpy(), np.arange(len(adesivos))):
+            raise ValueError("Os IDs de adesivos.csv precisam ser 0, 1, 2, ... sem lacunas.")
+
+        # Tabela por ID já com os atributos da entidade, pronta para virar máscara
+        posicoes = self.entidades.assign(entidade=np.arange(len(self.entidades)))
+        self.adesivos = adesivos.merge(
+            posicoes, on=["nome", "torneio"], how="left", validate="many_to_one"
+        ).set_index("id")
+
+        # Posição da entidade e do acabamento de cada ID (eixos do cubo de preços)
+        self.acabamentos = sorted(set(adesivos["acabamento"]), key=_ordem_acabamento)
+        self.entidade_por_id = self.adesivos["entidade"].fillna(SEM_ID).to_numpy(dtype=np.int32)
+        self.acabamento_por_id = np.array(
+            [self.acabamentos.index(a) for a in self.adesivos["acabamento"]], dtype=np.int32
+        )
+        self._ids = {
+            (nome, acabamento, torneio): i
+            for i, nome, acabamento, torneio in adesivos[COLUNAS_ADESIVOS].itertuples(index=False)
+        }
+        self._mascaras = {}
+
+        # Assinatura do conteúdo do registro, usada para invalidar caches que dependem dos IDs
+        self.assinatura = hashlib.sha1(
+            pd.util.hash_pandas_object(self.entidades, index=False).to_numpy().tobytes()
+            + pd.util.hash_pandas_object(adesivos[COLUNAS_ADESIVOS], index=False).to_numpy().tobytes()
+        ).hexdigest()[:16]
+
+    def __len__(self):
+        return len(self.adesivos)
+
+    def identificar(self, nome, acabamento, torneio):
+        return self._ids.get((nome, _texto(acabamento), _texto(torneio)), SEM_ID)
+
+    # IDs de todas as linhas de um snapshot, resolvendo só os nomes completos distintos
+    def identificar_linhas(self, df):
+        chaves = df[["Nome_Completo", "Nome", "Acabamento", "Torneio"]].drop_duplicates("Nome_Completo")
+        por_nome = {
+            completo: self.identificar(nome, acabamento, torneio)
+            for completo, nome, acabamento, torneio in chaves.itertuples(index=False)
+        }
+        completos = df["Nome_Completo"].astype("category")
+        ids = np.array([por_nome[c] for c in completos.cat.categories] + [SEM_ID], dtype=np.int32)
+        return ids[completos.cat.codes.to_numpy()]
+
+    # Máscara booleana indexada por ID; a última posição (ID -1) é sempre False
+    def mascara(self, tipo=None, acabamento=None, torneio=None, eliminatoria=None):
+        chave = (tipo, acabamento, torneio, eliminatoria)
+        if chave not in self._mascaras:
+            selecionados = np.ones(len(self.adesivos), dtype=bool)
+            for coluna, valor in zip(["tipo", "acabamento", "torneio", "eliminatoria"], chave):
+                if valor is not None:
+                    selecionados &= (self.adesivos[coluna] == valor).to_numpy()
+            self._mascaras[chave] = np.append(selecionados, False)
+        return self._mascaras[chave]
+
+    # Máscara booleana indexada pela posição da entidade em self.entidades
+    def mascara_entidades(self, tipo=None, torneio=None, eliminatoria=None):
+        selecionadas = np.ones(len(self.entidades), dtype=bool)
+        for coluna, valor in zip(["tipo", "torneio", "eliminatoria"], [tipo, torneio, eliminatoria]):
+            if valor is not None:
+                selecionadas &= (self.entidades[coluna] == valor).to_numpy()
+        return selecionadas
+
+    # Filtrar as linhas de um DataFrame que já tem a coluna ID
+    def filtrar(self, df, **criterios):
+        return df[self.mascara(**criterios)[df["ID"].to_numpy()]]
+
+    # Nomes das equipes, na ordem do registro
+    def equipes(self, torneio=None, eliminatoria=None):
+        selecionadas = self.entidades[self.entidades["tipo"] == "equipe"]
+        if torneio is not None:
+            selecionadas = selecionadas[selecionadas["torneio"] == torneio]
+        if eliminatoria is not None:
+            selecionadas = selecionadas[selecionadas["eliminatoria"] == eliminatoria]
+        return list(dict.fromkeys(selecionadas["nome"]))
+
+    # Nomes dos jogadores de uma equipe (ou de todas), na ordem do registro
+    def jogadores(self, equipe=None, torneio=None):
+        selecionados = self.entidades[self.entidades["tipo"] == "jogador"]
+        if equipe is not None:
+            selecionados = selecionados[selecionados["equipe"] == equipe]
+        if torneio is not None:
+            selecionados = selecionados[selecionados["torneio"] == torneio]
+        return list(dict.fromkeys(selecionados["nome"]))
+
+
+def _ler_tabela(caminho, colunas):
+    if not os.path.exists(caminho):
+        return pd.DataFrame(columns=colunas)
+    return pd.read_csv(caminho, encoding="utf-8", keep_default_na=False, dtype=str)
+
+
+def _ler_registro(pasta):
+    entidades = _ler_tabela(os.path.join(pasta, ARQUIVO_ENTIDADES), COLUNAS_ENTIDADES)
+    entidades["eliminatoria"] = entidades["eliminatoria"].astype(str).str.lower() == "true"
+    adesivos = _ler_tabela(os.path.join(pasta, ARQUIVO_ADESIVOS), COLUNAS_ADESIVOS)
+    adesivos["id"] = adesivos["id"].astype(int)
+    return entidades, adesivos
+
+
+_registros = {}
+
+
+# (mtime, tamanho) dos arquivos do registro, para saber se foram editados
+def _versao_arquivos(pasta):
+    versao = []
+    for arquivo in (ARQUIVO_ENTIDADES, ARQUIVO_ADESIVOS):
+        try:
+            info = os.stat(os.path.join(pasta, arquivo))
+            versao.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            versao.append(None)
+    return tuple(versao)
+
+
+# Registro carregado uma única vez por processo, e de novo quando os arquivos mudam (o vigia e o
+# serviço, que ficam rodando, veem as edições do registro)
+def carregar_registro(pasta=pasta_registro):
+    versao = _versao_arquivos(pasta)
+    if pasta not in _registros or _registros[pasta][0] != versao:
+        _registros[pasta] = (versao, Registro(*_ler_registro(pasta)))
+    return _registros[pasta][1]
+
+
+# Acrescentar ao registro as entidades e adesivos que aparecem nos snapshots e ainda não têm ID.
+# Os IDs existentes nunca mudam; entidades novas entram com o tipo deduzido da coluna Tipo.
+def atualizar_registro(df, pasta=pasta_registro):
+    entidades, adesivos = _ler_registro(pasta)
+    df = df.assign(
+        Acabamento=df["Acabamento"].astype(object).fillna(""),
+        Torneio=df["Torneio"].astype(object).fillna(""),
+    )
+
+    conhecidas = set(zip(entidades["nome"], entidades["torneio"]))
+    novas = []
+    for nome, torneio, categoria, capsula in (
+        df[["Nome", "Torneio", "Tipo", "Capsula"]].drop_duplicates(["Nome", "Torneio"]).itertuples(index=False)
+    ):
+        if (nome, torneio) in conhecidas:
+            continue
+        tipo = "capsula" if capsula else TIPOS_POR_CATEGORIA.get(categoria, "")
+        novas.append([nome, torneio, tipo, categoria, nome if tipo == "equipe" else "", False])
+
+    existentes = set(zip(adesivos["nome"], adesivos["acabamento"], adesivos["torneio"]))
+    novos = []
+    for chave in df[["Nome", "Acabamento", "Torneio"]].drop_duplicates().itertuples(index=False):
+        chave = tuple(chave)
+        if chave not in existentes:
+            existentes.add(chave)
+            novos.append([len(adesivos) + len(novos), *chave])
+
+    os.makedirs(pasta, exist_ok=True)
+    if novas:
+        entidades = pd.concat([entidades, pd.DataFrame(novas, columns=COLUNAS_ENTIDADES)], ignore_index=True)
+        entidades.to_csv(os.path.join(pasta, ARQUIVO_ENTIDADES), index=False, encoding="utf-8")
+    if novos:
+        adesivos = pd.concat([adesivos, pd.DataFrame(novos, columns=COLUNAS_ADESIVOS)], ignore_index=True)
+        adesivos.to_csv(os.path.join(pasta, ARQUIVO_ADESIVOS), index=False, encoding="utf-8")
+    _registros.pop(pasta, None)
+    return len(novas), len(novos)
+
+
+if __name__ == "__main__":
+    # Uso: python registro.py [pasta_csv]  -> registra entidades/adesivos novos encontrados nos CSVs
+    from carregador import carregar_snapshots, pasta_csv
+
+    entidades_novas, adesivos_novos = atualizar_registro(carregar_snapshots(sys.argv[1] if len(sys.argv) > 1 else pasta_csv))
+    print(f"{entidades_novas} entidades e {adesivos_novos} adesivos novos registrados em {pasta_registro}/")
+    # Jogadores novos entram sem equipe (os CSVs não dizem qual é) e ficam fora das consultas
+    # por equipe até a coluna equipe ser preenchida
+    pendentes = carregar_registro().sem_equipe
+    if pendentes:
+        print(f"Preencha a equipe em {pasta_registro}/{ARQUIVO_ENTIDADES}: " + "; ".join(pendentes), file=sys.stderr)
@@ -0,0 +1,134 @@
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Sem janelas: o backend Agg precisa ser escolhido antes de qualquer import do pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import perfil
+
+# Scripts que geram figuras para o relatório
+pasta_scripts = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ["players.py", "quantity.py", "teams.py", "teamsGold.py", "timelapse-teams.py"]
+
+pasta_saida = "relatorio"
+FORMATOS = ["png", "svg", "pdf"]
+
+# Módulos e dados já carregados neste processo (cada worker carrega uma vez só)
+_modulos = {}
+_dados = {}
+
+
+# Importar um script pelo caminho (timelapse-teams.py não é um nome de módulo válido)
+def carregar_script(script):
+    nome = os.path.splitext(os.path.basename(script))[0].replace("-", "_")
+    if nome not in _modulos:
+        spec = importlib.util.spec_from_file_location(nome, os.path.join(pasta_scripts, script))
+        modulo = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(modulo)
+        _modulos[nome] = modulo
+    return _modulos[nome]
+
+
+def dados_do_script(script):
+    if script not in _dados:
+        _dados[script] = carregar_script(script).carregar_dados()
+    return _dados[script]
+
+
+# Todas as figuras e animações dos scripts como tarefas independentes (script, tipo, nome)
+def listar_tarefas(scripts, animacoes=True):
+    tarefas = []
+    for script in scripts:
+        modulo = carregar_script(script)
+        if animacoes:
+            tarefas += [(script, "animacao", nome) for nome in getattr(modulo, "ANIMACOES", {})]
+        tarefas += [(script, "figura", nome) for nome in getattr(modulo, "FIGURAS", {})]
+
+    # Animações primeiro: são as tarefas mais lentas e definem o tempo total
+    return sorted(tarefas, key=lambda tarefa: tarefa[1] != "animacao")
+
+
+# Renderizar uma tarefa e devolver os arquivos gerados (com o cubo do script, ou o cubo dado)
+def renderizar(tarefa, saida, formatos, cubo=None):
+    import matplotlib.pyplot as plt
+
+    script, tipo, nome = tarefa
+    modulo = carregar_script(script)
+    if cubo is None:
+        cubo = dados_do_script(script)
+    if tipo == "animacao":
+        caminhos = [os.path.join(saida, f"{nome}.gif")]
+        with perfil.etapa("render.animacao", nome=nome):
+            fig = modulo.ANIMACOES[nome](cubo, caminhos[0])
+    else:
+        caminhos = [os.path.join(saida, f"{nome}.{formato}") for formato in formatos]
+        with perfil.etapa("render.figura", nome=nome):
+            fig = modulo.FIGURAS[nome](cubo)
+        for caminho, formato in zip(caminhos, formatos):
+            with perfil.etapa("render.gravacao", nome=nome, formato=formato):
+                fig.savefig(caminho, format=formato)
+    plt.close(fig)
+    return caminhos
+
+
+# Renderizar em um worker medindo as etapas; os eventos voltam junto com os arquivos gerados
+def _renderizar_medindo(tarefa, saida, formatos):
+    perfil.ativar()
+    try:
+        return renderizar(tarefa, saida, formatos), perfil.retirar_eventos()
+    except Exception:
+        perfil.retirar_eventos()
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera todas as figuras dos scripts em arquivos, sem abrir janelas.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="scripts a renderizar (padrão: todos)")
+    parser.add_argument("--saida", default=pasta_saida, help="pasta de saída (padrão: %(default)s)")
+    parser.add_argument("--formatos", nargs="+", default=["png"], choices=FORMATOS, help="formatos das figuras")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(), help="número de processos em paralelo")
+    parser.add_argument("--sem-animacoes", action="store_true", help="não gerar os GIFs")
+    parser.add_argument("--perfil", nargs="?", const="", metavar="TRACE",
+                        help="medir as etapas e mostrar o resumo no fim; com TRACE, grava também o Chrome trace")
+    args = parser.parse_args(argv)
+    if args.perfil is not None:
+        perfil.ativar(args.perfil or None)
+
+    os.makedirs(args.saida, exist_ok=True)
+    inicio = time.perf_counter()
+
+    # Atualizar o cache e validar os dados no processo principal antes de distribuir as figuras,
+    # assim os workers só leem o cache pronto
+    for script in args.scripts:
+        dados_do_script(script)
+    tarefas = listar_tarefas(args.scripts, animacoes=not args.sem_animacoes)
+
+    falhas = 0
+    processos = max(1, min(args.processos or 1, len(tarefas)))
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        funcao = _renderizar_medindo if perfil.ativo() else renderizar
+        futuros = {executor.submit(funcao, tarefa, args.saida, args.formatos): tarefa for tarefa in tarefas}
+        for futuro in as_completed(futuros):
+            script, _, nome = futuros[futuro]
+            try:
+                caminhos = futuro.result()
+                if perfil.ativo():
+                    caminhos, eventos = caminhos
+                    perfil.incorporar(eventos)
+                for caminho in caminhos:
+                    print(caminho)
+            except Exception as erro:
+                falhas += 1
+                print(f"Erro ao renderizar {nome} ({script}): {erro}", file=sys.stderr)
+
+    print(f"{len(tarefas) - falhas} de {len(tarefas)} figuras em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from agregados import assinatura_entradas, carregar_agregados, pasta_cache, pasta_csv, pasta_historico, pasta_registro
+from stickers import _dia
+
+# Serviço local de consultas em HTTP/JSON: as mesmas perguntas dos scripts (preço médio por
+# entidade em um dia, quantidade de anúncios, top N, séries) e as figuras dos scripts em PNG,
+# SVG ou PDF. As consultas saem dos agregados (agregados.py) e as figuras do cubo; as respostas
+# prontas ficam em um cache LRU com validade, esvaziado quando chega uma coleta nova. Um pool de
+# threads atende as requisições em paralelo.
+
+PORTA = 8765
+TTL = 300.0  # segundos de validade de uma resposta no cache
+LIMITE_ITENS = 1024
+LIMITE_BYTES = 64 << 20
+# Intervalo mínimo (s) entre duas verificações das entradas (os CSVs, o histórico e o registro)
+INTERVALO_VERIFICACAO = 1.0
+
+TIPOS_FIGURA = {"png": "image/png", "svg": "image/svg+xml", "pdf": "application/pdf"}
+TIPO_JSON = "application/json; charset=utf-8"
+
+
+class ErroConsulta(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# Respostas prontas (tipo, corpo) por consulta, com limite de itens e de bytes (sai a usada há
+# mais tempo) e validade por item. Cada resposta é gravada com a geração dos dados que a
+# produziram; uma resposta calculada antes de uma coleta nova não entra depois da limpeza.
+class CacheRespostas:
+    def __init__(self, limite_itens=LIMITE_ITENS, limite_bytes=LIMITE_BYTES, ttl=TTL, relogio=time.monotonic):
+        self.limite_itens = limite_itens
+        self.limite_bytes = limite_bytes
+        self.ttl = ttl
+        self.relogio = relogio
+        self.geracao = 0
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.estatisticas = {"acertos": 0, "faltas": 0, "expirados": 0, "descartados": 0}
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                self.estatisticas["faltas"] += 1
+                return None
+            expira, resposta = item
+            if expira <= self.relogio():
+                self._remover(chave)
+                self.estatisticas["expirados"] += 1
+                self.estatisticas["faltas"] += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.estatisticas["acertos"] += 1
+            return resposta
+
+    def guardar(self, chave, resposta, geracao):
+        tamanho = len(resposta[1])
+        with self._trava:
+            if geracao != self.geracao or tamanho > self.limite_bytes:
+                return
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (self.relogio() + self.ttl, resposta)
+            self._bytes += tamanho
+            while len(self._itens) > self.limite_itens or self._bytes > self.limite_bytes:
+                self._remover(next(iter(self._itens)))
+                self.estatisticas["descartados"] += 1
+
+    def _remover(self, chave):
+        _, resposta = self._itens.pop(chave)
+        self._bytes -= len(resposta[1])
+
+    # Esvaziar e passar para a próxima geração dos dados
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+            self.geracao += 1
+            return self.geracao
+
+    def estado(self):
+        with self._trava:
+            return {"itens": len(self._itens), "bytes": self._bytes, "geracao": self.geracao, **self.estatisticas}
+
+
+# Critérios de seleção do cubo a partir dos parâmetros da consulta
+def _criterios(parametros):
+    criterios = {chave: parametros[chave] for chave in ("tipo", "acabamento", "torneio") if chave in parametros}
+    if "eliminatoria" in parametros:
+        criterios["eliminatoria"] = parametros["eliminatoria"].lower() in ("1", "true", "sim")
+    return criterios
+
+
+def _inteiro(parametros, nome, padrao):
+    try:
+        return int(parametros.get(nome, padrao))
+    except ValueError:
+        raise ErroConsulta(400, f"Parâmetro {nome} inválido: {parametros[nome]}")
+
+
+def _json(dados):
+    return TIPO_JSON, json.dumps(dados, ensure_ascii=False).encode("utf-8")
+
+
+class Servico:
+    def __init__(self, pasta=pasta_csv, cache=pasta_cache, historico=pasta_historico, registro=pasta_registro,
+                 respostas=None, intervalo=INTERVALO_VERIFICACAO):
+        self.pastas = (pasta, cache, historico, registro)
+        self.respostas = respostas or CacheRespostas()
+        self.intervalo = intervalo
+        self.agregados = None
+        self._cubo = None
+        self._assinatura = None
+        self._verificado = -math.inf
+        self._trava_dados = threading.Lock()
+        # O pyplot não é seguro entre threads: uma figura por vez
+        self._trava_figuras = threading.Lock()
+        self._figuras = None
+
+    # Recarregar os agregados se alguma entrada mudou (no máximo uma verificação por intervalo);
+    # devolve a geração dos dados em uso
+    def atualizar(self):
+        agora = time.monotonic()
+        if agora - self._verificado < self.intervalo and self.agregados is not None:
+            return self.respostas.geracao
+        with self._trava_dados:
+            if time.monotonic() - self._verificado >= self.intervalo or self.agregados is None:
+                pasta, cache, historico, registro = self.pastas
+                assinatura = assinatura_entradas(pasta, historico, registro)
+                if assinatura != self._assinatura or self.agregados is None:
+                    self.agregados = carregar_agregados(pasta, cache, historico, registro)
+                    self._cubo = None
+                    # A carga pode ter gravado no histórico e no registro
+                    self._assinatura = assinatura_entradas(pasta, historico, registro)
+                    self.respostas.limpar()
+                self._verificado = time.monotonic()
+            return self.respostas.geracao
+
+    # Cubo completo, só para as figuras; carregado na primeira figura pedida de cada geração
+    def cubo(self):
+        with self._trava_dados:
+            if self._cubo is None:
+                from cubo import carregar_cubo
+
+                pasta, cache, historico, _ = self.pastas
+                self._cubo = carregar_cubo(pasta, cache, historico=historico)
+            return self._cubo
+
+    # Figuras dos scripts: nome -> script
+    def figuras(self):
+        if self._figuras is None:
+            from render import SCRIPTS, listar_tarefas
+
+            self._figuras = {nome: script for script, _, nome in listar_tarefas(SCRIPTS, animacoes=False)}
+        return self._figuras
+
+    # (status, tipo, corpo) de um caminho com consulta
+    def responder(self, alvo):
+        partes = urlsplit(alvo)
+        caminho = unquote(partes.path).rstrip("/") or "/"
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(partes.query).items()}
+        try:
+            geracao = self.atualizar()
+            if caminho == "/estado":
+                return (200,) + _json(self.estado())
+            if self.agregados.n_dias == 0:
+                raise ErroConsulta(503, "Nenhuma coleta encontrada.")
+
+            chave = (caminho, tuple(sorted(parametros.items())))
+            resposta = self.respostas.obter(chave)
+            if resposta is None:
+                # Só respostas 200 entram no cache: um erro sai por exceção antes de guardar
+                resposta = self._calcular(caminho, parametros, chave)
+                self.respostas.guardar(chave, resposta, geracao)
+            return (200,) + resposta
+        except ErroConsulta as erro:
+            return (erro.status,) + _json({"erro": str(erro)})
+        except (IndexError, KeyError, ValueError) as erro:
+            return (400,) + _json({"erro": str(erro)})
+        except Exception as erro:
+            # Falha do cubo ou do desenho (arquivo, matplotlib, bug): registrar e responder 500,
+            # em vez de deixar a exceção derrubar a conexão sem resposta
+            print(f"Erro ao responder {alvo}:\n{traceback.format_exc()}", file=sys.stderr, end="")
+            return (500,) + _json({"erro": f"{type(erro).__name__}: {erro}"})
+
+    def _calcular(self, caminho, parametros, chave):
+        agregados = self.agregados
+        if caminho.startswith("/figura/"):
+            return self._figura(caminho.removeprefix("/figura/"), chave)
+        if caminho == "/figuras":
+            return _json({"figuras": [f"{nome}.{formato}" for nome in self.figuras() for formato in TIPOS_FIGURA]})
+        if caminho == "/dias":
+            return _json({"dias": [str(dia) for dia in agregados.dias]})
+
+        criterios = _criterios(parametros)
+        if caminho in ("/precos", "/quantidades", "/top"):
+            dia = agregados.indice_dia(_dia(parametros.get("dia", "-1")))
+            if caminho == "/top":
+                pares = agregados.top(dia, _inteiro(parametros, "n", 10), **criterios)
+            else:
+                pares = agregados.estatistica(dia, "media" if caminho == "/precos" else "quantidade", **criterios)
+            return _json({"dia": str(agregados.dias[dia]), "valores": [{"nome": n, "valor": v} for n, v in pares]})
+        if caminho == "/serie":
+            dias, nomes, matriz = agregados.serie(parametros.get("medida", "media"), **criterios)
+            valores = np.where(np.isnan(matriz), None, matriz).tolist()
+            return _json({"dias": [str(dia) for dia in dias], "nomes": nomes, "valores": valores})
+        raise ErroConsulta(404, f"Caminho desconhecido: {caminho}")
+
+    def _figura(self, arquivo, chave):
+        nome, _, formato = arquivo.rpartition(".")
+        if formato not in TIPOS_FIGURA or nome not in self.figuras():
+            raise ErroConsulta(404, f"Figura desconhecida: {arquivo}")
+        with self._trava_figuras:
+            # Outra requisição pode ter desenhado a mesma figura enquanto esta esperava
+            pronta = self.respostas.obter(chave)
+            if pronta is not None:
+                return pronta
+            import matplotlib.pyplot as plt
+            from render import carregar_script
+
+            fig = carregar_script(self.figuras()[nome]).FIGURAS[nome](self.cubo())
+            try:
+                saida = BytesIO()
+                fig.savefig(saida, format=formato)
+            finally:
+                plt.close(fig)
+        return TIPOS_FIGURA[formato], saida.getvalue()
+
+    def estado(self):
+        agregados = self.agregados
+        return {
+            "dias": agregados.n_dias,
+            "ultimo_dia": str(agregados.dias[-1]) if agregados.n_dias else None,
+            "cache": self.respostas.estado(),
+        }
+
+
+class Atendente(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, tipo, corpo = self.server.servico.responder(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+
+# Servidor HTTP cujas conexões são atendidas por um pool fixo de threads
+class ServidorConsultas(HTTPServer):
+    def __init__(self, endereco, servico, trabalhadores=os.cpu_count(), verboso=False):
+        super().__init__(endereco, Atendente)
+        self.servico = servico
+        self.verboso = verboso
+        self.pool = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="consulta")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._atender, request, client_address)
+
+    def _atender(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de consultas (HTTP/JSON) e figuras dos adesivos.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--trabalhadores", type=int, default=os.cpu_count(), help="threads atendendo requisições")
+    parser.add_argument("--ttl", type=float, default=TTL, help="segundos de validade de uma resposta no cache")
+    parser.add_argument("--limite-itens", type=int, default=LIMITE_ITENS, help="respostas guardadas no cache")
+    parser.add_argument("--limite-mb", type=float, default=LIMITE_BYTES / (1 << 20), help="tamanho máximo do cache")
+    parser.add_argument("--verboso", action="store_true", help="mostrar cada requisição")
+    args = parser.parse_args(argv)
+
+    respostas = CacheRespostas(args.limite_itens, int(args.limite_mb * (1 << 20)), args.ttl)
+    servidor = ServidorConsultas((args.host, args.porta), Servico(respostas=respostas),
+                                 max(1, args.trabalhadores), args.verboso)
+    host, porta = servidor.server_address[:2]
+    print(f"http://{host}:{porta}/", file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import argparse
+import json
+import sys
+
+# Uma linha de comando para os cinco scripts. As consultas em texto/JSON saem dos agregados
+# gravados (agregados.py, só numpy); pandas e matplotlib só são importados quando o cache
+# precisa ser refeito ou com --render, e aí sempre com o backend Agg, sem janelas.
+
+# Subcomando -> script com as figuras correspondentes
+SCRIPTS = {
+    "players": "players.py",
+    "teams": "teams.py",
+    "gold": "teamsGold.py",
+    "quantity": "quantity.py",
+    "race": "timelapse-teams.py",
+}
+
+EQUIPES_ELIMINATORIA = {"tipo": "equipe", "eliminatoria": True}
+
+# nomes.ACABAMENTOS_ESPECIAIS (repetidos para não importar o pandas): as médias e quantidades das
+# equipes não incluem os adesivos de papel
+ACABAMENTOS_ESPECIAIS = ("Holográfico", "Purpurinado", "Dourado", "Laminado", "Lenticular", "Bordado")
+
+# Os modos de analises.MODOS_RANKING (repetidos para não importar o pandas só para o --help)
+MODOS_RANKING = ["preco", "retorno", "volatilidade", "drawdown", "premio_dourado", "esgotamento"]
+
+
+# "primeiro", "ultimo", um índice (0, -1, ...) ou uma data AAAA-MM-DD
+def _dia(texto):
+    apelidos = {"primeiro": 0, "ultimo": -1, "último": -1}
+    if texto in apelidos:
+        return apelidos[texto]
+    try:
+        return int(texto)
+    except ValueError:
+        return texto
+
+
+def _data(agregados, dia):
+    return str(agregados.dias[agregados.indice_dia(dia)])
+
+
+def _valores(pares, coluna):
+    return [{"nome": nome, coluna: valor} for nome, valor in pares]
+
+
+# ----- Consultas: cada uma devolve (texto, dados JSON) -----
+
+def _tabela(titulo, pares, formato="{:10.2f}"):
+    largura = max((len(nome) for nome, _ in pares), default=0)
+    return "\n".join([titulo] + [f"{i:3d}. {nome:{largura}s} {formato.format(valor)}"
+                                 for i, (nome, valor) in enumerate(pares, 1)])
+
+
+def consultar_players(agregados, args):
+    if args.modo != "preco":
+        # Rankings por retorno, volatilidade etc. precisam do painel inteiro (caminho com pandas)
+        from analises import ranking
+        from cubo import carregar_cubo
+
+        serie = ranking(carregar_cubo(), args.modo, agregados.indice_dia(args.dia), args.n,
+                        tipo="jogador", acabamento="Dourado")
+        pares = list(zip(serie.index.tolist(), serie.tolist()))
+    else:
+        pares = agregados.top(args.dia, args.n, tipo="jogador", acabamento="Dourado")
+    dia = _data(agregados, args.dia)
+    return (_tabela(f"Top {args.n} jogadores dourados ({args.modo}) em {dia}", pares),
+            {"dia": dia, "modo": args.modo, "ranking": _valores(pares, args.modo)})
+
+
+def _consultar_equipes(agregados, args, titulo, **criterios):
+    pares = sorted(agregados.precos(args.dia, **EQUIPES_ELIMINATORIA, **criterios), key=lambda par: -par[1])
+    dia = _data(agregados, args.dia)
+    return _tabela(f"{titulo} em {dia}", pares), {"dia": dia, "precos": _valores(pares, "preco")}
+
+
+def consultar_teams(agregados, args):
+    return _consultar_equipes(agregados, args, "Preço médio das equipes", acabamento=ACABAMENTOS_ESPECIAIS)
+
+
+def consultar_gold(agregados, args):
+    return _consultar_equipes(agregados, args, "Preço médio dos adesivos dourados das equipes", acabamento="Dourado")
+
+
+def consultar_quantity(agregados, args):
+    primeiro = dict(agregados.quantidades(0, acabamento=ACABAMENTOS_ESPECIAIS, **EQUIPES_ELIMINATORIA))
+    ultimo = dict(agregados.quantidades(args.dia, acabamento=ACABAMENTOS_ESPECIAIS, **EQUIPES_ELIMINATORIA))
+    nomes = sorted(set(primeiro) | set(ultimo))
+    linhas = [{"nome": nome, "primeiro": primeiro.get(nome, 0), "ultimo": ultimo.get(nome, 0)} for nome in nomes]
+    largura = max((len(nome) for nome in nomes), default=0)
+    texto = [f"Quantidade de anúncios: {_data(agregados, 0)} -> {_data(agregados, args.dia)}"]
+    texto += [f"{l['nome']:{largura}s} {l['primeiro']:8.0f} {l['ultimo']:8.0f} {l['ultimo'] - l['primeiro']:+8.0f}"
+              for l in linhas]
+    return "\n".join(texto), {"primeiro_dia": _data(agregados, 0), "ultimo_dia": _data(agregados, args.dia),
+                              "quantidades": linhas}
+
+
+# Ranking dos dourados das equipes em cada dia (os dados da animação)
+def consultar_race(agregados, args):
+    import numpy as np
+
+    dias, nomes, matriz = agregados.serie("media", acabamento="Dourado", **EQUIPES_ELIMINATORIA)
+    dias_json, texto = [], []
+    for dia, valores in zip(dias, matriz):
+        ordem = [i for i in np.argsort(-valores, kind="stable") if not np.isnan(valores[i])][:args.n]
+        pares = [(nomes[i], float(valores[i])) for i in ordem]
+        dias_json.append({"dia": str(dia), "ranking": _valores(pares, "preco")})
+        texto.append(f"{dia}  " + "  ".join(f"{i}. {nome} {valor:.2f}" for i, (nome, valor) in enumerate(pares, 1)))
+    return "\n".join(texto), {"dias": dias_json}
+
+
+CONSULTAS = {
+    "players": consultar_players,
+    "teams": consultar_teams,
+    "gold": consultar_gold,
+    "quantity": consultar_quantity,
+    "race": consultar_race,
+}
+
+
+# Gerar as figuras (ou o GIF) do script do subcomando
+def renderizar_script(comando, saida, formatos):
+    import os
+
+    from render import listar_tarefas, renderizar
+
+    os.makedirs(saida, exist_ok=True)
+    caminhos = []
+    for tarefa in listar_tarefas([SCRIPTS[comando]]):
+        caminhos += renderizar(tarefa, saida, formatos)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="stickers", description="Consultas e figuras dos adesivos do Major.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    for comando, script in SCRIPTS.items():
+        sub = subparsers.add_parser(comando, help=f"consultas e figuras de {script}")
+        sub.add_argument("--dia", type=_dia, default=-1,
+                         help="primeiro, ultimo, índice (0, -1, ...) ou data AAAA-MM-DD (padrão: último)")
+        sub.add_argument("-n", type=int, default=10, help="tamanho do ranking (padrão: %(default)s)")
+        sub.add_argument("--json", action="store_true", help="saída em JSON")
+        sub.add_argument("--render", nargs="?", const="relatorio", metavar="SAIDA",
+                         help="gerar as figuras do script em SAIDA (padrão: relatorio)")
+        sub.add_argument("--formatos", nargs="+", default=["png"], choices=["png", "svg", "pdf"])
+        if comando == "players":
+            sub.add_argument("--modo", default="preco", choices=MODOS_RANKING, help="critério do ranking (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.render is not None:
+        # Backend sem janelas antes de qualquer import do pyplot
+        import matplotlib
+        matplotlib.use("Agg")
+        for caminho in renderizar_script(args.comando, args.render, args.formatos):
+            print(caminho)
+        return 0
+
+    from agregados import carregar_agregados
+
+    agregados = carregar_agregados()
+    if agregados.n_dias == 0:
+        print("Nenhuma coleta encontrada.", file=sys.stderr)
+        return 1
+    try:
+        texto, dados = CONSULTAS[args.comando](agregados, args)
+    except (IndexError, ValueError) as erro:
+        print(erro, file=sys.stderr)
+        return 1
+    print(json.dumps(dados, ensure_ascii=False, indent=1) if args.json else texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
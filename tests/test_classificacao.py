@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from classificacao import Classificacao, Reproducao
+
+
+# Valores com muitos empates e nomes que aparecem fora da ordem do registro (NaN nos primeiros dias)
+def _dias_com_empates(n_dias=30, n_nomes=40, semente=0):
+    gerador = np.random.default_rng(semente)
+    valores = gerador.integers(1, 8, size=(n_dias, n_nomes)).astype(float)
+    chegada = gerador.integers(0, n_dias, size=n_nomes)
+    valores[np.arange(n_dias)[:, None] < chegada] = np.nan
+    valores[gerador.random((n_dias, n_nomes)) < 0.1] = np.nan
+    return [f"nome{i}" for i in range(n_nomes)], valores
+
+
+def test_top_igual_ao_nlargest_com_empates():
+    nomes, valores = _dias_com_empates()
+    reproducao = Reproducao(nomes, range(len(valores)), valores, n=10)
+    for dia, linha in enumerate(valores):
+        esperado = pd.Series(linha, index=nomes).dropna().nlargest(15)
+        assert reproducao.top(dia, 15) == list(esperado.items())
+
+
+def test_eventos_sem_trocas_entre_empatados():
+    # b aparece depois de a, mas vem antes no registro: empatados, b fica na frente desde o início
+    classificacao = Classificacao(2, ordem=["b", "a"])
+    classificacao.aplicar([("a", 5.0)], 0)
+    eventos = classificacao.aplicar([("b", 5.0)], 1)
+    assert classificacao.top() == [("b", 5.0), ("a", 5.0)]
+    assert [(evento.nome, evento.tipo) for evento in eventos] == [("b", "entrou"), ("a", "caiu")]
+    # Um novo empate não troca ninguém de lugar
+    assert classificacao.aplicar([("a", 6.0), ("b", 6.0)], 2) == []
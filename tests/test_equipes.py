@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+
+import stickers
+from cubo import carregar_cubo
+from nomes import ACABAMENTOS_ESPECIAIS
+from teams import precos_do_dia
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRIMEIRO_CSV = os.path.join(RAIZ, "csvs", "stickers_data_0812.csv")
+
+
+# Cubo dos CSVs reais, com cache e histórico em uma pasta temporária
+@pytest.fixture(scope="module")
+def cubo(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp("cubo")
+    return carregar_cubo(os.path.join(RAIZ, "csvs"), str(pasta / "cache"), historico=str(pasta / "historico"))
+
+
+# As médias e quantidades do primeiro dia calculadas como nos scripts originais: o nome é o que vem
+# antes do "(", então um adesivo de papel ("G2 Esports | Xangai 2024") não casa com nenhuma equipe
+def _primeiro_dia_original(equipes):
+    df = pd.read_csv(PRIMEIRO_CSV, skiprows=1, header=None, names=["Nome", "Preco", "Quantidade", "Tipo", "Data"])
+    df["Nome"] = df["Nome"].str.replace("Adesivo |", "", regex=False).str.split("(").str[0].str.strip()
+    df = df[df["Nome"].isin(equipes)]
+    return df.groupby("Nome")["Preco"].mean(), df.groupby("Nome")["Quantidade"].sum()
+
+
+def test_equipes_sem_papel_como_nos_scripts_originais(cubo):
+    precos, quantidades = _primeiro_dia_original(cubo.registro.equipes(eliminatoria=True))
+    novos = precos_do_dia(cubo, 0)
+    assert sorted(novos.index) == sorted(precos.index)
+    assert (novos - precos).abs().max() < 1e-9
+    novas = cubo.quantidades(0, tipo="equipe", eliminatoria=True, acabamento=ACABAMENTOS_ESPECIAIS)
+    assert (novas - quantidades).abs().max() == 0
+
+
+def test_copia_dos_acabamentos_em_stickers():
+    assert stickers.ACABAMENTOS_ESPECIAIS == ACABAMENTOS_ESPECIAIS
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from painel import SEM_OBSERVACAO, Painel
+from qualidade import verificar_painel
+from registro import carregar_registro
+
+# O exemplo do pedido: G2 Esports dourado 73,42 -> 10,44 e FaZe Clan dourado 14,17 -> 77,32
+# entre as coletas de 13/12 e 14/12 (o dia 12/12 é o dos CSVs)
+EXEMPLO = {
+    "2024-12-12": (73.27, 10.00),
+    "2024-12-13": (73.42, 14.17),
+    "2024-12-14": (10.44, 77.32),
+}
+
+
+# Painel só com os dois adesivos, observados em todos os dias dados
+def _painel(coletas):
+    registro = carregar_registro()
+    g2 = registro.identificar("G2 Esports", "Dourado", "Xangai 2024")
+    faze = registro.identificar("FaZe Clan", "Dourado", "Xangai 2024")
+    forma = (len(coletas), len(registro))
+    preco = np.full(forma, np.nan)
+    preco[:, [g2, faze]] = list(coletas.values())
+    idade = np.full(forma, SEM_OBSERVACAO, dtype=np.int32)
+    idade[:, [g2, faze]] = 0
+    painel = Painel(registro, pd.DatetimeIndex(list(coletas)), preco, np.where(np.isnan(preco), np.nan, 10.0), idade)
+    return painel, g2, faze
+
+
+def _trocas(relatorio):
+    return [(troca["dia"], {troca["a"]["nome"], troca["b"]["nome"]}, troca["reverte"]) for troca in relatorio["trocas"]]
+
+
+def test_exemplo_do_pedido_e_troca_provavel():
+    painel, _, _ = _painel(EXEMPLO)
+    relatorio = verificar_painel(painel, "reparar").qualidade
+    # Sem coleta seguinte não há como confirmar: só o relatório, nada reparado
+    assert _trocas(relatorio) == [("2024-12-14", {"G2 Esports", "FaZe Clan"}, None)]
+    assert relatorio["reparados"]["trocas"] == 0
+
+
+def test_troca_confirmada_e_desfeita():
+    painel, g2, faze = _painel({**EXEMPLO, "2024-12-15": (72.90, 14.50)})
+    reparado = verificar_painel(painel, "reparar")
+    assert _trocas(reparado.qualidade) == [("2024-12-14", {"G2 Esports", "FaZe Clan"}, True)]
+    assert reparado.qualidade["reparados"]["trocas"] == 1
+    assert reparado.preco[2, [g2, faze]].tolist() == [77.32, 10.44]
+
+
+def test_sem_volta_nao_e_reparada():
+    # Nos CSVs, a coleta seguinte (16/12) mantém a G2 no nível novo: movimento de mercado
+    painel, g2, _ = _painel({**EXEMPLO, "2024-12-16": (13.30, 15.06)})
+    reparado = verificar_painel(painel, "reparar")
+    assert _trocas(reparado.qualidade) == [("2024-12-14", {"G2 Esports", "FaZe Clan"}, False)]
+    assert reparado.preco[2, g2] == 10.44
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from nomes import analisar_nomes
+from registro import ARQUIVO_ENTIDADES, atualizar_registro, carregar_registro, pasta_registro
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Cópia do registro real, para o teste poder gravar nela
+@pytest.fixture
+def pasta(tmp_path):
+    destino = tmp_path / "registro"
+    shutil.copytree(os.path.join(RAIZ, pasta_registro), destino)
+    return str(destino)
+
+
+# Snapshot de um Major novo, no formato que o carregador entrega ao registro
+def _snapshot(linhas):
+    nomes = pd.Series([nome for nome, _ in linhas])
+    return analisar_nomes(nomes).assign(Tipo=[tipo for _, tipo in linhas])
+
+
+def test_atualizar_e_carregar_major_novo(pasta):
+    antes = len(carregar_registro(pasta))
+    df = _snapshot([
+        ("Adesivo | Team Spirit (Dourado) | Austin 2025", "Legends"),
+        ("Adesivo | donk (Dourado) | Austin 2025", "Autographs"),
+        ("Adesivo | donk | Austin 2025", "Autographs"),
+    ])
+    assert atualizar_registro(df, pasta) == (2, 3)
+
+    # O jogador novo entra sem equipe e o registro carrega mesmo assim
+    registro = carregar_registro(pasta)
+    assert len(registro) == antes + 3
+    assert registro.identificar("donk", "Dourado", "Austin 2025") >= antes
+    assert registro.sem_equipe == ["donk (Austin 2025)"]
+    assert "donk" in registro.jogadores(torneio="Austin 2025")
+    assert registro.jogadores(equipe="Team Spirit", torneio="Austin 2025") == []
+
+    # Com a equipe preenchida, entra nas consultas por equipe
+    caminho = os.path.join(pasta, ARQUIVO_ENTIDADES)
+    entidades = pd.read_csv(caminho, keep_default_na=False, dtype=str)
+    entidades.loc[entidades["nome"] == "donk", "equipe"] = "Team Spirit"
+    entidades.to_csv(caminho, index=False)
+    assert atualizar_registro(df, pasta) == (0, 0)
+    registro = carregar_registro(pasta)
+    assert registro.sem_equipe == []
+    assert registro.jogadores(equipe="Team Spirit", torneio="Austin 2025") == ["donk"]
+
+
+def test_equipe_desconhecida_nao_carrega(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_ENTIDADES)
+    entidades = pd.read_csv(caminho, keep_default_na=False, dtype=str)
+    entidades.loc[entidades["tipo"] == "jogador", "equipe"] = "Equipe Inexistente"
+    entidades.to_csv(caminho, index=False)
+    with pytest.raises(ValueError, match="equipe desconhecida"):
+        carregar_registro(pasta)
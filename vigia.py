@@ -0,0 +1,202 @@
+import argparse
+import os
+import sys
+import time
+
+# Sem janelas: o backend Agg precisa ser escolhido antes de qualquer import do pyplot
+import matplotlib
+matplotlib.use("Agg")
+
+import perfil
+
+from carregador import pasta_csv
+from classificacao import Classificacao, formatar_evento
+from cubo import carregar_cubo, leituras_alteradas
+from historico import Historico, pasta_historico
+from registro import pasta_registro
+from render import FORMATOS, SCRIPTS, listar_tarefas, pasta_saida, renderizar
+
+# Espera (s) entre duas verificações no modo polling, e silêncio exigido depois de uma mudança
+# antes de processar (um CSV ou uma coleta ainda sendo gravados)
+INTERVALO = 2.0
+
+# Seleções acompanhadas pelos alertas de troca de posição no top N (rótulo -> critérios do cubo)
+ALERTAS = {
+    "jogadores dourados": {"tipo": "jogador", "acabamento": "Dourado"},
+    "equipes douradas": {"tipo": "equipe", "eliminatoria": True, "acabamento": "Dourado"},
+}
+
+# inotify quando o pacote estiver instalado; sem ele, polling das pastas
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+# Assinatura (mtime, tamanho) dos arquivos que alimentam o cubo: os CSVs, o registro e o histórico
+def assinatura(pasta_csvs, historico, pasta_reg=pasta_registro):
+    arquivos = []
+    for pasta in (pasta_csvs, pasta_reg):
+        if os.path.isdir(pasta):
+            arquivos += [os.path.join(pasta, nome) for nome in os.listdir(pasta) if nome.endswith(".csv")]
+    arquivos += [historico.arquivo_log, historico.arquivo_coletas]
+    arquivos += [os.path.join(historico.pasta_dias, f"{dia}.npz") for dia in historico.listar_dias()]
+    resultado = {}
+    for arquivo in arquivos:
+        try:
+            info = os.stat(arquivo)
+            resultado[arquivo] = (info.st_mtime_ns, info.st_size)
+        except FileNotFoundError:
+            pass
+    return resultado
+
+
+# Bloqueia até alguma das pastas mudar (inotify) ou até o próximo intervalo (polling)
+class Observador:
+    def __init__(self, pastas, intervalo=INTERVALO):
+        self.intervalo = intervalo
+        self._inotify = None
+        if INotify is not None:
+            self._inotify = INotify()
+            mascara = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE
+            for pasta in pastas:
+                os.makedirs(pasta, exist_ok=True)
+                self._inotify.add_watch(pasta, mascara)
+
+    def esperar(self):
+        if self._inotify is None:
+            time.sleep(self.intervalo)
+            return
+        self._inotify.read()
+        # Juntar a rajada de eventos de uma mesma gravação
+        while self._inotify.read(timeout=int(self.intervalo * 1000)):
+            pass
+
+
+class Vigia:
+    def __init__(self, scripts=SCRIPTS, saida=pasta_saida, formatos=("png",), animacoes=True,
+                 pasta_csvs=pasta_csv, pasta_hist=pasta_historico, alertas=ALERTAS, n_alertas=10):
+        self.scripts = scripts
+        self.saida = saida
+        self.formatos = list(formatos)
+        self.animacoes = animacoes
+        self.pasta_csvs = pasta_csvs
+        self.historico = Historico(pasta_hist)
+        # Leituras do cubo feitas por cada figura na última vez em que foi desenhada
+        self.leituras = {}
+        self.assinatura = None
+        # Uma classificação por alerta, mantida entre as cargas: cada coleta nova só aplica as
+        # mudanças do(s) dia(s) novo(s). Criadas na primeira carga, com os empates na ordem do
+        # registro, e refeitas quando o registro muda
+        self.alertas = alertas
+        self.n_alertas = n_alertas
+        self.classificacoes = {}
+        self.registro_alertas = None
+        self.ultimo_dia = None
+
+    # Trocas de posição no top N nos dias que chegaram desde a última atualização
+    # (a primeira carga só prepara as classificações, sem alertar). Com um registro novo (nomes,
+    # equipes, fase eliminatória), as classificações são refeitas desde o primeiro dia, alertando
+    # só os dias novos.
+    def alertar(self, cubo):
+        novos = 0 if self.ultimo_dia is None else int(cubo.dias.searchsorted(self.ultimo_dia, side="right"))
+        inicio = novos
+        if cubo.registro.assinatura != self.registro_alertas:
+            self.registro_alertas = cubo.registro.assinatura
+            self.classificacoes = {}
+            inicio = 0
+        if inicio >= cubo.n_dias:
+            return []
+        eventos = []
+        for rotulo, criterios in self.alertas.items():
+            if rotulo not in self.classificacoes:
+                self.classificacoes[rotulo] = Classificacao(self.n_alertas, cubo.registro.entidades["nome"])
+            serie = cubo.serie("media", dias=slice(inicio, None), **criterios)
+            for dia, (data, valores) in enumerate(zip(serie.index, serie.to_numpy()), inicio):
+                for evento in self.classificacoes[rotulo].aplicar(zip(serie.columns, valores), data):
+                    if dia >= novos:
+                        eventos.append((rotulo, evento))
+        primeira_carga = self.ultimo_dia is None
+        self.ultimo_dia = cubo.dias[-1]
+        return [] if primeira_carga else eventos
+
+    # Recarregar o cubo (importando os CSVs novos) e redesenhar só as figuras cujas leituras mudaram
+    def atualizar(self):
+        inicio = time.perf_counter()
+        cubo = carregar_cubo(self.pasta_csvs, historico=self.historico.pasta)
+        for rotulo, evento in self.alertar(cubo):
+            print(formatar_evento(evento, self.classificacoes[rotulo].n, rotulo), file=sys.stderr)
+        os.makedirs(self.saida, exist_ok=True)
+
+        refeitas, mantidas = [], 0
+        for tarefa in listar_tarefas(self.scripts, animacoes=self.animacoes):
+            leituras = self.leituras.get(tarefa)
+            if leituras is not None and not leituras_alteradas(cubo, leituras):
+                mantidas += 1
+                continue
+            try:
+                with cubo.anotando_leituras() as novas:
+                    refeitas += renderizar(tarefa, self.saida, self.formatos, cubo)
+                self.leituras[tarefa] = novas
+            except Exception as erro:
+                self.leituras.pop(tarefa, None)
+                print(f"Erro ao renderizar {tarefa[2]} ({tarefa[0]}): {erro}", file=sys.stderr)
+
+        for caminho in refeitas:
+            print(caminho)
+        print(f"{len(refeitas)} arquivos atualizados, {mantidas} figuras sem mudança "
+              f"em {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+        return refeitas
+
+    # Processar se algo mudou desde a última atualização
+    def verificar(self):
+        atual = assinatura(self.pasta_csvs, self.historico)
+        if atual == self.assinatura:
+            return []
+        refeitas = self.atualizar()
+        # A importação grava no histórico: a assinatura de referência é a de depois dela
+        self.assinatura = assinatura(self.pasta_csvs, self.historico)
+        return refeitas
+
+    def rodar(self, intervalo=INTERVALO):
+        observador = Observador([self.pasta_csvs, pasta_registro, self.historico.pasta], intervalo)
+        modo = "inotify" if observador._inotify is not None else f"polling a cada {intervalo:g}s"
+        print(f"Vigiando {self.pasta_csvs}/, {pasta_registro}/ e {self.historico.pasta}/ ({modo})", file=sys.stderr)
+        self.verificar()
+        while True:
+            observador.esperar()
+            self.verificar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Vigia csvs/ e o histórico e redesenha só as figuras afetadas quando chega uma coleta nova."
+    )
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="scripts a vigiar (padrão: todos)")
+    parser.add_argument("--saida", default=pasta_saida, help="pasta de saída (padrão: %(default)s)")
+    parser.add_argument("--formatos", nargs="+", default=["png"], choices=FORMATOS, help="formatos das figuras")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO, help="segundos entre verificações")
+    parser.add_argument("--sem-animacoes", action="store_true", help="não gerar os GIFs")
+    parser.add_argument("--alertas", type=int, default=10, metavar="N",
+                        help="tamanho do top acompanhado pelos alertas de troca de posição (0 desliga)")
+    parser.add_argument("--uma-vez", action="store_true", help="atualizar uma vez e sair")
+    parser.add_argument("--perfil", nargs="?", const="", metavar="TRACE",
+                        help="medir as etapas e mostrar o resumo na saída; com TRACE, grava também o Chrome trace")
+    args = parser.parse_args(argv)
+    if args.perfil is not None:
+        perfil.ativar(args.perfil or None)
+
+    vigia = Vigia(args.scripts, args.saida, args.formatos, animacoes=not args.sem_animacoes,
+                  alertas=ALERTAS if args.alertas > 0 else {}, n_alertas=args.alertas)
+    if args.uma_vez:
+        vigia.verificar()
+        return 0
+    try:
+        vigia.rodar(args.intervalo)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())